@@ -0,0 +1,134 @@
+"""
+Đánh giá Recall@k của dense search, BM25 và hybrid (RRF / weighted) trên cùng tập chunks
+Input: data/document_RAG.json (chunk như khi ingest) + data/Eveluate.json (question, ground_truth)
+Output: Recall@k cho từng retriever và candidate pool nhỏ nhất đạt recall của dense @ RERANK_TOP_K
+
+Gold chunk của một câu hỏi = chunk chứa nhiều token của ground_truth nhất (token recall
+>= --min-overlap); câu hỏi không có gold chunk rõ ràng (vd. "Không có thông tin...") bị bỏ qua.
+Index được dựng trong bộ nhớ, không đụng tới index đã ingest.
+
+Usage:
+    python Evaluate_RAG/evaluate_hybrid_recall.py [--limit 50] [--min-overlap 0.6]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Set
+
+# Add parent directory to path
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import numpy as np
+from config.config import Config
+from src.document_processor import DocumentProcessor
+from src.embeddings import EmbeddingGenerator
+from src.sparse_index import BM25Index, fuse_results, tokenize
+
+K_VALUES = [3, 5, 8, 10, 15, 20]
+
+
+def find_gold_chunks(ground_truth: str, chunk_tokens: List[Set[str]], min_overlap: float) -> Set[int]:
+    """
+    Chunk(s) chứa nhiều token của ground_truth nhất
+
+    Returns: tập index của gold chunks (rỗng nếu token recall tốt nhất < min_overlap)
+    """
+    answer = set(tokenize(ground_truth, bigrams=False))
+    if not answer:
+        return set()
+    overlaps = np.array([len(answer & tokens) / len(answer) for tokens in chunk_tokens])
+    best = overlaps.max()
+    if best < min_overlap:
+        return set()
+    return set(np.flatnonzero(overlaps >= best - 1e-9).tolist())
+
+
+def recall_at_k(rankings: List[List[int]], gold: List[Set[int]], k: int) -> float:
+    """Tỉ lệ câu hỏi có ít nhất một gold chunk trong top-k"""
+    return float(np.mean([bool(set(ranking[:k]) & gold_set) for ranking, gold_set in zip(rankings, gold)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense vs BM25 vs hybrid candidate recall")
+    parser.add_argument("--documents", type=str, default="data/document_RAG.json", help="Corpus JSON")
+    parser.add_argument("--input", type=str, default="data/Eveluate.json", help="Evaluation questions")
+    parser.add_argument("--limit", type=int, default=0, help="Max questions (0 = all)")
+    parser.add_argument("--min-overlap", type=float, default=0.6, help="Min ground_truth token recall of a gold chunk")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("HYBRID RETRIEVAL RECALL (DENSE / BM25 / RRF / WEIGHTED)")
+    print("=" * 60)
+
+    with open(args.documents, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    documents = data['documents'] if isinstance(data, dict) else data
+    chunks, chunk_metadata = DocumentProcessor().process_document_with_metadata(
+        documents=documents, return_metadata=True
+    )
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        items = json.load(f)
+    if args.limit:
+        items = items[:args.limit]
+
+    chunk_tokens = [set(tokenize(chunk, bigrams=False)) for chunk in chunks]
+    questions, gold = [], []
+    for item in items:
+        gold_chunks = find_gold_chunks(item['ground_truth'], chunk_tokens, args.min_overlap)
+        if gold_chunks:
+            questions.append(item['question'])
+            gold.append(gold_chunks)
+    print(f"\n{len(chunks)} chunks, {len(questions)}/{len(items)} questions with a gold chunk")
+    if not questions:
+        return
+
+    # Dense: exact inner product over the whole corpus (same embeddings as the vector store)
+    embedding_generator = EmbeddingGenerator()
+    chunk_embeddings = embedding_generator.generate_embeddings(chunks)
+    query_embeddings = embedding_generator.generate_query_embeddings(questions)
+    max_k = max(K_VALUES)
+    dense_rows = np.argsort(-(query_embeddings @ chunk_embeddings.T), axis=1)[:, :max_k]
+
+    # Sparse: BM25 keyed by chunk row
+    sparse_index = BM25Index(path="")
+    sparse_index.add(chunks, [{"row": row} for row in range(len(chunks))], ids=list(range(len(chunks))))
+    row_of_text: Dict[str, int] = {chunk: row for row, chunk in enumerate(chunks)}
+
+    rankings = {"dense": [], "bm25": [], "hybrid rrf": [], "hybrid weighted": []}
+    for question, query_embedding, rows in zip(questions, query_embeddings, dense_rows):
+        dense_scores = chunk_embeddings[rows] @ query_embedding
+        dense = ([chunks[row] for row in rows], dense_scores.tolist(), [{"row": int(row)} for row in rows])
+        sparse = sparse_index.search(question, max_k)
+
+        rankings["dense"].append([int(row) for row in rows])
+        rankings["bm25"].append([metadata["row"] for metadata in sparse[2]])
+        for method in ("rrf", "weighted"):
+            texts, _, _ = fuse_results(dense, sparse, max_k, method=method)
+            rankings[f"hybrid {method}"].append([row_of_text[text] for text in texts])
+
+    print(f"\n{'Retriever':<16}" + "".join(f"{f'R@{k}':>8}" for k in K_VALUES))
+    print("-" * (16 + 8 * len(K_VALUES)))
+    recalls = {}
+    for name, ranking in rankings.items():
+        recalls[name] = {k: recall_at_k(ranking, gold, k) for k in K_VALUES}
+        print(f"{name:<16}" + "".join(f"{recalls[name][k]:>8.1%}" for k in K_VALUES))
+
+    baseline_k = Config.RERANK_TOP_K
+    baseline = recall_at_k(rankings["dense"], gold, baseline_k)
+    print(f"\nDense recall at RERANK_TOP_K={baseline_k}: {baseline:.1%}")
+    for name in ("hybrid rrf", "hybrid weighted"):
+        smallest = next((k for k in range(1, max_k + 1) if recall_at_k(rankings[name], gold, k) >= baseline), None)
+        if smallest is None:
+            print(f"  {name}: does not reach it within top {max_k}")
+        else:
+            print(f"  {name}: reaches it with {smallest} candidates "
+                  f"({1 - smallest / baseline_k:.0%} fewer cross-encoder pairs)")
+    print(f"\nPipeline uses HYBRID_FUSION={Config.HYBRID_FUSION}, RERANK_TOP_K={Config.RERANK_TOP_K}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Đánh giá độ đồng thuận xếp hạng của các reranker backend so với model tham chiếu
+Input: data/Eveluate.json (questions) + index đã ingest (FAISS hoặc Qdrant theo Config)
+Output: Kendall tau, top-5 overlap và latency (ms/query) cho từng biến thể
+
+Biến thể: CROSS_ENCODER_MODEL (torch, tham chiếu), bản ONNX fp32 / int8 của nó,
+CROSS_ENCODER_FALLBACK_MODEL (L-6) torch / ONNX int8. Biến thể chưa export sẽ bị bỏ qua.
+
+Usage:
+    python Evaluate_RAG/evaluate_reranker_agreement.py [--limit 100]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+# Add parent directory to path
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import numpy as np
+from config.config import Config
+from src.embeddings import EmbeddingGenerator
+from src.reranker import CrossEncoderReranker
+
+
+def kendall_tau(scores_a: List[float], scores_b: List[float]) -> float:
+    """
+    Kendall tau-b giữa 2 danh sách điểm của cùng một tập candidates
+
+    Returns: score từ -1 đến 1 (1 = cùng thứ tự)
+    """
+    a, b = np.asarray(scores_a, dtype=float), np.asarray(scores_b, dtype=float)
+    upper = np.triu_indices(len(a), k=1)
+    sign_a = np.sign(a[:, None] - a[None, :])[upper]
+    sign_b = np.sign(b[:, None] - b[None, :])[upper]
+    denominator = np.sqrt(np.count_nonzero(sign_a) * np.count_nonzero(sign_b))
+    return float((sign_a * sign_b).sum() / denominator) if denominator else 1.0
+
+
+def load_candidates(questions: List[str]) -> List[List[tuple]]:
+    """Retrieve RERANK_TOP_K (passage, score) candidates per question from the existing index"""
+    if Config.USE_QDRANT:
+        from src.qdrant_vector_store import QdrantVectorStore
+        vector_store = QdrantVectorStore()
+    else:
+        from src.vector_store import FAISSVectorStore
+        vector_store = FAISSVectorStore()
+    if not vector_store.load_index():
+        raise RuntimeError("No index found. Ingest documents first (python main.py --ingest ...)")
+
+    query_embeddings = EmbeddingGenerator().generate_query_embeddings(questions)
+    results = vector_store.search_batch(query_embeddings, k=Config.RERANK_TOP_K)
+    return [list(zip(texts, scores)) for texts, scores, _ in results]
+
+
+def score_variant(reranker: CrossEncoderReranker, questions: List[str], candidates: List[List[tuple]]):
+    """Cross-encoder scores, pipeline top-k and ms/query (one predict call per question, as in query())"""
+    reranker.model.predict([[questions[0], candidates[0][0][0]]])  # warm-up
+    all_scores, seconds = [], 0.0
+    for question, passages_with_scores in zip(questions, candidates):
+        start = time.perf_counter()
+        scores = reranker.model.predict([[question, passage] for passage, _ in passages_with_scores])
+        seconds += time.perf_counter() - start
+        all_scores.append([float(score) for score in scores])
+
+    top_passages = [
+        [passage for passage, *_ in reranker._combine_scores(passages_with_scores, scores, Config.RERANK_ALPHA, Config.FINAL_TOP_K)]
+        for passages_with_scores, scores in zip(candidates, all_scores)
+    ]
+    return all_scores, top_passages, seconds * 1000 / len(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reranker rank agreement vs reference model")
+    parser.add_argument("--input", type=str, default="data/Eveluate.json", help="Evaluation questions")
+    parser.add_argument("--limit", type=int, default=0, help="Max questions (0 = all)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("RERANKER RANK AGREEMENT (KENDALL TAU / TOP-5 OVERLAP)")
+    print("=" * 60)
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        questions = [item['question'] for item in json.load(f)]
+    if args.limit:
+        questions = questions[:args.limit]
+
+    candidates = load_candidates(questions)
+    keep = [i for i, passages in enumerate(candidates) if len(passages) > 1]
+    questions = [questions[i] for i in keep]
+    candidates = [candidates[i] for i in keep]
+    print(f"\n{len(questions)} questions x {Config.RERANK_TOP_K} candidates")
+
+    variants = [
+        ("L-12 torch (ref)", Config.CROSS_ENCODER_MODEL, "torch", False),
+        ("L-12 onnx fp32", Config.CROSS_ENCODER_MODEL, "onnx", False),
+        ("L-12 onnx int8", Config.CROSS_ENCODER_MODEL, "onnx", True),
+        ("L-6 torch", Config.CROSS_ENCODER_FALLBACK_MODEL, "torch", False),
+        ("L-6 onnx int8", Config.CROSS_ENCODER_FALLBACK_MODEL, "onnx", True),
+    ]
+
+    results = {}
+    for label, model_name, backend, quantized in variants:
+        if not model_name:
+            continue
+        Config.ONNX_QUANTIZED = quantized
+        try:
+            reranker = CrossEncoderReranker(model_name, backend=backend, fallback_model="")
+        except Exception as e:
+            print(f"⚠️  Skipping {label}: {e}")
+            continue
+        if backend == "onnx" and quantized != reranker.model.model_path.endswith("_int8.onnx"):
+            print(f"⚠️  Skipping {label}: no int8 model in the export")
+            continue
+        results[label] = score_variant(reranker, questions, candidates)
+
+    reference_label = variants[0][0]
+    if reference_label not in results:
+        raise RuntimeError(f"Reference model {Config.CROSS_ENCODER_MODEL} could not be loaded")
+    reference_scores, reference_top, reference_ms = results[reference_label]
+
+    print(f"\n{'Variant':<18} {'Kendall tau':>12} {'Top-5 overlap':>14} {'ms/query':>9} {'speedup':>8}")
+    print("-" * 65)
+    for label, (scores, top, ms_per_query) in results.items():
+        tau = np.mean([kendall_tau(a, b) for a, b in zip(scores, reference_scores)])
+        overlap = np.mean([len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(top, reference_top)])
+        print(f"{label:<18} {tau:>12.4f} {overlap:>14.1%} {ms_per_query:>9.1f} {reference_ms / ms_per_query:>7.2f}x")
+    print(f"\nTop-5 = pipeline selection (RERANK_ALPHA={Config.RERANK_ALPHA}, FINAL_TOP_K={Config.FINAL_TOP_K})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Compare embedding backends: torch vs ONNX Runtime (fp32 / dynamic int8)
+
+Encodes the metadata chunks of data/document_RAG.json ("passage: ") and the
+questions of data/Eveluate.json ("query: ") with every available backend and prints:
+- cosine similarity of each backend's vectors to the torch vectors (mean / min)
+- top-5 retrieval overlap with torch (questions searched over the chunk vectors)
+- throughput (texts/s) on the chunks
+
+Backends without an export are skipped (create one with: python main.py --export-onnx).
+
+Usage:
+    python Test_module/benchmark_embedding_backends.py [--limit 1000] [--threads 0]
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ['TRANSFORMERS_OFFLINE'] = '1'
+os.environ['HF_HUB_OFFLINE'] = '1'
+
+import numpy as np
+from config.config import Config
+from src.embedding_backends import load_embedding_model
+from src.document_processor import DocumentProcessor
+
+
+def encode(model, texts, batch_size):
+    """Normalized float32 vectors"""
+    return model.encode(
+        texts,
+        batch_size=batch_size,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    ).astype('float32')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backend benchmark")
+    parser.add_argument("--limit", type=int, default=1000, help="Chunks to encode (0 = all)")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads (0 = default)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("EMBEDDING BACKEND BENCHMARK: TORCH vs ONNX RUNTIME (FP32 / INT8)")
+    print("=" * 70)
+
+    with open("data/document_RAG.json", 'r', encoding='utf-8') as f:
+        documents = json.load(f)['documents']
+    chunks = DocumentProcessor().process_document_with_metadata(documents, metadata_fields=list(Config.FIELD_CHUNK_CONFIG.keys()))
+    if args.limit:
+        chunks = chunks[:args.limit]
+    passages = [f"passage: {chunk}" for chunk in chunks]
+
+    with open("data/Eveluate.json", 'r', encoding='utf-8') as f:
+        questions = [f"query: {item['question']}" for item in json.load(f)]
+
+    backends = {}
+    backends["torch"] = load_embedding_model("torch", Config.EMBEDDING_MODEL, device='cpu')
+    for label, quantized in (("onnx fp32", False), ("onnx int8", True)):
+        Config.ONNX_QUANTIZED = quantized
+        try:
+            model = load_embedding_model("onnx", Config.EMBEDDING_MODEL, num_threads=args.threads)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"⚠️  Skipping {label}: {e}")
+            continue
+        if quantized and not model.model_path.endswith("_int8.onnx"):
+            print(f"⚠️  Skipping {label}: no int8 model in the export")
+            continue
+        backends[label] = model
+
+    batch_size = Config.EMBEDDING_BATCH_SIZE
+    results = {}
+    for label, model in backends.items():
+        encode(model, passages[:batch_size], batch_size)  # warm-up
+        start = time.perf_counter()
+        passage_vectors = encode(model, passages, batch_size)
+        seconds = time.perf_counter() - start
+        query_vectors = encode(model, questions, batch_size)
+        results[label] = (passage_vectors, query_vectors, seconds)
+
+    reference_passages, reference_queries, reference_seconds = results["torch"]
+    reference_top = np.argsort(-(reference_queries @ reference_passages.T), axis=1)[:, :5]
+
+    print(f"\nChunks: {len(passages)}, questions: {len(questions)}, batch size: {batch_size}")
+    print(f"\n{'Backend':<12} {'cos mean':>9} {'cos min':>9} {'top-5 overlap':>14} {'texts/s':>9} {'speedup':>8}")
+    print("-" * 66)
+    for label, (passage_vectors, query_vectors, seconds) in results.items():
+        cosines = np.concatenate([
+            (passage_vectors * reference_passages).sum(axis=1),
+            (query_vectors * reference_queries).sum(axis=1)
+        ])
+        top = np.argsort(-(query_vectors @ passage_vectors.T), axis=1)[:, :5]
+        overlap = np.mean([len(set(a) & set(b)) / 5 for a, b in zip(top, reference_top)])
+        print(f"{label:<12} {cosines.mean():>9.4f} {cosines.min():>9.4f} {overlap:>14.1%} "
+              f"{len(passages) / seconds:>9.1f} {reference_seconds / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
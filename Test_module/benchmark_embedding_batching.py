@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Compare fixed-size vs token-budget batching in EmbeddingGenerator
+
+Embeds the metadata chunks of data/document_RAG.json twice with the embedding
+cache disabled: once with fixed batches of EMBEDDING_BATCH_SIZE in input order
+(EMBEDDING_BATCH_TOKEN_BUDGET = 0), once with length-sorted token-budget batches.
+Prints padding waste, wall time and the max difference between the two outputs
+(they must match: batching only changes padding, outputs come back in order).
+
+Usage:
+    python Test_module/benchmark_embedding_batching.py [--budget 8192]
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from config.config import Config
+from src.embeddings import EmbeddingGenerator, make_token_batches, padding_waste
+from src.document_processor import DocumentProcessor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding batching benchmark")
+    parser.add_argument("--budget", type=int, default=Config.EMBEDDING_BATCH_TOKEN_BUDGET or 8192,
+                        help="Padded tokens per batch")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("EMBEDDING BATCHING BENCHMARK: FIXED vs TOKEN BUDGET")
+    print("=" * 70)
+
+    with open("data/document_RAG.json", 'r', encoding='utf-8') as f:
+        documents = json.load(f)['documents']
+    chunks = DocumentProcessor().process_document_with_metadata(documents, metadata_fields=list(Config.FIELD_CHUNK_CONFIG.keys()))
+
+    Config.USE_EMBEDDING_CACHE = False
+    embedder = EmbeddingGenerator()
+
+    lengths = embedder._token_lengths([f"passage: {chunk}" for chunk in chunks])
+    batch_size = Config.EMBEDDING_BATCH_SIZE
+    fixed = [np.arange(start, min(start + batch_size, len(lengths))) for start in range(0, len(lengths), batch_size)]
+    budget = make_token_batches(lengths, args.budget, max(batch_size, args.budget // max(min(lengths), 1)))
+
+    Config.EMBEDDING_BATCH_TOKEN_BUDGET = 0
+    start = time.perf_counter()
+    fixed_embeddings = embedder.generate_embeddings(chunks, show_progress=False)
+    fixed_seconds = time.perf_counter() - start
+
+    Config.EMBEDDING_BATCH_TOKEN_BUDGET = args.budget
+    start = time.perf_counter()
+    budget_embeddings = embedder.generate_embeddings(chunks, show_progress=False)
+    budget_seconds = time.perf_counter() - start
+
+    print(f"\nChunks: {len(chunks)}, tokens: min {min(lengths)}, mean {np.mean(lengths):.0f}, max {max(lengths)}")
+    print(f"\n{'Batching':<28} {'Batches':>8} {'Padding waste':>14} {'Time (s)':>10}")
+    print("-" * 64)
+    print(f"{f'fixed ({batch_size})':<28} {len(fixed):>8} {padding_waste(lengths, fixed):>14.1%} {fixed_seconds:>10.2f}")
+    print(f"{f'token budget ({args.budget})':<28} {len(budget):>8} {padding_waste(lengths, budget):>14.1%} {budget_seconds:>10.2f}")
+    print(f"\nSpeedup: x{fixed_seconds / budget_seconds:.2f}")
+    print(f"Max |difference| between outputs: {np.abs(fixed_embeddings - budget_embeddings).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Recall-vs-latency report for FAISS index types (flat, hnsw, ivf_flat, ivf_pq)
+
+Corpus vectors are the metadata chunks of data/document_RAG.json, queries are the
+questions of data/Eveluate.json. The exact flat index is the ground truth; every
+approximate index is measured by recall@k against it and by mean query latency,
+for a sweep of nprobe (IVF) and efSearch (HNSW).
+
+Usage:
+    python Test_module/benchmark_faiss_index.py [--k 15] [--replicate 1]
+
+--replicate N adds N-1 jittered copies of the corpus to preview behaviour on a
+larger index (the real corpus is small enough that flat search is already fast).
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from src.embeddings import EmbeddingGenerator
+from src.document_processor import DocumentProcessor
+from src.vector_store import FAISSVectorStore
+from config.config import Config
+
+
+def load_vectors(embedder: EmbeddingGenerator, replicate: int):
+    """Embed corpus chunks and evaluation questions"""
+    with open("data/document_RAG.json", 'r', encoding='utf-8') as f:
+        documents = json.load(f)['documents']
+    with open("data/Eveluate.json", 'r', encoding='utf-8') as f:
+        questions = [item['question'] for item in json.load(f)]
+
+    chunks = DocumentProcessor().process_document_with_metadata(documents, metadata_fields=list(Config.FIELD_CHUNK_CONFIG.keys()))
+    corpus = embedder.generate_embeddings(chunks).astype('float32')
+    queries = embedder.generate_query_embeddings(questions)
+
+    if replicate > 1:
+        rng = np.random.default_rng(0)
+        copies = [corpus]
+        for _ in range(replicate - 1):
+            noisy = corpus + rng.normal(scale=0.02, size=corpus.shape).astype('float32')
+            copies.append(noisy / np.linalg.norm(noisy, axis=1, keepdims=True))
+        corpus = np.vstack(copies)
+
+    return corpus, queries
+
+
+def build_store(index_type: str, corpus: np.ndarray) -> tuple:
+    """Build a store of the given type and return (store, build_seconds)"""
+    store = FAISSVectorStore(index_type=index_type)
+    start = time.perf_counter()
+    store.add_embeddings(corpus.copy(), [str(i) for i in range(len(corpus))])
+    return store, time.perf_counter() - start
+
+
+def run_queries(store: FAISSVectorStore, queries: np.ndarray, k: int) -> tuple:
+    """Run one query at a time (as in RAGPipeline.query); return (ids, mean latency ms)"""
+    ids = []
+    start = time.perf_counter()
+    for query in queries:
+        _, found = store.index.search(query.reshape(1, -1), k)
+        ids.append(found[0])
+    elapsed = time.perf_counter() - start
+    return np.array(ids), elapsed / len(queries) * 1000
+
+
+def recall_at_k(approx_ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    """Fraction of exact top-k neighbours found by the approximate search"""
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approx_ids, exact_ids))
+    return hits / exact_ids.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAISS index recall-vs-latency report")
+    parser.add_argument("--k", type=int, default=Config.RERANK_TOP_K, help="Neighbours per query")
+    parser.add_argument("--replicate", type=int, default=1, help="Corpus replication factor")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("FAISS INDEX BENCHMARK: RECALL vs LATENCY")
+    print("=" * 70)
+
+    embedder = EmbeddingGenerator()
+    corpus, queries = load_vectors(embedder, args.replicate)
+    print(f"\nCorpus: {len(corpus)} vectors, queries: {len(queries)}, k={args.k}\n")
+
+    flat, flat_build = build_store("flat", corpus)
+    exact_ids, flat_ms = run_queries(flat, queries, args.k)
+
+    rows = [("flat", "-", flat_build, 1.0, flat_ms)]
+
+    hnsw, hnsw_build = build_store("hnsw", corpus)
+    for ef_search in (16, 32, 64, 128, 256):
+        hnsw.set_search_params(ef_search=ef_search)
+        ids, ms = run_queries(hnsw, queries, args.k)
+        rows.append(("hnsw", f"efSearch={ef_search}", hnsw_build, recall_at_k(ids, exact_ids), ms))
+
+    for index_type in ("ivf_flat", "ivf_pq"):
+        try:
+            store, build = build_store(index_type, corpus)
+        except ValueError as e:
+            print(f"Skipping {index_type}: {e}")
+            continue
+        for nprobe in (1, 4, 8, 16, 32, 64):
+            if nprobe > store.nlist:
+                break
+            store.set_search_params(nprobe=nprobe)
+            ids, ms = run_queries(store, queries, args.k)
+            rows.append((index_type, f"nprobe={nprobe}", build, recall_at_k(ids, exact_ids), ms))
+
+    print(f"\n{'Index':<10} {'Params':<15} {'Build (s)':>10} {f'Recall@{args.k}':>10} {'Latency (ms)':>13}")
+    print("-" * 62)
+    for index_type, params, build, recall, ms in rows:
+        print(f"{index_type:<10} {params:<15} {build:>10.2f} {recall:>10.3f} {ms:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark QdrantVectorStore.add_embeddings: serial upserts vs bulk upload_collection
+
+Uses random normalized vectors (no embedding model needed) with metadata shaped
+like the real chunks, so only the upload path is measured. After the bulk run the
+same data is uploaded again to show that deterministic point IDs make
+re-ingestion an upsert (the point count must not change).
+
+Usage:
+    python Test_module/benchmark_qdrant_upload.py [--url :memory:] [--points 5000] [--parallel 4]
+
+With --url :memory: the local in-process client is used and parallel workers are
+disabled (multiprocessing needs a real server); pass e.g. --url http://localhost:6333
+to measure parallel uploads against a local Qdrant.
+"""
+
+import sys
+import os
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from qdrant_client import QdrantClient
+from src.qdrant_vector_store import QdrantVectorStore
+from config.config import Config
+
+
+def make_data(num_points: int, dimension: int):
+    """Random normalized vectors with chunk-like texts and metadata"""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(num_points, dimension)).astype('float32')
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    texts = [f"Loài {i // 14} - trường {i % 14}: nội dung đoạn văn số {i}" for i in range(num_points)]
+    metadata = [
+        {"id": str(i // 14), "name_vn": f"Rắn {i // 14}", "name_en": f"Snake {i // 14}",
+         "field": f"field_{i % 14}", "chunk_index": 0, "url": ""}
+        for i in range(num_points)
+    ]
+    return vectors, texts, metadata
+
+
+def timed_upload(store: QdrantVectorStore, vectors, texts, metadata, bulk: bool) -> float:
+    """Upload with the given mode and return elapsed seconds"""
+    Config.QDRANT_BULK_UPLOAD = bulk
+    start = time.perf_counter()
+    store.add_embeddings(vectors, texts, metadata=metadata)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qdrant upload benchmark")
+    parser.add_argument("--url", default=":memory:", help="Qdrant URL or :memory:")
+    parser.add_argument("--points", type=int, default=5000, help="Number of points to upload")
+    parser.add_argument("--parallel", type=int, default=Config.QDRANT_UPLOAD_PARALLEL, help="Bulk upload workers")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("QDRANT UPLOAD BENCHMARK: SERIAL vs BULK")
+    print("=" * 70)
+
+    client = QdrantClient(":memory:") if args.url == ":memory:" else QdrantClient(url=args.url, timeout=300)
+    Config.QDRANT_UPLOAD_PARALLEL = 1 if args.url == ":memory:" else args.parallel
+
+    vectors, texts, metadata = make_data(args.points, Config.VECTOR_DIMENSION)
+
+    serial_store = QdrantVectorStore(client=client, collection_name="benchmark_serial")
+    serial_store.create_index()
+    serial_time = timed_upload(serial_store, vectors, texts, metadata, bulk=False)
+
+    bulk_store = QdrantVectorStore(client=client, collection_name="benchmark_bulk")
+    bulk_store.create_index()
+    bulk_time = timed_upload(bulk_store, vectors, texts, metadata, bulk=True)
+    count_first = client.count("benchmark_bulk", exact=True).count
+
+    reupload_time = timed_upload(bulk_store, vectors, texts, metadata, bulk=True)
+    count_second = client.count("benchmark_bulk", exact=True).count
+
+    print(f"\nPoints: {args.points}, parallel workers: {Config.QDRANT_UPLOAD_PARALLEL}")
+    print(f"  Serial upserts:   {serial_time:8.2f}s")
+    print(f"  Bulk upload:      {bulk_time:8.2f}s  (speedup x{serial_time / bulk_time:.1f})")
+    print(f"  Bulk re-upload:   {reupload_time:8.2f}s")
+    print(f"  Point count after first / second upload: {count_first} / {count_second}")
+    print(f"  Idempotent: {'✓' if count_first == count_second == args.points else '✗'}")
+
+    for name in ("benchmark_serial", "benchmark_bulk"):
+        client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test async RAG pipeline (aquery) against a stub Gemini client
+
+The stub simulates network latency with asyncio.sleep, so no API calls are made.
+With N questions and latency L, sequential serving takes ~N*L while aquery_many
+should take ~ceil(N / ASYNC_MAX_CONCURRENCY) * L plus retrieval time.
+"""
+
+import sys
+import os
+import asyncio
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rag_pipeline import RAGPipeline
+from src.llm import GeminiLLM
+from config.config import Config
+
+
+class StubAsyncModels:
+    """Fake client.aio.models with a fixed response latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content(self, model, contents, config):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        text = f"[stub answer from {model}]"
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[SimpleNamespace(text=text)]))])
+
+
+class StubClient:
+    """Fake genai.Client exposing only the async generation path"""
+
+    def __init__(self, latency: float):
+        self.aio = SimpleNamespace(models=StubAsyncModels(latency))
+
+
+def main(num_questions: int = 16, latency: float = 1.0):
+    """Run concurrent questions through aquery_many with a stub LLM"""
+    print("🚀 Testing async RAG pipeline with stub LLM")
+    print("=" * 60)
+
+    pipeline = RAGPipeline()
+    if not pipeline.load_existing_index():
+        print("❌ No index found! Please run 'python main.py --ingest ...' first.")
+        return
+
+    stub = StubClient(latency)
+    pipeline.llm = GeminiLLM(client=stub)
+
+    questions = [f"Rắn lục cườm có độc không? ({i})" for i in range(num_questions)]
+
+    start = time.perf_counter()
+    results = asyncio.run(pipeline.aquery_many(questions))
+    elapsed = time.perf_counter() - start
+
+    print("\n📊 Results:")
+    print(f"  Questions: {len(results)}")
+    print(f"  Stub latency per call: {latency:.2f}s")
+    print(f"  Max concurrency (Config): {Config.ASYNC_MAX_CONCURRENCY}")
+    print(f"  Max in-flight LLM calls observed: {stub.aio.models.max_in_flight}")
+    print(f"  Total time: {elapsed:.2f}s (sequential LLM time would be ~{num_questions * latency:.2f}s)")
+    print(f"  Errors: {sum(1 for r in results if 'error' in r)}")
+
+
+if __name__ == "__main__":
+    main()
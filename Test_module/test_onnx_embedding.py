@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test OnnxEmbeddingModel pooling and normalization against a stub session
+
+load_onnx_export is replaced by a stub tokenizer (one token per word, ids =
+word lengths) and a stub session whose hidden state of a token is
+[token id, position + 1, 1], so the expected pooled vectors can be written
+by hand. Neither onnxruntime nor transformers is needed. Also checks the
+embedding cache name of an export and that the ingest scheduler leaves torch
+alone for a non-torch embedder.
+"""
+
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import src.embedding_backends as embedding_backends
+from src.embedding_backends import OnnxEmbeddingModel, embedding_cache_id, onnx_export_path
+from config.config import Config
+from src.ingest_scheduler import IngestScheduler
+
+DIMENSION = 3
+
+
+def stub_tokenizer(texts, padding=True, truncation=True, max_length=512, return_tensors="np"):
+    """One token per word, padded with id 0 to the longest text of the batch"""
+    ids = [[len(word) for word in text.split()][:max_length] for text in texts]
+    width = max(len(row) for row in ids)
+    input_ids = np.zeros((len(texts), width), dtype=np.int64)
+    attention_mask = np.zeros((len(texts), width), dtype=np.int64)
+    for i, row in enumerate(ids):
+        input_ids[i, :len(row)] = row
+        attention_mask[i, :len(row)] = 1
+    return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+class StubSession:
+    """Fake InferenceSession: hidden state of a token is [id, position + 1, 1]"""
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input_ids"), SimpleNamespace(name="attention_mask")]
+
+    def run(self, output_names, feeds):
+        input_ids = feeds["input_ids"].astype('float32')
+        positions = np.broadcast_to(np.arange(1, input_ids.shape[1] + 1, dtype='float32'), input_ids.shape)
+        return [np.stack([input_ids, positions, np.ones_like(input_ids)], axis=-1)]
+
+
+def load_stub_model(pooling: str) -> OnnxEmbeddingModel:
+    """OnnxEmbeddingModel built on the stub export"""
+    info = {"dimension": DIMENSION, "max_seq_length": 16, "pooling": pooling}
+    original = embedding_backends.load_onnx_export
+    embedding_backends.load_onnx_export = lambda *args: (info, StubSession(), stub_tokenizer, "stub/model.onnx")
+    try:
+        return OnnxEmbeddingModel("stub")
+    finally:
+        embedding_backends.load_onnx_export = original
+
+
+def check(name: str, passed: bool) -> bool:
+    print(f"  {'✅' if passed else '❌'} {name}")
+    return passed
+
+
+def main():
+    """Encode hand-checkable texts with mean and cls pooling"""
+    print("🚀 Testing ONNX embedding model pooling")
+    print("=" * 60)
+    results = []
+    # Different lengths: the short text is padded in the shared batch
+    texts = ["a bbb", "cc dddd eeeeee"]
+
+    print("\n1. Mean pooling over the attention mask")
+    model = load_stub_model("mean")
+    embeddings = model.encode(texts)
+    expected = np.array([[2.0, 1.5, 1.0], [4.0, 2.0, 1.0]], dtype='float32')
+    results.append(check("padding is excluded from the mean", np.allclose(embeddings, expected)))
+    results.append(check("input order is kept across length-sorted batches",
+                         np.allclose(model.encode(texts, batch_size=1), expected)))
+    results.append(check("a single text returns a vector", np.allclose(model.encode(texts[0]), expected[0])))
+
+    print("\n2. CLS pooling")
+    model = load_stub_model("cls")
+    embeddings = model.encode(texts)
+    results.append(check("first token is used", np.allclose(embeddings, [[1, 1, 1], [2, 1, 1]])))
+
+    print("\n3. L2 normalization")
+    model = load_stub_model("mean")
+    embeddings = model.encode(texts, normalize_embeddings=True)
+    results.append(check("rows have unit norm", np.allclose(np.linalg.norm(embeddings, axis=1), 1.0)))
+    results.append(check("direction is unchanged",
+                         np.allclose(embeddings, expected / np.linalg.norm(expected, axis=1, keepdims=True))))
+
+    print("\n4. Embedding cache name of an export")
+    original_export_dir = Config.ONNX_EXPORT_DIR
+    with tempfile.TemporaryDirectory() as export_root:
+        Config.ONNX_EXPORT_DIR = export_root
+        try:
+            export_dir = onnx_export_path("test/model")
+            os.makedirs(export_dir)
+            with open(os.path.join(export_dir, "model.onnx"), 'wb') as f:
+                f.write(b"fp32 weights")
+            fp32_id = embedding_cache_id("onnx", "test/model")
+            results.append(check("missing int8 file falls back to the fp32 name", "@onnx-fp32-" in fp32_id))
+
+            with open(os.path.join(export_dir, "model_int8.onnx"), 'wb') as f:
+                f.write(b"int8 weights")
+            int8_id = embedding_cache_id("onnx", "test/model")
+            results.append(check("int8 file gets its own name", "@onnx-int8-" in int8_id))
+
+            with open(os.path.join(export_dir, "model_int8.onnx"), 'wb') as f:
+                f.write(b"re-exported int8 weights")
+            results.append(check("a re-export gets a new name", embedding_cache_id("onnx", "test/model") != int8_id))
+            results.append(check("the loaded file decides the name",
+                                 embedding_cache_id("onnx", "test/model",
+                                                    model_path=os.path.join(export_dir, "model.onnx")) == fp32_id))
+        finally:
+            Config.ONNX_EXPORT_DIR = original_export_dir
+
+    print("\n5. Ingest scheduler with a non-torch embedder")
+    scheduler = IngestScheduler(SimpleNamespace(backend="onnx"), None, None, embed_torch_threads=4)
+    results.append(check("torch threads are not pinned", scheduler.embed_torch_threads == 0))
+
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test SemanticAnswerCache persistence and cross-process invalidation
+
+Two cache objects on the same path stand for two processes (a running server
+and a CLI re-ingest). put() must not write on the request path, and an
+invalidate() in one of them must stop the other from serving its answers.
+No model is loaded, the questions are hand-made unit vectors.
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from src.semantic_cache import SemanticAnswerCache
+
+DIMENSION = 4
+QUESTION = np.array([1, 0, 0, 0], dtype='float32')
+
+
+def check(name: str, passed: bool) -> bool:
+    print(f"  {'✅' if passed else '❌'} {name}")
+    return passed
+
+
+def main():
+    """Exercise the background save and the index generation"""
+    print("🚀 Testing semantic answer cache persistence")
+    print("=" * 60)
+    results = []
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        path = os.path.join(cache_dir, "answers")
+
+        print("\n1. Background save")
+        server = SemanticAnswerCache(DIMENSION, path=path, save_delay=0.2)
+        server.put("q", QUESTION, "ctx", "answer")
+        results.append(check("put() does not write synchronously", not os.path.exists(f"{path}.json")))
+        time.sleep(0.5)
+        results.append(check("changes are saved in the background", os.path.exists(f"{path}.json")))
+        reloaded = SemanticAnswerCache(DIMENSION, path=path, save_delay=0.2)
+        results.append(check("saved answer is reloaded", reloaded.lookup(QUESTION, "ctx") is not None))
+
+        print("\n2. Invalidation by another process")
+        cli = SemanticAnswerCache(DIMENSION, path=path, save_delay=0.2)
+        cli.invalidate()
+        results.append(check("server stops serving the old answer", server.lookup(QUESTION, "ctx") is None))
+        results.append(check("server adopted the new generation", server.generation == cli.generation == 1))
+
+        print("\n3. Pending save across the invalidation")
+        stale = SemanticAnswerCache(DIMENSION, path=path, save_delay=60)
+        stale.put("q2", QUESTION, "ctx2", "answer built on the old index")
+        cli.invalidate()
+        stale.flush()
+        fresh = SemanticAnswerCache(DIMENSION, path=path)
+        results.append(check("answers cached before the invalidation are not saved", len(fresh) == 0))
+        server.put("q", QUESTION, "ctx", "new answer")
+        server.flush()
+        hit = SemanticAnswerCache(DIMENSION, path=path).lookup(QUESTION, "ctx")
+        results.append(check("answers of the current generation are loaded",
+                             hit is not None and hit["answer"] == "new answer"))
+
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test streaming RAG pipeline (query_stream) against a stub Gemini client
+
+The stub streams a few deltas and then fails, so no API calls are made. The
+stream must end with an "error" event (not "done") and the truncated answer
+must not be stored in the semantic answer cache; a clean stream afterwards
+ends with "done" and is cached.
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rag_pipeline import RAGPipeline
+from src.llm import GeminiLLM
+from src.semantic_cache import SemanticAnswerCache
+
+
+class StubModels:
+    """Fake client.models streaming fixed deltas, optionally failing mid-stream"""
+
+    def __init__(self, deltas, fail_after: int = None):
+        self.deltas = deltas
+        self.fail_after = fail_after
+
+    def generate_content_stream(self, model, contents, config):
+        for i, text in enumerate(self.deltas):
+            if self.fail_after is not None and i == self.fail_after:
+                raise ConnectionError("stream interrupted")
+            yield SimpleNamespace(text=text)
+
+
+class StubClient:
+    """Fake genai.Client exposing only the streaming generation path"""
+
+    def __init__(self, deltas, fail_after: int = None):
+        self.models = StubModels(deltas, fail_after)
+
+
+def run_stream(pipeline: RAGPipeline, question: str) -> list:
+    """Collect the events of one streamed query"""
+    return list(pipeline.query_stream(question))
+
+
+def main():
+    """Stream a failing and a clean answer through query_stream with a stub LLM"""
+    print("🚀 Testing streaming RAG pipeline with stub LLM")
+    print("=" * 60)
+
+    pipeline = RAGPipeline()
+    if not pipeline.load_existing_index():
+        print("❌ No index found! Please run 'python main.py --ingest ...' first.")
+        return False
+
+    # Memory-only answer cache so the test never touches the cache on disk
+    pipeline.semantic_cache = SemanticAnswerCache(path="")
+    question = "Rắn lục cườm có độc không?"
+    deltas = ["Rắn lục cườm ", "là loài rắn ", "có độc."]
+
+    print("\n1. Stream failing after 2 deltas")
+    pipeline.llm = GeminiLLM(client=StubClient(deltas, fail_after=2))
+    events = run_stream(pipeline, question)
+    types_seen = [event["type"] for event in events]
+    failed_ok = (
+        types_seen[-1] == "error"
+        and "done" not in types_seen
+        and types_seen.count("delta") == 2
+        and len(pipeline.semantic_cache) == 0
+    )
+    print(f"  Events: {types_seen}")
+    print(f"  Cached answers: {len(pipeline.semantic_cache)}")
+    print(f"  {'✅' if failed_ok else '❌'} Failure reported, truncated answer not cached")
+
+    print("\n2. Clean stream")
+    pipeline.llm = GeminiLLM(client=StubClient(deltas))
+    events = run_stream(pipeline, question)
+    clean_ok = (
+        events[-1]["type"] == "done"
+        and events[-1]["response"] == "".join(deltas)
+        and len(pipeline.semantic_cache) == 1
+    )
+    print(f"  Events: {[event['type'] for event in events]}")
+    print(f"  Cached answers: {len(pipeline.semantic_cache)}")
+    print(f"  {'✅' if clean_ok else '❌'} Full answer streamed and cached")
+
+    return failed_ok and clean_ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
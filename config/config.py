@@ -16,12 +16,58 @@ class Config:
     LLM_MODEL = "gemini-2.5-flash"
     EMBEDDING_MODEL = "intfloat/multilingual-e5-small"  # Local embedding model (384 dimensions)
     EMBEDDING_BATCH_SIZE = 32  # Batch size for local model (adjust based on your GPU/CPU)
+    EMBEDDING_NUM_WORKERS = 0  # Encoder processes for passage embedding on CPU hosts (0 = encode in-process)
+    EMBEDDING_TORCH_THREADS_PER_WORKER = 4  # torch intra-op threads per encoder process (workers x threads ≈ cores)
+    EMBEDDING_POOL_MIN_TEXTS = 256  # Smaller requests are encoded in-process (pool overhead not worth it)
+    EMBEDDING_BATCH_TOKEN_BUDGET = 8192  # Max padded tokens per batch (texts x longest text), length-sorted; 0 = fixed batches
     EMBEDDING_DELAY = 0  # No delay needed for local model
     
+    # Embedding inference backend
+    EMBEDDING_BACKEND = "torch"      # "torch" (sentence-transformers) or "onnx" (ONNX Runtime on CPU, see --export-onnx)
+    ONNX_EXPORT_DIR = "onnx_models"  # Local exports, one sub-directory per model
+    ONNX_QUANTIZED = True            # Use the dynamic int8 model (model_int8.onnx) when exported
+    ONNX_INTRA_OP_THREADS = 0        # ONNX Runtime intra-op threads (0 = runtime default)
+    
+    # Embedding cache (persistent, content-addressed: model + prefix + normalized text)
+    USE_EMBEDDING_CACHE = True  # Skip re-encoding unchanged chunks on re-ingest
+    EMBEDDING_CACHE_DIR = "embedding_cache"  # float32 vectors (memory-mapped) + keys per model
+    
+    # Query embedding cache (in-process LRU, key = normalized question)
+    QUERY_CACHE_SIZE = 1024  # Max cached questions (0 = disabled)
+    QUERY_CACHE_TTL = 3600   # Seconds before an entry expires (0 = never)
+    
+    # Semantic answer cache (paraphrased question + identical retrieved context -> stored answer, no LLM call)
+    USE_SEMANTIC_CACHE = True
+    SEMANTIC_CACHE_THRESHOLD = 0.95      # Min cosine similarity between questions (e5 scores are compressed: unrelated ≈ 0.8)
+    SEMANTIC_CACHE_SIZE = 1000           # Max cached answers (LRU eviction beyond)
+    SEMANTIC_CACHE_TTL = 86400           # Seconds before an answer expires (0 = never)
+    SEMANTIC_CACHE_CANDIDATES = 5        # Similar questions checked for a matching context
+    SEMANTIC_CACHE_PATH = "semantic_cache/answers"  # {path}.json + {path}.npy + {path}.generation ("" = memory only)
+    SEMANTIC_CACHE_SAVE_DELAY = 2.0      # Seconds of cache changes batched into one background save
+    
     # LLM Rate limiting (Gemini Free Tier: 10 requests/minute)
     LLM_REQUESTS_PER_MINUTE = 9  # Stay under 10 to be safe
     LLM_DELAY_BETWEEN_REQUESTS = 7  # Delay in seconds (60/9 ≈ 6.7s)
     
+    # Async serving (RAGPipeline.aquery)
+    ASYNC_MAX_CONCURRENCY = 8   # Max in-flight questions per event loop
+    ASYNC_WORKER_THREADS = 2    # Thread pool size for embedding/search/rerank
+    
+    # Warm model server (python main.py --serve-models): RAGPipeline uses it when running
+    USE_MODEL_SERVER = True              # Connect to a running server instead of loading models locally
+    MODEL_SERVER_HOST = "127.0.0.1"      # Keep on localhost (no authentication)
+    MODEL_SERVER_PORT = 8765
+    MODEL_SERVER_CONNECT_TIMEOUT = 0.5   # Seconds for the startup health check
+    MODEL_SERVER_TIMEOUT = 300           # Seconds per encode/rerank request (large ingest batches)
+    
+    # Ingest scheduler (chunk -> embed -> upload stages connected by bounded queues)
+    INGEST_STREAM_BATCH_SIZE = 256  # Chunks per embedding batch / store write
+    INGEST_QUEUE_SIZE = 4           # Max batches in flight between stages (bounds memory)
+    INGEST_CHUNK_WORKERS = 2        # Chunking processes (0 = chunk in a thread)
+    INGEST_EMBED_TORCH_THREADS = 4  # torch intra-op threads for the embedder thread (0 = torch default)
+    INGEST_UPLOAD_WORKERS = 2       # Uploader threads (Qdrant; FAISS always uses 1)
+    INGEST_PROGRESS_SECONDS = 5     # Progress report interval (0 = off)
+    
     # RAG configurations
     CHUNK_SIZE = 200
     CHUNK_OVERLAP = 50
@@ -107,6 +153,8 @@ class Config:
     # Re-ranking configurations
     USE_RERANKING = True
     CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-12-v2"
+    CROSS_ENCODER_FALLBACK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"  # Half the layers (~2x faster); loaded if the model above fails ("" = none)
+    RERANKER_BACKEND = "torch"  # "torch" or "onnx" (ONNX Runtime on CPU, int8 if ONNX_QUANTIZED; see --export-onnx)
     
     # Với chunk size lớn (110-300 words), mỗi chunk chứa nhiều thông tin
     # → Cần ít chunks hơn để đủ context
@@ -120,14 +168,94 @@ class Config:
     # - Nếu câu hỏi phức tạp: có thể tăng FINAL_TOP_K lên 8-10
     
     RERANK_ALPHA = 0.7  # Weight for cross-encoder score (0.7) vs original score (0.3)
-    
+
+    # Hybrid retrieval: BM25 over syllables (species names, binomials, toxin terms)
+    # fused with dense search before re-ranking
+    USE_HYBRID_SEARCH = True
+    SPARSE_INDEX_PATH = "bm25_index"  # {path}_bm25.json/.npz + chunk texts/payloads
+    SPARSE_BIGRAMS = True             # Also index adjacent syllable pairs ("hổ_mang")
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    HYBRID_FUSION = "rrf"             # "rrf" (rank based) or "weighted" (min-max normalized scores)
+    HYBRID_RRF_K = 60                 # RRF constant: 1 / (k + rank)
+    HYBRID_DENSE_WEIGHT = 0.5         # Dense share in "weighted" fusion (BM25 gets the rest)
+
+    # Maximal marginal relevance over the candidate vectors before re-ranking: the
+    # cross-encoder scores MMR_TOP_K diverse candidates instead of near-duplicates
+    # of one field
+    USE_MMR = False
+    MMR_LAMBDA = 0.5   # 1 = relevance only, 0 = diversity only
+    MMR_TOP_K = 8      # Candidates kept for re-ranking (>= FINAL_TOP_K)
+
+    # Entity routing: questions naming a species (and a field) search only that
+    # document's chunks with a payload filter instead of the whole index
+    USE_ENTITY_ROUTING = True
+    ENTITY_INDEX_PATH = "entity_index.json"  # Species names / aliases collected at ingest
+    ENTITY_ROUTE_MAX_SPECIES = 3             # More species named = no routing (global search)
+    ENTITY_ROUTE_MAX_FIELDS = 3              # More fields detected = filter by species only
+    # Precomputed (species id, field) -> chunks + contiguous vectors: routed questions
+    # are scored with one matmul over their groups instead of a vector store search
+    USE_STRUCTURED_STORE = True
+    STRUCTURED_STORE_PATH = "structured_store/chunks"  # {path}.npy (vectors) + chunk/payload stores, memory-mapped
+    # Context sent to the LLM: "chunks" (selected chunks) or "whole_field" (each selected
+    # chunk is replaced by its whole field, in document order, overlap written once)
+    CONTEXT_MODE = "chunks"
+    WHOLE_FIELD_MAX_FIELDS = 3  # Max fields in "whole_field" mode (best ranked first)
+    # Context assembly after re-ranking: adjacent chunks of the same (species, field) are
+    # merged with their overlap written once, repeated passages dropped, and blocks packed
+    # best first under a prompt token budget
+    USE_CONTEXT_ASSEMBLY = True
+    CONTEXT_TOKEN_BUDGET = 0        # Estimated context tokens per prompt (0 = no budget: every re-ranked passage is kept)
+    CONTEXT_CHARS_PER_TOKEN = 3.5   # Token estimate for Vietnamese text (no offline Gemini tokenizer)
+    CONTEXT_MIN_OVERLAP = 20        # Shortest overlap (chars) stripped between adjacent chunks
+    # Keywords that imply a field (the field names themselves always match)
+    FIELD_KEYWORDS = {
+        "Tên khoa học và tên phổ thông": ["tên khoa học", "tên phổ thông", "tên gọi", "tên tiếng anh", "ý nghĩa tên"],
+        "Phân loại học": ["phân loại", "thuộc họ", "họ nào", "thuộc chi", "chi nào"],
+        "Đặc điểm hình thái": ["hình thái", "nhận dạng", "nhận biết", "ngoại hình", "màu sắc", "kích thước", "chiều dài"],
+        "Độc tính": ["độc tính", "nọc độc", "có độc", "độc không", "mức độ độc"],
+        "Tập tính săn mồi": ["săn mồi", "con mồi", "thức ăn", "ăn gì"],
+        "Hành vi và sinh thái": ["hành vi", "sinh thái", "tập tính", "tính cách"],
+        "Phân bố địa lý và môi trường sống": ["phân bố", "môi trường sống", "sống ở đâu", "sinh cảnh"],
+        "Sinh sản": ["sinh sản", "đẻ trứng", "đẻ con", "con non"],
+        "Tình trạng bảo tồn": ["bảo tồn", "iucn", "sách đỏ", "nguy cấp"],
+        "Giá trị nghiên cứu": ["giá trị nghiên cứu", "nghiên cứu", "ý nghĩa khoa học"],
+        "Sự liên quan với con người": ["con người", "y học", "buôn bán"],
+        "Các quan sát thú vị từ các nhà nghiên cứu": ["quan sát", "thú vị", "nhà nghiên cứu"],
+        "Triệu chứng khi bị cắn": ["triệu chứng", "bị cắn", "vết cắn"],
+        "Cách xử lý": ["xử lý", "sơ cứu", "cấp cứu", "điều trị", "huyết thanh"]
+    }
+
     # FAISS configurations
     VECTOR_DIMENSION = 384  # multilingual-e5-small embedding dimension
     FAISS_INDEX_PATH = "faiss_index"
     
+    # FAISS index type: "flat" (exact), "hnsw", "ivf_flat" or "ivf_pq" (approximate)
+    FAISS_INDEX_TYPE = "flat"
+    FAISS_HNSW_M = 32                 # Graph neighbours per node
+    FAISS_HNSW_EF_CONSTRUCTION = 200  # Build-time search depth
+    FAISS_HNSW_EF_SEARCH = 64         # Query-time search depth (recall vs latency)
+    FAISS_IVF_NLIST = 256             # Number of IVF clusters (clamped to training set size)
+    FAISS_IVF_NPROBE = 16             # Clusters scanned per query (recall vs latency)
+    FAISS_PQ_M = 48                   # PQ sub-quantizers (must divide VECTOR_DIMENSION)
+    FAISS_PQ_NBITS = 8                # Bits per PQ code
+    FAISS_TRAIN_SAMPLE_SIZE = 20000   # Max vectors sampled for IVF/PQ training
+    
+    # Chunk metadata payloads: keyword fields that can be used in search(filter=...)
+    PAYLOAD_INDEX_FIELDS = ["id", "name_vn", "name_en", "field"]
+    
+    # Incremental ingestion: (doc id, field) -> content hash -> point IDs of what is indexed
+    INGEST_MANIFEST_PATH = "ingest_manifest.json"
+    
     # Qdrant configurations 
     USE_QDRANT = True  # Set to True to use Qdrant instead of FAISS (tạm thời dùng FAISS vì mạng không ổn)
     QDRANT_COLLECTION_NAME = "snake_knowledge_base" # Lưu trữ trong Qdrant
+    QDRANT_BULK_UPLOAD = True          # upload_collection with parallel workers (False = serial upserts)
+    QDRANT_UPLOAD_BATCH_SIZE = 256     # Points per request in bulk mode
+    QDRANT_UPLOAD_PARALLEL = 4         # Parallel upload workers in bulk mode
+    QDRANT_COUNT_REFRESH_SECONDS = 60  # Max age of the cached points_count used by search
+    # Payload keys returned with search hits (text + chunk metadata, nothing else)
+    QDRANT_SEARCH_PAYLOAD_FIELDS = ["text", "id", "name_vn", "name_en", "field", "chunk_index", "url"]
     
     @classmethod
     def validate(cls):
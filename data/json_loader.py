@@ -1,6 +1,6 @@
 import json
 import os
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Union, Iterator
 
 class JSONDataLoader:
     """Load and process data from JSON files for RAG pipeline"""
@@ -153,3 +153,106 @@ def get_json_documents(json_file_path: str = None,
     except Exception as e:
         print(f"❌ Failed to load documents from JSON: {e}")
         return []
+
+
+class _JSONStreamReader:
+    """Character buffer over a text file, refilled on demand for incremental decoding"""
+    
+    def __init__(self, f, read_size: int):
+        self.f = f
+        self.read_size = read_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+    
+    def _fill(self) -> bool:
+        """Read more text, dropping the consumed prefix; False at end of file"""
+        if self.eof:
+            return False
+        data = self.f.read(self.read_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+    
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of file), without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+    
+    def expect(self, char: str):
+        """Consume one expected structural character"""
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(f"Expected '{char}', found '{found}'", self.buffer, self.pos)
+        self.pos += 1
+    
+    def value(self) -> Any:
+        """Decode the next complete JSON value, reading more input as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the very end of the buffer may continue in the next read
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def iter_json_documents(json_file_path: str, array_key: str = "documents",
+                        read_size: int = 1 << 20) -> Iterator[Any]:
+    """
+    Stream the items of a JSON document array without loading the whole file
+    
+    Accepts either a top-level list or an object holding the list under
+    array_key (e.g. {"documents": [...], "metadata": {...}}). Only one item
+    (plus one read buffer) is held in memory at a time.
+    
+    Args:
+        json_file_path: Path to JSON file
+        array_key: Key of the array when the top level is an object
+        read_size: Characters read from disk per refill
+        
+    Yields:
+        Array items (usually document dicts), in file order
+    """
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        reader = _JSONStreamReader(f, read_size)
+        
+        if reader.peek() == "{":
+            # Walk the top-level object, skipping values until array_key
+            reader.expect("{")
+            while True:
+                if reader.peek() == "}":
+                    print(f"❌ Key '{array_key}' not found in: {json_file_path}")
+                    return
+                key = reader.value()
+                reader.expect(":")
+                if key == array_key:
+                    break
+                reader.value()
+                if reader.peek() == ",":
+                    reader.expect(",")
+        
+        reader.expect("[")
+        if reader.peek() == "]":
+            return
+        while True:
+            yield reader.value()
+            if reader.peek() == ",":
+                reader.expect(",")
+            else:
+                reader.expect("]")
+                return
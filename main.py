@@ -6,7 +6,7 @@ Main entry point for the RAG Pipeline
 import argparse
 import sys
 from src.rag_pipeline import RAGPipeline
-from data.json_loader import get_json_documents
+from data.json_loader import get_json_documents, iter_json_documents
 from examples.demo import main as demo_main
 
 def main():
@@ -21,13 +21,40 @@ def main():
                        help="Use metadata-level chunking with context prefix (for structured JSON with metadata)")
     parser.add_argument("--name-field", type=str, default="name_vn",
                        help="Field name for entity name (default: name_vn)")
+    parser.add_argument("--incremental", action="store_true",
+                       help="With --use-metadata-context: only re-embed fields that changed since the last ingest")
+    parser.add_argument("--stream", action="store_true",
+                       help="With --use-metadata-context: stream the JSON file in batches (bounded memory)")
     parser.add_argument("--test", action="store_true", help="Test all components")
     parser.add_argument("--stats", action="store_true", help="Show pipeline statistics")
     parser.add_argument("--reset", action="store_true", help="Reset the pipeline")
+    parser.add_argument("--profile-startup", action="store_true",
+                       help="Profile import time and lazy component construction")
+    parser.add_argument("--serve-models", action="store_true",
+                       help="Run the warm model server (embedding + cross-encoder) used by later runs")
+    parser.add_argument("--export-onnx", action="store_true",
+                       help="Export the embedding model and the cross-encoder to ONNX (+ int8) for the \"onnx\" backends")
     
     args = parser.parse_args()
     
-    # Initialize RAG pipeline
+    if args.profile_startup:
+        from src.startup_profile import profile_startup
+        profile_startup()
+        return
+    
+    if args.serve_models:
+        from src.model_server import ModelServer
+        ModelServer().serve_forever()
+        return
+    
+    if args.export_onnx:
+        from src.onnx_export import export_embedding_model, export_reranker_model
+        export_embedding_model()
+        export_reranker_model()
+        print("Set EMBEDDING_BACKEND / RERANKER_BACKEND = \"onnx\" in config/config.py to use them")
+        return
+    
+    # Initialize RAG pipeline (components are loaded on first use)
     rag = RAGPipeline()
     
     if args.test:
@@ -61,29 +88,50 @@ def main():
                 print(f"   Name field: {args.name_field}")
                 print(f"   Metadata fields: {args.json_fields}")
                 
-                # Load raw JSON data for metadata chunking
-                import json
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # Get documents list
-                if isinstance(data, dict) and 'documents' in data:
-                    documents_list = data['documents']
-                elif isinstance(data, list):
-                    documents_list = data
+                if args.stream and not args.incremental:
+                    # Read, chunk, embed and store the documents batch by batch
+                    print("🌊 Streaming documents from JSON")
+                    stats = rag.ingest_documents_streaming(
+                        documents=iter_json_documents(json_file),
+                        name_field=args.name_field,
+                        metadata_fields=args.json_fields
+                    )
                 else:
-                    print("❌ Invalid JSON structure. Expected 'documents' key or list.")
-                    return
-                
-                print(f"📄 Found {len(documents_list)} entities to process")
-                
-                # Ingest with metadata context
-                stats = rag.ingest_documents_with_metadata(
-                    documents=documents_list,
-                    name_field=args.name_field,
-                    metadata_fields=args.json_fields
-                )
+                    if args.stream:
+                        print("⚠️  --stream is ignored with --incremental")
+                    
+                    # Load raw JSON data for metadata chunking
+                    import json
+                    with open(json_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    
+                    # Get documents list
+                    if isinstance(data, dict) and 'documents' in data:
+                        documents_list = data['documents']
+                    elif isinstance(data, list):
+                        documents_list = data
+                    else:
+                        print("❌ Invalid JSON structure. Expected 'documents' key or list.")
+                        return
+                    
+                    print(f"📄 Found {len(documents_list)} entities to process")
+                    
+                    # Ingest with metadata context
+                    if args.incremental:
+                        stats = rag.ingest_documents_incremental(
+                            documents=documents_list,
+                            name_field=args.name_field,
+                            metadata_fields=args.json_fields
+                        )
+                    else:
+                        stats = rag.ingest_documents_with_metadata(
+                            documents=documents_list,
+                            name_field=args.name_field,
+                            metadata_fields=args.json_fields
+                        )
             else:
+                if args.incremental:
+                    print("⚠️  --incremental requires --use-metadata-context, running a standard ingest")
                 # Standard chunking without metadata context
                 print("📄 Using standard chunking")
                 documents = get_json_documents(json_file, args.json_fields)
@@ -99,6 +147,13 @@ def main():
             print(f"Documents: {stats['total_documents']}")
             print(f"Chunks: {stats['total_chunks']}")
             print(f"Embeddings: {stats['total_embeddings']}")
+            if args.incremental and 'changed_fields' in stats:
+                print(f"Fields changed/unchanged/removed: {stats['changed_fields']}/"
+                      f"{stats['unchanged_fields']}/{stats['removed_fields']}")
+                print(f"Deleted points: {stats['deleted_points']}")
+            if 'stage_seconds' in stats:
+                stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in stats['stage_seconds'].items())
+                print(f"Wall time: {stats['wall_seconds']:.2f}s ({stages})")
             
         except Exception as e:
             print(f"❌ Error during ingestion: {e}")
@@ -193,6 +248,13 @@ def main():
                 stats = rag.get_pipeline_stats()
                 print(f"Indexed: {stats['is_indexed']}")
                 print(f"Total embeddings: {stats['vector_store_stats']['total_embeddings']}")
+                query_cache = stats['query_cache']
+                if query_cache is None:
+                    # Lazy components: the embedder (and its cache) loads on first use
+                    print("Query cache: not loaded")
+                else:
+                    print(f"Query cache: {query_cache['size']}/{query_cache['max_size']} entries, "
+                          f"hit rate {query_cache['hit_rate']:.1%}, {query_cache['evictions']} evictions")
                 continue
             
             if user_input.lower() == 'test':
@@ -216,16 +278,17 @@ def main():
                     print("❌ No documents indexed. Please run 'ingest' first.")
                     continue
             
-            # Process the query
+            # Process the query, printing tokens as they arrive
             print("Processing...")
-            result = rag.query(user_input)
-            
-            if "error" in result:
-                print(f"❌ {result['error']}")
-                continue
-            
-            print("\nResponse:")
-            print(result["response"])
+            for event in rag.query_stream(user_input):
+                if event["type"] == "error":
+                    print(f"\n❌ {event['error']}")
+                elif event["type"] == "metadata":
+                    print("\nResponse:")
+                elif event["type"] == "delta":
+                    print(event["text"], end="", flush=True)
+                elif event["type"] == "done":
+                    print()
             
         except KeyboardInterrupt:
             print("\n\nGoodbye!")
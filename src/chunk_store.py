@@ -0,0 +1,249 @@
+import json
+import os
+from typing import Iterable, Iterator, List, Optional
+import numpy as np
+
+
+class ChunkStore:
+    """
+    Columnar text store for chunk texts
+
+    On disk: one contiguous UTF-8 blob ({path}_texts.bin) plus an int64 offset
+    array ({path}_offsets.npy, n + 1 entries). Both are memory-mapped on load,
+    so startup cost does not grow with corpus size, only the texts actually
+    returned by a search are decoded, and worker processes share the page cache.
+    Texts added after loading are kept in memory until the next save().
+    """
+
+    def __init__(self):
+        """Initialize an empty chunk store"""
+        self._blob = None      # memory-mapped uint8 blob
+        self._offsets = None   # memory-mapped int64 offsets
+        self._pending = []     # texts added since the last load/save
+
+    @staticmethod
+    def _paths(path: str):
+        return f"{path}_texts.bin", f"{path}_offsets.npy"
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        """Check whether a saved chunk store exists at path"""
+        return all(os.path.exists(p) for p in cls._paths(path))
+
+    @classmethod
+    def load(cls, path: str) -> "ChunkStore":
+        """
+        Memory-map a saved chunk store
+
+        Args:
+            path: Base path (without suffix)
+
+        Returns:
+            ChunkStore backed by the files at path
+        """
+        store = cls()
+        store._map(path)
+        return store
+
+    def _map(self, path: str):
+        """Open memory maps over the saved files"""
+        blob_path, offsets_path = self._paths(path)
+        self._offsets = np.load(offsets_path, mmap_mode='r')
+        if os.path.getsize(blob_path) > 0:
+            self._blob = np.memmap(blob_path, dtype=np.uint8, mode='r')
+        else:
+            self._blob = np.zeros(0, dtype=np.uint8)
+
+    @property
+    def _base_count(self) -> int:
+        return 0 if self._offsets is None else len(self._offsets) - 1
+
+    def __len__(self) -> int:
+        return self._base_count + len(self._pending)
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("chunk index out of range")
+
+        base_count = self._base_count
+        if i >= base_count:
+            return self._pending[i - base_count]
+
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._blob[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, text: str):
+        """Add one text"""
+        self._pending.append(text)
+
+    def extend(self, texts: Iterable[str]):
+        """Add many texts"""
+        self._pending.extend(texts)
+
+    def save(self, path: str, rows: Optional[List[int]] = None):
+        """
+        Write the store to disk and re-map it
+
+        Args:
+            path: Base path (without suffix)
+            rows: Optional subset of row numbers to keep, in order (compaction)
+        """
+        blob_path, offsets_path = self._paths(path)
+        directory = os.path.dirname(blob_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if rows is None:
+            rows = range(len(self))
+
+        # Stream rows into temporary files, then swap them in atomically
+        offsets = [0]
+        tmp_blob_path = f"{blob_path}.tmp"
+        with open(tmp_blob_path, 'wb') as f:
+            for row in rows:
+                data = self[row].encode('utf-8')
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+
+        tmp_offsets_path = f"{offsets_path}.tmp.npy"
+        np.save(tmp_offsets_path, np.asarray(offsets, dtype=np.int64))
+
+        # Release current maps before replacing the files (required on Windows)
+        self._blob = None
+        self._offsets = None
+        self._pending = []
+
+        os.replace(tmp_blob_path, blob_path)
+        os.replace(tmp_offsets_path, offsets_path)
+        self._map(path)
+
+
+class PayloadStore:
+    """
+    Per-chunk metadata payloads with dictionary-encoded filter columns
+
+    Full payloads are stored as JSON rows in a ChunkStore ({path}_payload_*).
+    Keyword fields listed in indexed_fields are additionally kept as int32 code
+    columns ({path}_payload_index.npz + vocabulary), so a filter is resolved
+    with a vectorized scan into a row mask without decoding any payload.
+    """
+
+    def __init__(self, indexed_fields: List[str]):
+        """
+        Initialize an empty payload store
+
+        Args:
+            indexed_fields: Payload keys that can be used in filters
+        """
+        self.indexed_fields = list(indexed_fields)
+        self._rows = ChunkStore()
+        self._vocab = {field: {} for field in self.indexed_fields}
+        self._codes = {field: np.zeros(0, dtype=np.int32) for field in self.indexed_fields}
+        self._pending_codes = {field: [] for field in self.indexed_fields}
+
+    @staticmethod
+    def _paths(path: str):
+        return f"{path}_payload", f"{path}_payload_index.npz", f"{path}_payload_vocab.json"
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        """Check whether saved payloads exist at path"""
+        rows_path, index_path, vocab_path = cls._paths(path)
+        return ChunkStore.exists(rows_path) and os.path.exists(index_path) and os.path.exists(vocab_path)
+
+    @classmethod
+    def load(cls, path: str) -> "PayloadStore":
+        """
+        Load saved payloads (rows are memory-mapped)
+
+        Args:
+            path: Base path (without suffix)
+
+        Returns:
+            PayloadStore backed by the files at path
+        """
+        rows_path, index_path, vocab_path = cls._paths(path)
+        with open(vocab_path, 'r', encoding='utf-8') as f:
+            vocab = json.load(f)
+
+        store = cls(list(vocab.keys()))
+        store._rows = ChunkStore.load(rows_path)
+        store._vocab = {field: {value: code for code, value in enumerate(values)} for field, values in vocab.items()}
+        with np.load(index_path) as columns:
+            store._codes = {field: columns[field] for field in store.indexed_fields}
+        return store
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, i: int) -> dict:
+        return json.loads(self._rows[i])
+
+    def _encode(self, field: str, value) -> int:
+        vocab = self._vocab[field]
+        key = "" if value is None else str(value)
+        if key not in vocab:
+            vocab[key] = len(vocab)
+        return vocab[key]
+
+    def extend(self, payloads: Iterable[Optional[dict]]):
+        """Add payloads (None is stored as an empty payload)"""
+        for payload in payloads:
+            payload = payload or {}
+            self._rows.append(json.dumps(payload, ensure_ascii=False))
+            for field in self.indexed_fields:
+                self._pending_codes[field].append(self._encode(field, payload.get(field)))
+
+    def _column(self, field: str) -> np.ndarray:
+        """Full code column (saved codes + pending codes)"""
+        pending = self._pending_codes[field]
+        if not pending:
+            return self._codes[field]
+        return np.concatenate([self._codes[field], np.asarray(pending, dtype=np.int32)])
+
+    def match(self, filter: dict) -> np.ndarray:
+        """
+        Resolve a filter into a boolean row mask
+
+        Args:
+            filter: {field: value or list of values}; all conditions must match
+
+        Returns:
+            Boolean numpy array with one entry per row
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for field, wanted in filter.items():
+            if field not in self._vocab:
+                raise ValueError(f"Payload field '{field}' is not indexed. Indexed fields: {self.indexed_fields}")
+            values = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+            codes = [self._vocab[field][str(v)] for v in values if str(v) in self._vocab[field]]
+            mask &= np.isin(self._column(field), codes)
+        return mask
+
+    def save(self, path: str, rows: Optional[List[int]] = None):
+        """
+        Write payloads and filter columns to disk
+
+        Args:
+            path: Base path (without suffix)
+            rows: Optional subset of row numbers to keep, in order (compaction)
+        """
+        rows_path, index_path, vocab_path = self._paths(path)
+        columns = {field: self._column(field) for field in self.indexed_fields}
+        if rows is not None:
+            columns = {field: column[np.asarray(rows, dtype=np.int64)] for field, column in columns.items()}
+
+        self._rows.save(rows_path, rows)
+        np.savez(index_path, **columns)
+        with open(vocab_path, 'w', encoding='utf-8') as f:
+            vocab = {field: sorted(values, key=values.get) for field, values in self._vocab.items()}
+            json.dump(vocab, f, ensure_ascii=False)
+
+        self._codes = {field: np.ascontiguousarray(column) for field, column in columns.items()}
+        self._pending_codes = {field: [] for field in self.indexed_fields}
@@ -0,0 +1,141 @@
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+from config.config import Config
+from src.document_processor import DocumentProcessor
+from src.structured_store import group_key
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt token count of a text (Config.CONTEXT_CHARS_PER_TOKEN)"""
+    return math.ceil(len(text) / Config.CONTEXT_CHARS_PER_TOKEN) if text else 0
+
+
+class ContextAssembler:
+    """
+    Turns the re-ranked chunks into the passages sent to the LLM
+
+    Word chunking overlaps neighbouring chunks by 25-30%, so the top chunks of
+    one field often repeat the same sentences. Chunks of the same
+    (species, field) with consecutive chunk_index are merged with the overlap
+    and the "{name} - {field}: " prefix written once, passages already
+    contained in a better ranked one are dropped, and the remaining passages
+    are packed best first under a prompt token budget.
+    """
+
+    def __init__(self, token_budget: int = None, min_overlap: int = None):
+        """
+        Args:
+            token_budget: Max estimated context tokens (default from Config.CONTEXT_TOKEN_BUDGET, 0 = no budget)
+            min_overlap: Shortest overlap stripped between chunks (default from Config.CONTEXT_MIN_OVERLAP)
+        """
+        self.token_budget = Config.CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+        self.min_overlap = Config.CONTEXT_MIN_OVERLAP if min_overlap is None else min_overlap
+        self._lock = threading.Lock()
+        self._totals = {"queries": 0, "tokens_before": 0, "tokens_after": 0}
+
+    def _merge_runs(self, texts: List[str], scores: List[float], metadata: List[dict]) -> List[Tuple[int, str, float, dict]]:
+        """
+        Merge runs of consecutive chunks of the same field
+
+        Returns:
+            List of (best rank, text, best score, metadata), best rank first
+        """
+        blocks = []
+        groups: Dict[str, List[int]] = {}
+        for rank, chunk_metadata in enumerate(metadata):
+            key = group_key(chunk_metadata)
+            if key is None:
+                blocks.append([rank])
+            else:
+                groups.setdefault(key, []).append(rank)
+
+        for ranks in groups.values():
+            ranks = sorted(ranks, key=lambda rank: metadata[rank]["chunk_index"])
+            run = [ranks[0]]
+            for rank in ranks[1:]:
+                previous = metadata[run[-1]]["chunk_index"]
+                if metadata[rank]["chunk_index"] == previous:
+                    continue
+                if metadata[rank]["chunk_index"] == previous + 1:
+                    run.append(rank)
+                else:
+                    blocks.append(run)
+                    run = [rank]
+            blocks.append(run)
+
+        merged = []
+        for run in blocks:
+            first = metadata[run[0]]
+            if len(run) == 1:
+                text, block_metadata = texts[run[0]], first
+            else:
+                context_prefix = DocumentProcessor.context_prefix_of(texts[run[0]], first["field"])
+                text = DocumentProcessor.merge_chunks([texts[rank] for rank in run], context_prefix, self.min_overlap)
+                block_metadata = {**first, "num_chunks": len(run)}
+            merged.append((min(run), text, max(scores[rank] for rank in run), block_metadata))
+        return sorted(merged, key=lambda block: block[0])
+
+    def assemble(self, texts: List[str], scores: List[float],
+                 metadata: Optional[List[dict]] = None) -> Tuple[List[str], List[float], List[dict], dict]:
+        """
+        Assemble the context passages of one query
+
+        Args:
+            texts: Selected chunks, best first
+            scores: Their scores
+            metadata: Their metadata (chunks without id/field/chunk_index are never merged)
+
+        Returns:
+            tuple of (texts, scores, metadata, stats), passages best first
+        """
+        metadata = metadata or [{} for _ in texts]
+        tokens_before = sum(estimate_tokens(text) for text in texts)
+
+        out_texts, out_scores, out_metadata, kept_bodies = [], [], [], []
+        used_tokens, duplicates, over_budget = 0, 0, 0
+        for _, text, score, block_metadata in self._merge_runs(texts, scores, metadata):
+            body = " ".join(text.split())
+            field = block_metadata.get("field") if block_metadata else None
+            if field:
+                body = body[len(DocumentProcessor.context_prefix_of(body, field)):]
+            if any(body in kept for kept in kept_bodies):
+                duplicates += 1
+                continue
+            tokens = estimate_tokens(text)
+            if self.token_budget and out_texts and used_tokens + tokens > self.token_budget:
+                # A smaller, lower ranked passage may still fit
+                over_budget += 1
+                print(f"⚠️  Context: passage dropped by the token budget "
+                      f"(~{tokens} tokens, {used_tokens}/{self.token_budget} used)")
+                continue
+            out_texts.append(text)
+            kept_bodies.append(" ".join(text.split()))
+            out_scores.append(score)
+            out_metadata.append(block_metadata)
+            used_tokens += tokens
+
+        stats = {
+            "input_chunks": len(texts),
+            "passages": len(out_texts),
+            "dropped_duplicates": duplicates,
+            "dropped_over_budget": over_budget,
+            "tokens_before": tokens_before,
+            "tokens_after": used_tokens,
+            "tokens_saved": tokens_before - used_tokens
+        }
+        with self._lock:
+            self._totals["queries"] += 1
+            self._totals["tokens_before"] += tokens_before
+            self._totals["tokens_after"] += used_tokens
+        print(f"📦 Context: {len(texts)} chunks -> {len(out_texts)} passages, "
+              f"~{tokens_before} -> ~{used_tokens} prompt tokens ({stats['tokens_saved']} saved)")
+        return out_texts, out_scores, out_metadata, stats
+
+    def get_stats(self) -> dict:
+        """Totals over all assembled queries"""
+        with self._lock:
+            totals = dict(self._totals)
+        totals["tokens_saved"] = totals["tokens_before"] - totals["tokens_after"]
+        totals["token_budget"] = self.token_budget
+        return totals
@@ -1,5 +1,6 @@
+import hashlib
 import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union, Iterable, Iterator
 from config.config import Config
 
 class DocumentProcessor:
@@ -220,40 +221,40 @@ class DocumentProcessor:
         
         return chunks
     
-    def process_document_with_metadata(self, 
-                                      documents: List[Dict], 
-                                      name_field: str = "name_vn",
-                                      metadata_fields: List[str] = None) -> List[str]:
+    # Default metadata fields to process
+    DEFAULT_METADATA_FIELDS = [
+        "Tên khoa học và tên phổ thông",
+        "Phân loại học",
+        "Đặc điểm hình thái",
+        "Độc tính",
+        "Tập tính săn mồi",
+        "Hành vi và sinh thái",
+        "Phân bố địa lý và môi trường sống",
+        "Sinh sản",
+        "Tình trạng bảo tồn",
+        "Giá trị nghiên cứu",
+        "Sự liên quan với con người",
+        "Các quan sát thú vị từ các nhà nghiên cứu"
+    ]
+    
+    def iter_field_chunks(self,
+                          documents: Iterable[Dict],
+                          name_field: str = "name_vn",
+                          metadata_fields: List[str] = None) -> Iterator[Tuple[List[str], List[Dict]]]:
         """
-        Process documents with metadata context
+        Lazily chunk documents one (document, field) at a time
         
         Args:
-            documents: List of document dicts with metadata
+            documents: Iterable of document dicts with metadata (may be a stream)
             name_field: Field name for snake name (default: "name_vn")
             metadata_fields: List of metadata field names to process
-                           If None, process all fields except id and name fields
+                           If None, DEFAULT_METADATA_FIELDS is used
             
-        Returns:
-            List of processed text chunks with context prefix
+        Yields:
+            tuple of (chunks, chunk_metadata) for one field of one document
         """
         if metadata_fields is None:
-            # Default metadata fields to process
-            metadata_fields = [
-                "Tên khoa học và tên phổ thông",
-                "Phân loại học",
-                "Đặc điểm hình thái",
-                "Độc tính",
-                "Tập tính săn mồi",
-                "Hành vi và sinh thái",
-                "Phân bố địa lý và môi trường sống",
-                "Sinh sản",
-                "Tình trạng bảo tồn",
-                "Giá trị nghiên cứu",
-                "Sự liên quan với con người",
-                "Các quan sát thú vị từ các nhà nghiên cứu"
-            ]
-        
-        all_chunks = []
+            metadata_fields = self.DEFAULT_METADATA_FIELDS
         
         for doc in documents:
             # Get snake name
@@ -272,9 +273,39 @@ class DocumentProcessor:
                         snake_name=snake_name,
                         metadata_key=metadata_key
                     )
-                    
-                    all_chunks.extend(chunks)
                     print(f"  ✓ {metadata_key}: {len(chunks)} chunks")
+                    
+                    yield chunks, [
+                        self.build_chunk_metadata(doc, metadata_key, chunk_index)
+                        for chunk_index in range(len(chunks))
+                    ]
+    
+    def process_document_with_metadata(self, 
+                                      documents: List[Dict], 
+                                      name_field: str = "name_vn",
+                                      metadata_fields: List[str] = None,
+                                      return_metadata: bool = False) -> Union[List[str], Tuple[List[str], List[Dict]]]:
+        """
+        Process documents with metadata context
+        
+        Args:
+            documents: List of document dicts with metadata
+            name_field: Field name for snake name (default: "name_vn")
+            metadata_fields: List of metadata field names to process
+                           If None, DEFAULT_METADATA_FIELDS is used
+            return_metadata: Also return a structured metadata dict per chunk
+                           (id, name_vn, name_en, field, chunk_index, url)
+            
+        Returns:
+            List of processed text chunks with context prefix,
+            or tuple of (chunks, chunk_metadata) if return_metadata is True
+        """
+        all_chunks = []
+        all_metadata = []
+        
+        for chunks, chunk_metadata in self.iter_field_chunks(documents, name_field, metadata_fields):
+            all_chunks.extend(chunks)
+            all_metadata.extend(chunk_metadata)
         
         print(f"\n✅ Total processed: {len(all_chunks)} chunks with context")
         
@@ -289,8 +320,95 @@ class DocumentProcessor:
             print(f"  Max length: {max_length} characters")
             print(f"  Min length: {min_length} characters")
         
+        if return_metadata:
+            return all_chunks, all_metadata
         return all_chunks
     
+    @staticmethod
+    def build_chunk_metadata(doc: Dict, metadata_key: str, chunk_index: int) -> Dict:
+        """
+        Build the structured metadata stored with a chunk
+        
+        Args:
+            doc: Source document dict
+            metadata_key: Field the chunk was cut from (e.g. "Độc tính")
+            chunk_index: Ordinal of the chunk within that field
+            
+        Returns:
+            Metadata dict (id, name_vn, name_en, field, chunk_index, url)
+        """
+        return {
+            "id": str(doc.get("id", "")),
+            "name_vn": doc.get("name_vn", ""),
+            "name_en": doc.get("name_en", ""),
+            "field": metadata_key,
+            "chunk_index": chunk_index,
+            "url": doc.get("url", "")
+        }
+    
+    @staticmethod
+    def chunk_key(metadata: Optional[Dict], text: str) -> str:
+        """
+        Stable identity of a chunk, used to derive deterministic vector IDs
+        
+        Args:
+            metadata: Chunk metadata (see build_chunk_metadata), may be None
+            text: Chunk text
+            
+        Returns:
+            "doc_id|field|chunk_index" when metadata is available, otherwise a content hash
+        """
+        if metadata and metadata.get("id") and metadata.get("field") and metadata.get("chunk_index") is not None:
+            return f"{metadata['id']}|{metadata['field']}|{metadata['chunk_index']}"
+        return "text|" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def context_prefix_of(chunk: str, field: str) -> str:
+        """
+        Context prefix ("{name} - {field}: ") a chunk of a field starts with
+
+        Returns:
+            The prefix, or "" if the chunk has none
+        """
+        marker = f" - {field}: "
+        position = chunk.find(marker)
+        return chunk[:position + len(marker)] if position >= 0 else ""
+
+    @staticmethod
+    def merge_chunks(chunks: List[str], context_prefix: str = "", min_overlap: int = 20) -> str:
+        """
+        Rebuild the text of consecutive chunks of one field (inverse of chunking)
+
+        The context prefix is kept once and the overlap between neighbouring
+        chunks is written once, so the result reads like the source field.
+
+        Args:
+            chunks: Chunks of one field in chunk_index order
+            context_prefix: Prefix added by chunk_text_with_metadata_context ("" = none)
+            min_overlap: Shortest suffix/prefix match (chars) treated as overlap, shorter
+                         matches are coincidences and the chunks are joined with a space
+
+        Returns:
+            Merged text (with the context prefix)
+        """
+        bodies = [chunk[len(context_prefix):] if chunk.startswith(context_prefix) else chunk for chunk in chunks]
+        merged = ""
+        for body in bodies:
+            body = body.strip()
+            if not merged:
+                merged = body
+                continue
+            if body in merged[-len(body) - 1:]:
+                # Tail chunk fully inside the previous one (word chunking near the end)
+                continue
+            overlap = 0
+            for size in range(min(len(merged), len(body)), min_overlap - 1, -1):
+                if merged.endswith(body[:size]):
+                    overlap = size
+                    break
+            merged = merged + body[overlap:] if overlap else merged + " " + body
+        return context_prefix + merged
+
     def process_document(self, text: str) -> List[str]:
         """
         Process a document by cleaning and chunking (backward compatible method)
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+from typing import List, Union
+import numpy as np
+from config.config import Config
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+
+
+def onnx_export_path(model_name: str = Config.EMBEDDING_MODEL) -> str:
+    """Local export directory of a model (one sub-directory per model under Config.ONNX_EXPORT_DIR)"""
+    return os.path.join(Config.ONNX_EXPORT_DIR, model_name.replace("/", "__"))
+
+
+def onnx_model_file(export_dir: str, quantized: bool = True) -> str:
+    """Model file of an export that load_onnx_export opens (model_int8.onnx only if quantized and exported)"""
+    int8_path = os.path.join(export_dir, "model_int8.onnx")
+    if quantized and os.path.exists(int8_path):
+        return int8_path
+    return os.path.join(export_dir, "model.onnx")
+
+
+_file_digests = {}  # (path, size, mtime) -> digest, a model file is hashed once per process
+
+
+def _file_digest(path: str) -> str:
+    """Short SHA-256 of a file's content"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_digests:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        _file_digests[key] = digest.hexdigest()[:12]
+    return _file_digests[key]
+
+
+def embedding_cache_id(backend: str = None, model_name: str = Config.EMBEDDING_MODEL,
+                       model_path: str = None) -> str:
+    """
+    Name under which a backend's vectors are cached
+
+    Torch keeps the plain model name (existing caches stay valid); ONNX exports get
+    their own namespace because (int8) vectors differ slightly from the torch ones.
+    The ONNX name is derived from the model file itself (int8 / fp32 + content hash),
+    so a missing int8 file or a re-export never serves vectors of another model.
+
+    Args:
+        backend: "torch" or "onnx" (default from Config.EMBEDDING_BACKEND)
+        model_name: Embedding model name
+        model_path: ONNX file actually loaded (default: the file load_onnx_export would open)
+    """
+    backend = backend or Config.EMBEDDING_BACKEND
+    if backend == "onnx":
+        model_path = model_path or onnx_model_file(onnx_export_path(model_name), Config.ONNX_QUANTIZED)
+        precision = "int8" if os.path.basename(model_path) == "model_int8.onnx" else "fp32"
+        if not os.path.exists(model_path):
+            return f"{model_name}@onnx-{precision}"
+        return f"{model_name}@onnx-{precision}-{_file_digest(model_path)}"
+    return model_name
+
+
+def load_embedding_model(backend: str = None, model_name: str = Config.EMBEDDING_MODEL,
+                         device: str = 'cpu', num_threads: int = 0):
+    """
+    Load an embedding model exposing the SentenceTransformer encode API
+
+    Args:
+        backend: "torch" (sentence-transformers) or "onnx" (ONNX Runtime export),
+                 default from Config.EMBEDDING_BACKEND
+        model_name: Embedding model name
+        device: Device for the torch backend ("cpu" / "cuda")
+        num_threads: ONNX Runtime intra-op threads (0 = Config.ONNX_INTRA_OP_THREADS)
+
+    Returns:
+        Model with encode(), get_sentence_embedding_dimension(), tokenizer and max_seq_length
+    """
+    backend = backend or Config.EMBEDDING_BACKEND
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Expected one of {EMBEDDING_BACKENDS}")
+
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name, device=device)
+
+    return OnnxEmbeddingModel(
+        onnx_export_path(model_name),
+        quantized=Config.ONNX_QUANTIZED,
+        num_threads=num_threads or Config.ONNX_INTRA_OP_THREADS
+    )
+
+
+def load_onnx_export(export_dir: str, quantized: bool = True, num_threads: int = 0):
+    """
+    Open an ONNX export directory (see src/onnx_export.py) on the CPU execution provider
+
+    Args:
+        export_dir: Directory with model.onnx / model_int8.onnx, tokenizer files and export_info.json
+        quantized: Use the dynamic int8 model when it exists
+        num_threads: ONNX Runtime intra-op threads (0 = runtime default)
+
+    Returns:
+        tuple of (export info, InferenceSession, tokenizer, model path)
+    """
+    import onnxruntime as ort
+    from transformers import AutoTokenizer
+
+    info_path = os.path.join(export_dir, "export_info.json")
+    if not os.path.exists(info_path):
+        raise FileNotFoundError(
+            f"No ONNX export found in {export_dir}. Create one with: python main.py --export-onnx"
+        )
+    with open(info_path, 'r', encoding='utf-8') as f:
+        info = json.load(f)
+
+    model_path = onnx_model_file(export_dir, quantized)
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+    tokenizer = AutoTokenizer.from_pretrained(export_dir)
+
+    print(f"✓ ONNX Runtime model loaded: {model_path}")
+    return info, session, tokenizer, model_path
+
+
+class OnnxEmbeddingModel:
+    """ONNX Runtime (CPU) embedding model, a drop-in for SentenceTransformer.encode"""
+
+    def __init__(self, export_dir: str, quantized: bool = True, num_threads: int = 0):
+        """
+        Load an exported model (see src/onnx_export.py) from a local directory
+
+        Args:
+            export_dir: Directory with model.onnx / model_int8.onnx, tokenizer files and export_info.json
+            quantized: Use the dynamic int8 model when it exists
+            num_threads: ONNX Runtime intra-op threads (0 = runtime default)
+        """
+        self.info, self.session, self.tokenizer, self.model_path = load_onnx_export(export_dir, quantized, num_threads)
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.max_seq_length = self.info["max_seq_length"]
+        self.pooling = self.info.get("pooling", "mean")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.info["dimension"]
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, show_progress_bar: bool = False,
+               convert_to_numpy: bool = True, normalize_embeddings: bool = False) -> np.ndarray:
+        """
+        Encode sentences (same semantics as SentenceTransformer.encode)
+
+        Args:
+            sentences: Text or list of texts (already prefixed)
+            batch_size: Texts per session run
+            show_progress_bar: Unused (kept for API compatibility)
+            convert_to_numpy: Unused, numpy arrays are always returned
+            normalize_embeddings: L2-normalize the pooled vectors
+
+        Returns:
+            float32 array (one row per text, or a single vector for a str input)
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        embeddings = np.zeros((len(sentences), self.get_sentence_embedding_dimension()), dtype='float32')
+        # Length-sorted batches keep padding low (as sentence-transformers does)
+        order = np.argsort([-len(sentence) for sentence in sentences], kind='stable')
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            encoded = self.tokenizer(
+                [sentences[i] for i in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+
+            if self.pooling == "cls":
+                pooled = hidden[:, 0]
+            else:
+                mask = encoded["attention_mask"][..., None].astype('float32')
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+            if normalize_embeddings:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            embeddings[batch] = pooled
+
+        return embeddings[0] if single else embeddings
@@ -0,0 +1,285 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import numpy as np
+from config.config import Config
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text before hashing so trivial differences map to the same key
+
+    Args:
+        text: Raw text
+
+    Returns:
+        NFC-normalized text with collapsed whitespace
+    """
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def make_cache_key(model_name: str, prefix: str, text: str) -> str:
+    """
+    Build a content-addressed cache key from (model name, prefix, normalized text)
+
+    Args:
+        model_name: Embedding model name
+        prefix: E5 prefix used for encoding (e.g. "passage: ")
+        text: Text being encoded (without prefix)
+
+    Returns:
+        Hex digest identifying the embedding
+    """
+    payload = "\x1f".join([model_name, prefix, normalize_text(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent on-disk embedding cache backed by a memory-mapped float32 file"""
+
+    def __init__(self, dimension: int, model_name: str = Config.EMBEDDING_MODEL, cache_dir: str = None):
+        """
+        Initialize (or open) the embedding cache
+
+        Args:
+            dimension: Embedding dimension of the model
+            model_name: Embedding model name (each model gets its own sub-directory)
+            cache_dir: Root cache directory (default from Config.EMBEDDING_CACHE_DIR)
+        """
+        self.dimension = dimension
+        self.model_name = model_name
+        root = cache_dir or Config.EMBEDDING_CACHE_DIR
+        self.cache_dir = os.path.join(root, model_name.replace("/", "__"))
+        self.vectors_path = os.path.join(self.cache_dir, "vectors.f32")
+        self.keys_path = os.path.join(self.cache_dir, "keys.txt")
+
+        self._key_to_row = {}
+        self._vectors = None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Load key index, drop rows left by an interrupted append and memory-map the vector file"""
+        row_bytes = self.dimension * 4
+        num_rows = 0
+        if os.path.exists(self.vectors_path):
+            num_rows = os.path.getsize(self.vectors_path) // row_bytes
+
+        keys = []
+        partial_key = False
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            lines = content.split("\n")
+            # The last line is only complete if the file ends with a newline
+            partial_key = bool(lines[-1])
+            keys = [line.strip() for line in lines[:-1] if line.strip()]
+
+        # Vectors are written before keys, so an interrupted append leaves vector
+        # rows (possibly a partial one) without keys. Cut both files back to the
+        # rows that have a key: later appends must land right after them.
+        num_rows = min(num_rows, len(keys))
+        if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) != num_rows * row_bytes:
+            print(f"⚠️  Embedding cache: dropping rows of an interrupted write ({self.vectors_path})")
+            os.truncate(self.vectors_path, num_rows * row_bytes)
+        if partial_key or len(keys) > num_rows:
+            keys = keys[:num_rows]
+            with open(self.keys_path, 'w', encoding='utf-8') as f:
+                f.write("".join(key + "\n" for key in keys))
+
+        self._key_to_row = {key: row for row, key in enumerate(keys)}
+        self._map_vectors(num_rows)
+
+    def _map_vectors(self, num_rows: int):
+        """(Re)open the memory map over the first num_rows vectors"""
+        if num_rows == 0:
+            self._vectors = np.zeros((0, self.dimension), dtype='float32')
+        else:
+            self._vectors = np.memmap(self.vectors_path, dtype='float32', mode='r', shape=(num_rows, self.dimension))
+
+    def __len__(self) -> int:
+        return len(self._key_to_row)
+
+    def lookup(self, keys: List[str]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Look up cached vectors
+
+        Args:
+            keys: List of cache keys
+
+        Returns:
+            tuple of (embeddings array with cache hits filled in, indices of cache misses)
+        """
+        embeddings = np.zeros((len(keys), self.dimension), dtype='float32')
+        misses = []
+        hit_positions = []
+        hit_rows = []
+
+        for i, key in enumerate(keys):
+            row = self._key_to_row.get(key)
+            if row is None:
+                misses.append(i)
+            else:
+                hit_positions.append(i)
+                hit_rows.append(row)
+
+        if hit_rows:
+            embeddings[hit_positions] = self._vectors[hit_rows]
+
+        return embeddings, misses
+
+    def add(self, keys: List[str], embeddings: np.ndarray):
+        """
+        Append new vectors to the cache
+
+        Args:
+            keys: Cache keys for the embeddings
+            embeddings: numpy array of embeddings (one row per key)
+        """
+        embeddings = np.asarray(embeddings, dtype='float32').reshape(-1, self.dimension)
+
+        new_keys = []
+        new_rows = []
+        seen = set()
+        for key, embedding in zip(keys, embeddings):
+            if key in self._key_to_row or key in seen:
+                continue
+            seen.add(key)
+            new_keys.append(key)
+            new_rows.append(embedding)
+
+        if not new_keys:
+            return
+
+        # Release the current map before appending (required on Windows)
+        self._vectors = None
+
+        # Write vectors first so the key file never points past the vector file
+        with open(self.vectors_path, 'ab') as f:
+            f.write(np.ascontiguousarray(new_rows, dtype='float32').tobytes())
+        with open(self.keys_path, 'a', encoding='utf-8') as f:
+            f.write("\n".join(new_keys) + "\n")
+
+        start = len(self._key_to_row)
+        for offset, key in enumerate(new_keys):
+            self._key_to_row[key] = start + offset
+
+        self._map_vectors(len(self._key_to_row))
+
+    def clear(self):
+        """Remove all cached vectors"""
+        for path in (self.vectors_path, self.keys_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._key_to_row = {}
+        self._map_vectors(0)
+
+    def get_stats(self) -> dict:
+        """Get statistics about the cache"""
+        return {
+            "cache_dir": self.cache_dir,
+            "entries": len(self._key_to_row),
+            "size_mb": round(len(self._key_to_row) * self.dimension * 4 / (1024 * 1024), 2)
+        }
+
+
+class QueryEmbeddingCache:
+    """Bounded in-process LRU cache (with TTL) for query embeddings"""
+
+    def __init__(self, max_size: int = None, ttl_seconds: float = None):
+        """
+        Initialize the query embedding cache
+
+        Args:
+            max_size: Maximum number of cached queries (default from Config.QUERY_CACHE_SIZE)
+            ttl_seconds: Time-to-live per entry in seconds, 0 disables expiry (default from Config.QUERY_CACHE_TTL)
+        """
+        self.max_size = max_size if max_size is not None else Config.QUERY_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.QUERY_CACHE_TTL
+        self._entries = OrderedDict()  # key -> (embedding, inserted_at)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(query: str) -> str:
+        """Cache key for a query: whitespace/Unicode-normalized text"""
+        return normalize_text(query)
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """
+        Get a cached embedding for the query
+
+        Args:
+            query: Raw user question
+
+        Returns:
+            Cached embedding or None on miss/expiry
+        """
+        key = self.make_key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, query: str, embedding: np.ndarray):
+        """
+        Store an embedding, evicting the least recently used entries when full
+
+        Args:
+            query: Raw user question
+            embedding: Query embedding
+        """
+        if self.max_size <= 0:
+            return
+
+        key = self.make_key(query)
+        embedding = np.array(embedding, dtype='float32')
+        embedding.setflags(write=False)  # Shared between callers
+
+        with self._lock:
+            self._entries[key] = (embedding, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Get hit/miss/eviction statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,104 @@
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+import numpy as np
+from config.config import Config
+
+# Per-process model used by encoder workers
+_worker_model = None
+
+
+def _init_worker(model_name: str, torch_threads: int, backend: str):
+    """Process pool initializer: pin intra-op threads and load the model once per worker"""
+    global _worker_model
+    os.environ['TRANSFORMERS_OFFLINE'] = '1'
+    os.environ['HF_HUB_OFFLINE'] = '1'
+
+    from src.embedding_backends import load_embedding_model
+
+    if backend == "torch" and torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+    _worker_model = load_embedding_model(backend, model_name, device='cpu', num_threads=torch_threads)
+
+
+def _encode_batch(texts: List[str]) -> np.ndarray:
+    """Encode one batch of already-prefixed texts in a worker (normalized float32 vectors)"""
+    embeddings = _worker_model.encode(
+        texts,
+        batch_size=len(texts),
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+    return embeddings.astype('float32')
+
+
+class EmbeddingWorkerPool:
+    """
+    Pool of CPU encoder processes, each holding its own copy of the embedding model
+
+    A single SentenceTransformer.encode call does not saturate many-core hosts on
+    short passages. The pool instead receives batches of similar token length
+    (little padding) and spreads them over worker processes that each run torch
+    with a fixed number of intra-op threads.
+    """
+
+    def __init__(self, num_workers: int = None, torch_threads: int = None,
+                 model_name: str = Config.EMBEDDING_MODEL, backend: str = None):
+        """
+        Start the worker processes
+
+        Args:
+            num_workers: Encoder processes (default from Config.EMBEDDING_NUM_WORKERS)
+            torch_threads: torch intra-op threads per worker (default from Config.EMBEDDING_TORCH_THREADS_PER_WORKER)
+            model_name: Embedding model loaded by every worker
+            backend: "torch" or "onnx" (default from Config.EMBEDDING_BACKEND)
+        """
+        self.num_workers = num_workers or Config.EMBEDDING_NUM_WORKERS
+        self.torch_threads = torch_threads if torch_threads is not None else Config.EMBEDDING_TORCH_THREADS_PER_WORKER
+        self.model_name = model_name
+        self.backend = backend or Config.EMBEDDING_BACKEND
+
+        print(f"Starting embedding pool: {self.num_workers} workers x {self.torch_threads} torch threads...")
+        # "spawn": forking a process that has already initialized torch is unsafe
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, self.torch_threads, self.backend)
+        )
+        atexit.register(self.close)
+
+    def encode(self, texts: List[str], batches: List[np.ndarray]) -> np.ndarray:
+        """
+        Encode texts across the workers
+
+        Args:
+            texts: Already-prefixed texts (e.g. "passage: ...")
+            batches: Index arrays into texts, one per worker batch (length-sorted,
+                     see EmbeddingGenerator._plan_batches)
+
+        Returns:
+            numpy array of normalized float32 embeddings, in the original text order
+        """
+        if not texts:
+            return np.zeros((0, Config.VECTOR_DIMENSION), dtype='float32')
+
+        futures = [self._executor.submit(_encode_batch, [texts[i] for i in batch]) for batch in batches]
+
+        embeddings = None
+        for batch, future in zip(batches, futures):
+            batch_embeddings = future.result()
+            if embeddings is None:
+                embeddings = np.zeros((len(texts), batch_embeddings.shape[1]), dtype='float32')
+            embeddings[batch] = batch_embeddings
+        return embeddings
+
+    def close(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
@@ -1,15 +1,59 @@
-from sentence_transformers import SentenceTransformer
 from config.config import Config
+from src.embedding_backends import embedding_cache_id, load_embedding_model
+from src.embedding_cache import EmbeddingCache, QueryEmbeddingCache, make_cache_key
+from src.embedding_pool import EmbeddingWorkerPool
 import numpy as np
-from typing import List, Union
+from typing import List, Tuple, Union
 import time
-import torch
 import os
 
 # Force offline mode for HuggingFace to use cached models
 os.environ['TRANSFORMERS_OFFLINE'] = '1'
 os.environ['HF_HUB_OFFLINE'] = '1'
 
+def make_token_batches(lengths: List[int], token_budget: int, max_batch_size: int) -> List[np.ndarray]:
+    """
+    Group texts into length-sorted batches bounded by a padded-token budget
+    
+    Texts are sorted longest first; a batch grows while
+    (texts in batch) x (longest text in batch) stays within token_budget, so
+    short passages are packed many per batch and long ones few per batch.
+    
+    Args:
+        lengths: Token length of each text
+        token_budget: Max padded tokens per batch
+        max_batch_size: Max texts per batch
+        
+    Returns:
+        List of index arrays (positions in the original order), one per batch
+    """
+    order = np.argsort(-np.asarray(lengths), kind='stable')
+    batches = []
+    start = 0
+    while start < len(order):
+        longest = max(lengths[order[start]], 1)
+        size = max(1, min(max_batch_size, token_budget // longest))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+
+def padding_waste(lengths: List[int], batches: List[np.ndarray]) -> float:
+    """
+    Fraction of encoded tokens that are padding
+    
+    Args:
+        lengths: Token length of each text
+        batches: Index arrays, one per batch
+        
+    Returns:
+        1 - real tokens / padded tokens
+    """
+    lengths = np.asarray(lengths)
+    padded = sum(len(batch) * lengths[batch].max() for batch in batches if len(batch))
+    return float(1 - lengths.sum() / padded) if padded else 0.0
+
+
 class EmbeddingGenerator:
     """Handles text embedding generation using local embedding model"""
     
@@ -17,22 +61,44 @@ class EmbeddingGenerator:
         """Initialize the embedding generator with local model"""
         print(f"Loading embedding model: {Config.EMBEDDING_MODEL}")
         
-        # Set device
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        print(f"Using device: {self.device}")
+        # Set device (the ONNX backend always runs on CPU)
+        self.backend = Config.EMBEDDING_BACKEND
+        self.device = 'cpu'
+        if self.backend == "torch":
+            import torch
+            self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        print(f"Using device: {self.device} (backend: {self.backend})")
         
         try:
             # Load model from cache (offline mode is set globally)
-            self.model = SentenceTransformer(
-                Config.EMBEDDING_MODEL, 
-                device=self.device
-            )
+            self.model = load_embedding_model(self.backend, Config.EMBEDDING_MODEL, device=self.device)
             print(f"✓ Model loaded from cache! Embedding dimension: {self.model.get_sentence_embedding_dimension()}")
         except Exception as e:
             print(f"❌ Error loading model: {e}")
-            print(f"💡 Model may not be cached yet. Please run once with internet to download:")
-            print(f"   python -c \"from sentence_transformers import SentenceTransformer; SentenceTransformer('{Config.EMBEDDING_MODEL}')\"")
+            if self.backend == "onnx":
+                print(f"💡 Export the model first: python main.py --export-onnx")
+            else:
+                print(f"💡 Model may not be cached yet. Please run once with internet to download:")
+                print(f"   python -c \"from sentence_transformers import SentenceTransformer; SentenceTransformer('{Config.EMBEDDING_MODEL}')\"")
             raise
+        
+        # Name the vectors are cached under (ONNX vectors are keyed by the model file actually loaded)
+        self.cache_id = embedding_cache_id(self.backend, model_path=getattr(self.model, "model_path", None))
+        
+        # Persistent passage embedding cache (only misses are sent to the model)
+        self.cache = None
+        if Config.USE_EMBEDDING_CACHE:
+            self.cache = EmbeddingCache(
+                dimension=self.model.get_sentence_embedding_dimension(),
+                model_name=self.cache_id
+            )
+            print(f"✓ Embedding cache: {len(self.cache)} cached vectors in {self.cache.cache_dir}")
+        
+        # In-process LRU cache for repeated questions ("query:" prefix path)
+        self.query_cache = QueryEmbeddingCache()
+        
+        # Multi-process encoder pool for large passage batches (started on first use)
+        self.pool = None
     
     def generate_embeddings(self, texts: Union[str, List[str]], batch_size: int = None, show_progress: bool = True) -> np.ndarray:
         """
@@ -54,18 +120,25 @@ class EmbeddingGenerator:
         
         try:
             # Preprocess texts for E5 model (add prefix for better performance)
-            processed_texts = [f"passage: {text}" for text in texts]
+            prefix = "passage: "
+            processed_texts = [f"{prefix}{text}" for text in texts]
             
-            print(f"  Generating {len(texts)} embeddings with {Config.EMBEDDING_MODEL}...")
+            if self.cache is None:
+                print(f"  Generating {len(texts)} embeddings with {Config.EMBEDDING_MODEL}...")
+                embeddings = self._encode(processed_texts, batch_size, show_progress)
+                print(f"  ✓ Successfully generated {len(embeddings)} embeddings")
+                return embeddings
             
-            # Generate embeddings in batches
-            embeddings = self.model.encode(
-                processed_texts,
-                batch_size=batch_size,
-                show_progress_bar=show_progress,
-                convert_to_numpy=True,
-                normalize_embeddings=True  # Normalize for cosine similarity
-            )
+            # Serve cache hits directly, encode only the misses
+            keys = [make_cache_key(self.cache_id, prefix, text) for text in texts]
+            embeddings, misses = self.cache.lookup(keys)
+            print(f"  Embedding cache: {len(texts) - len(misses)} hits, {len(misses)} misses")
+            
+            if misses:
+                print(f"  Generating {len(misses)} embeddings with {Config.EMBEDDING_MODEL}...")
+                new_embeddings = self._encode([processed_texts[i] for i in misses], batch_size, show_progress)
+                embeddings[misses] = new_embeddings
+                self.cache.add([keys[i] for i in misses], new_embeddings)
             
             print(f"  ✓ Successfully generated {len(embeddings)} embeddings")
             return embeddings
@@ -74,6 +147,81 @@ class EmbeddingGenerator:
             print(f"Error generating embeddings: {e}")
             raise
     
+    def _encode(self, processed_texts: List[str], batch_size: int, show_progress: bool) -> np.ndarray:
+        """Encode already-prefixed texts with the model (normalized float32 vectors)"""
+        use_pool = (self.device == 'cpu' and Config.EMBEDDING_NUM_WORKERS > 0
+                    and len(processed_texts) >= Config.EMBEDDING_POOL_MIN_TEXTS)
+        
+        if not Config.EMBEDDING_BATCH_TOKEN_BUDGET and not use_pool:
+            embeddings = self.model.encode(
+                processed_texts,
+                batch_size=batch_size,
+                show_progress_bar=show_progress,
+                convert_to_numpy=True,
+                normalize_embeddings=True  # Normalize for cosine similarity
+            )
+            return embeddings.astype('float32')
+        
+        batches = self._plan_batches(processed_texts, batch_size)
+        
+        if use_pool:
+            if self.pool is None:
+                self.pool = EmbeddingWorkerPool(backend=self.backend)
+            return self.pool.encode(processed_texts, batches)
+        
+        embeddings = np.zeros((len(processed_texts), self.model.get_sentence_embedding_dimension()), dtype='float32')
+        report_every = max(1, len(batches) // 10)
+        for batch_num, batch in enumerate(batches, start=1):
+            embeddings[batch] = self.model.encode(
+                [processed_texts[i] for i in batch],
+                batch_size=len(batch),
+                show_progress_bar=False,
+                convert_to_numpy=True,
+                normalize_embeddings=True  # Normalize for cosine similarity
+            )
+            if show_progress and (batch_num % report_every == 0 or batch_num == len(batches)):
+                print(f"  Encoded batch {batch_num}/{len(batches)}")
+        return embeddings
+    
+    def _plan_batches(self, processed_texts: List[str], batch_size: int) -> List[np.ndarray]:
+        """
+        Tokenize once and build batches (token budget, or fixed size sorted by length)
+        
+        Prints the padding-waste ratio of fixed-size batches in input order
+        versus the planned batches.
+        """
+        lengths = self._token_lengths(processed_texts)
+        
+        if Config.EMBEDDING_BATCH_TOKEN_BUDGET:
+            max_batch_size = max(batch_size, Config.EMBEDDING_BATCH_TOKEN_BUDGET // max(min(lengths), 1))
+            batches = make_token_batches(lengths, Config.EMBEDDING_BATCH_TOKEN_BUDGET, max_batch_size)
+            mode = f"token budget {Config.EMBEDDING_BATCH_TOKEN_BUDGET}"
+        else:
+            order = np.argsort(-np.asarray(lengths), kind='stable')
+            batches = [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+            mode = f"length-sorted batches of {batch_size}"
+        
+        fixed = [np.arange(start, min(start + batch_size, len(lengths))) for start in range(0, len(lengths), batch_size)]
+        print(f"  Padding waste: {padding_waste(lengths, fixed):.1%} (fixed batches of {batch_size}) -> "
+              f"{padding_waste(lengths, batches):.1%} ({mode}, {len(batches)} batches)")
+        return batches
+    
+    def _token_lengths(self, processed_texts: List[str]) -> List[int]:
+        """Token count of each text (truncated at the model's max sequence length)"""
+        encoded = self.model.tokenizer(
+            processed_texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=self.model.max_seq_length
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+    
+    def close(self):
+        """Stop the encoder pool (if started)"""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+    
     def generate_single_embedding(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text (optimized for query)
@@ -85,6 +233,10 @@ class EmbeddingGenerator:
             numpy array of single embedding
         """
         try:
+            cached = self.query_cache.get(text)
+            if cached is not None:
+                return cached
+            
             # Use "query:" prefix for queries (E5 model recommendation)
             processed_text = f"query: {text}"
             
@@ -94,8 +246,41 @@ class EmbeddingGenerator:
                 normalize_embeddings=True
             )
             
+            self.query_cache.put(text, embedding)
             return embedding
             
         except Exception as e:
             print(f"Error generating single embedding: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    def generate_query_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for many queries with a single model.encode call
+        
+        Args:
+            texts: List of query strings
+            
+        Returns:
+            numpy array of query embeddings (one row per query)
+        """
+        try:
+            embeddings = [self.query_cache.get(text) for text in texts]
+            misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            
+            if misses:
+                new_embeddings = self.model.encode(
+                    [f"query: {texts[i]}" for i in misses],
+                    batch_size=Config.EMBEDDING_BATCH_SIZE,
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
+                for i, embedding in zip(misses, new_embeddings):
+                    self.query_cache.put(texts[i], embedding)
+                    embeddings[i] = embedding
+            
+            return np.vstack(embeddings).astype('float32') if embeddings else np.zeros((0, Config.VECTOR_DIMENSION), dtype='float32')
+            
+        except Exception as e:
+            print(f"Error generating query embeddings: {e}")
+            raise
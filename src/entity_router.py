@@ -0,0 +1,307 @@
+import json
+import os
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from config.config import Config
+from src.sparse_index import strip_diacritics
+
+# English common names listed in the "Tên khoa học và tên phổ thông" field
+_EN_ALIASES_RE = re.compile(r"tên phổ biến tiếng anh(?: bao gồm)?:?\s*(.+?)(?:\.|\n|$)", re.IGNORECASE)
+_LATIN_NAME_RE = re.compile(r"[A-Za-z][A-Za-z'’\- ]+")
+_NAME_SEPARATORS_RE = re.compile(r",|;|\s+hoặc\s+|\s+hay\s+|\s+và\s+|\s+or\s+|\s+and\s+", re.IGNORECASE)
+
+
+def normalize(text: str) -> str:
+    """NFC, lower case, single spaces (keeps string positions comparable with strip_diacritics)"""
+    return " ".join(unicodedata.normalize("NFC", text).lower().split())
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over characters
+
+    Finds every occurrence of every pattern in one pass over the text,
+    independent of the number of patterns (a few hundred species names).
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self.patterns: List[str] = []
+        self._built = True
+
+    def add(self, pattern: str) -> int:
+        """
+        Add a pattern
+
+        Returns:
+            Pattern number (index into self.patterns)
+        """
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self.patterns.append(pattern)
+        self._output[state].append(len(self.patterns) - 1)
+        self._built = False
+        return len(self.patterns) - 1
+
+    def _build(self):
+        """Failure links (BFS over the trie)"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+        self._built = True
+
+    def find_all(self, text: str) -> List[Tuple[int, int, int]]:
+        """
+        All pattern occurrences
+
+        Returns:
+            List of (start, end, pattern number)
+        """
+        if not self._built:
+            self._build()
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._output[state]:
+                matches.append((position + 1 - len(self.patterns[pattern]), position + 1, pattern))
+        return matches
+
+
+def _whole_word(text: str, start: int, end: int) -> bool:
+    """Match is not part of a longer word"""
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+def _leftmost_longest(matches: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+    """Non-overlapping matches, longer matches first ("rắn hổ mang chúa" beats "rắn hổ mang")"""
+    selected = []
+    taken = set()
+    for start, end, pattern in sorted(matches, key=lambda match: (match[0] - match[1], match[0])):
+        if not taken.intersection(range(start, end)):
+            selected.append((start, end, pattern))
+            taken.update(range(start, end))
+    return sorted(selected)
+
+
+class EntityRouter:
+    """
+    Detects the species and fields a question is about
+
+    Species names (name_vn, name_en and the English common names listed in the
+    "Tên khoa học và tên phổ thông" field) and Config.FIELD_KEYWORDS are
+    matched with two Aho-Corasick automata, with and without diacritics. A
+    question that names a species is turned into a payload filter
+    {"id": ..., "field": ...}, so retrieval is an exact scan of that document's
+    chunks instead of a global search.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: JSON file with the species names (default from Config.ENTITY_INDEX_PATH)
+        """
+        self.path = path or Config.ENTITY_INDEX_PATH
+        self.species: Dict[str, Dict] = {}  # doc id -> {"name": display name, "aliases": [...]}
+        self._species_matcher = None
+        self._field_matcher = None
+
+    def __len__(self) -> int:
+        return len(self.species)
+
+    @staticmethod
+    def extract_aliases(doc: Dict) -> List[str]:
+        """
+        Names a document is known by
+
+        Args:
+            doc: Source document dict (name_vn may list several names separated by commas)
+
+        Returns:
+            Unique names in order of appearance
+        """
+        # Other species are often mentioned in the description: only the English
+        # common names introduced as this species' names are taken from it
+        names = _NAME_SEPARATORS_RE.split(doc.get("name_en") or "") + _NAME_SEPARATORS_RE.split(doc.get("name_vn") or "")
+        match = _EN_ALIASES_RE.search(doc.get("Tên khoa học và tên phổ thông") or "")
+        if match:
+            names.extend(name for name in _NAME_SEPARATORS_RE.split(re.sub(r"\([^)]*\)", "", match.group(1)))
+                         if _LATIN_NAME_RE.fullmatch(name.strip()))
+
+        unique = []
+        for name in names:
+            name = name.strip(" '\"“”:;")
+            # Single words ("rắn", "Dark") would route far too many questions
+            if len(name.split()) >= 2 and len(name) <= 60 and name.lower() not in (n.lower() for n in unique):
+                unique.append(name)
+        return unique
+
+    def add_documents(self, documents: Iterable[Dict]):
+        """Register the species of documents (existing IDs are replaced)"""
+        for doc in documents:
+            doc_id = str(doc.get("id", ""))
+            aliases = self.extract_aliases(doc)
+            if doc_id and aliases:
+                self.species[doc_id] = {"name": doc.get("name_vn") or doc.get("name_en"), "aliases": aliases}
+        self._species_matcher = None
+
+    def track(self, documents: Iterable[Dict]) -> Iterable[Dict]:
+        """Pass documents through unchanged while registering them (for streamed ingests)"""
+        for doc in documents:
+            self.add_documents([doc])
+            yield doc
+
+    def reset(self):
+        """Forget every species"""
+        self.species = {}
+        self._species_matcher = None
+
+    @staticmethod
+    def _compile(names: Dict[str, Set[str]]) -> Tuple[AhoCorasick, List[Set[str]]]:
+        """
+        Automaton over normalized names and their diacritic-free forms
+
+        Diacritic-free forms are only kept when they stay unambiguous
+        ("ran rao" would be both "rắn ráo" and "rắn rào").
+        """
+        targets: Dict[str, Set[str]] = {}
+        for name, values in names.items():
+            targets.setdefault(normalize(name), set()).update(values)
+
+        plain: Dict[str, Set[str]] = {}
+        for name, values in targets.items():
+            plain.setdefault(strip_diacritics(name), set()).add(name)
+        for plain_name, originals in plain.items():
+            if plain_name not in targets and len(originals) == 1:
+                targets[plain_name] = targets[next(iter(originals))]
+
+        matcher = AhoCorasick()
+        values = []
+        for name, value in targets.items():
+            matcher.add(name)
+            values.append(value)
+        return matcher, values
+
+    def _matches(self, compiled: Tuple[AhoCorasick, List[Set[str]]], text: str) -> List[Set[str]]:
+        """
+        Values of the leftmost-longest whole-word matches in the text
+
+        Diacritic-free names only match where the question was typed without
+        marks too ("ran ho mang"), so a differently marked name never matches.
+        """
+        matcher, values = compiled
+        matches = [match for match in matcher.find_all(text) if _whole_word(text, match[0], match[1])]
+        plain = strip_diacritics(text)
+        if plain != text:
+            matches.extend(
+                (start, end, pattern) for start, end, pattern in matcher.find_all(plain)
+                if _whole_word(plain, start, end) and text[start:end] == plain[start:end]
+            )
+        return [values[pattern] for _, _, pattern in _leftmost_longest(set(matches))]
+
+    def detect_species(self, question: str) -> List[str]:
+        """
+        Document IDs of the species named in a question
+
+        A name shared by several species ("Rắn lục kim") only counts when the
+        question names no species unambiguously.
+        """
+        if self._species_matcher is None:
+            names: Dict[str, Set[str]] = {}
+            for doc_id, entry in self.species.items():
+                for alias in entry["aliases"]:
+                    names.setdefault(alias, set()).add(doc_id)
+            self._species_matcher = self._compile(names)
+
+        matched = self._matches(self._species_matcher, normalize(question))
+        unique = [doc_ids for doc_ids in matched if len(doc_ids) == 1]
+        found = []
+        for doc_ids in unique or matched:
+            found.extend(sorted(doc_id for doc_id in doc_ids if doc_id not in found))
+        return found
+
+    def detect_fields(self, question: str) -> List[str]:
+        """Fields a question asks about (Config.FIELD_KEYWORDS and the field names themselves)"""
+        if self._field_matcher is None:
+            keywords: Dict[str, Set[str]] = {}
+            for field, field_keywords in Config.FIELD_KEYWORDS.items():
+                for keyword in [field] + field_keywords:
+                    keywords.setdefault(keyword, set()).add(field)
+            self._field_matcher = self._compile(keywords)
+
+        found = []
+        for fields in self._matches(self._field_matcher, normalize(question)):
+            found.extend(sorted(field for field in fields if field not in found))
+        return found
+
+    def route(self, question: str) -> Optional[Dict]:
+        """
+        Payload filter for a question
+
+        Returns:
+            {"filter": {"id": ..., "field": ...}, "species": [names], "fields": [...]},
+            or None when no species (or too many) is named
+        """
+        doc_ids = self.detect_species(question)
+        if not doc_ids or len(doc_ids) > Config.ENTITY_ROUTE_MAX_SPECIES:
+            return None
+        fields = self.detect_fields(question)
+
+        route_filter = {"id": doc_ids[0] if len(doc_ids) == 1 else doc_ids}
+        if fields and len(fields) <= Config.ENTITY_ROUTE_MAX_FIELDS:
+            route_filter["field"] = fields[0] if len(fields) == 1 else fields
+        else:
+            fields = []
+        return {
+            "filter": route_filter,
+            "species": [self.species[doc_id]["name"] for doc_id in doc_ids],
+            "fields": fields
+        }
+
+    def save(self, path: str = None):
+        """Write the species names to disk"""
+        path = path or self.path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"species": self.species}, f, ensure_ascii=False, indent=1)
+        print(f"Entity index saved to {path} ({len(self.species)} species)")
+
+    def load(self, path: str = None) -> bool:
+        """
+        Load species names from disk
+
+        Returns:
+            True if the file was found, False otherwise
+        """
+        path = path or self.path
+        if not os.path.exists(path):
+            return False
+        with open(path, 'r', encoding='utf-8') as f:
+            self.species = json.load(f)["species"]
+        self.path = path
+        self._species_matcher = None
+        print(f"Entity index loaded from {path} ({len(self.species)} species)")
+        return True
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+from config.config import Config
+
+
+class IngestManifest:
+    """
+    Record of what is currently indexed, used by incremental ingestion
+
+    Maps each (doc id, field) entry to the hash of the chunks it produced and
+    the point IDs those chunks were stored under. Settings that invalidate every
+    vector (backend, collection/index path, embedding model, name field) are kept
+    alongside; a manifest written with different settings is ignored.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Initialize an empty manifest
+
+        Args:
+            path: JSON file location (default from Config.INGEST_MANIFEST_PATH)
+        """
+        self.path = path or Config.INGEST_MANIFEST_PATH
+        self.settings = {}
+        self.entries = {}  # "doc_id|field" -> {"hash": str, "ids": [point IDs]}
+
+    @staticmethod
+    def entry_key(doc_id: str, field: str) -> str:
+        """Manifest key for one field of one document"""
+        return f"{doc_id}|{field}"
+
+    @staticmethod
+    def content_hash(chunks: List[str], metadata: List[dict]) -> str:
+        """
+        Hash everything that ends up in the store for an entry
+
+        Args:
+            chunks: Chunk texts of the entry (with context prefix)
+            metadata: Chunk metadata dicts of the entry
+
+        Returns:
+            Hex digest
+        """
+        payload = json.dumps([chunks, metadata], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def group_chunks(cls, chunks: List[str], metadata: List[dict]) -> Dict[str, dict]:
+        """
+        Group chunks by (doc id, field) and hash each group
+
+        Args:
+            chunks: Chunk texts, as returned by process_document_with_metadata
+            metadata: Matching chunk metadata dicts
+
+        Returns:
+            Dict of entry key -> {"hash", "chunks", "metadata"}, in ingestion order
+        """
+        groups = {}
+        for chunk, meta in zip(chunks, metadata):
+            group = groups.setdefault(cls.entry_key(meta["id"], meta["field"]), {"chunks": [], "metadata": []})
+            group["chunks"].append(chunk)
+            group["metadata"].append(meta)
+
+        for group in groups.values():
+            group["hash"] = cls.content_hash(group["chunks"], group["metadata"])
+        return groups
+
+    def load(self) -> bool:
+        """
+        Load the manifest from disk
+
+        Returns:
+            True if a manifest was found, False otherwise
+        """
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.settings = data.get("settings", {})
+        self.entries = data.get("entries", {})
+        return True
+
+    def save(self):
+        """Write the manifest to disk (atomically)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"settings": self.settings, "entries": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> Optional[dict]:
+        """Get the recorded entry for a key, or None"""
+        return self.entries.get(key)
+
+    def set(self, key: str, content_hash: str, ids: List):
+        """Record the hash and point IDs of an entry"""
+        self.entries[key] = {"hash": content_hash, "ids": list(ids)}
+
+    def remove(self, key: str):
+        """Forget an entry"""
+        self.entries.pop(key, None)
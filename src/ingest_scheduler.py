@@ -0,0 +1,374 @@
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from config.config import Config
+from src.document_processor import DocumentProcessor
+from src.ingest_manifest import IngestManifest
+
+# Per-process document processor used by chunking workers
+_worker_processor = None
+
+
+def _init_chunk_worker(chunk_size: int, chunk_overlap: int):
+    """Process pool initializer: build the worker's DocumentProcessor once"""
+    global _worker_processor
+    _worker_processor = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    # Per-field chunking logs from N processes would interleave; the scheduler reports progress
+    sys.stdout = open(os.devnull, 'w')
+
+
+def _chunk_document(doc: Dict, name_field: str, metadata_fields: Optional[List[str]],
+                    processor: DocumentProcessor = None) -> Tuple[List[Tuple[List[str], List[Dict]]], float]:
+    """
+    Chunk one document (runs in a worker process, or inline when processor is given)
+
+    Returns:
+        tuple of ([(chunks, chunk_metadata) per field], busy seconds)
+    """
+    started = time.perf_counter()
+    groups = list((processor or _worker_processor).iter_field_chunks([doc], name_field, metadata_fields))
+    return groups, time.perf_counter() - started
+
+
+class _StageStats:
+    """Busy time and item counters of one pipeline stage (thread-safe)"""
+
+    def __init__(self, name: str, workers: int, unit: str):
+        self.name = name
+        self.workers = workers
+        self.unit = unit
+        self.busy_seconds = 0.0
+        self.items = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, items: int):
+        with self._lock:
+            self.busy_seconds += seconds
+            self.items += items
+
+    def report(self, wall_seconds: float) -> Dict:
+        capacity = max(self.workers, 1) * wall_seconds
+        return {
+            "workers": self.workers,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "utilization": round(self.busy_seconds / capacity, 3) if capacity else 0.0,
+            "items": self.items,
+            "unit": self.unit,
+            "throughput_per_second": round(self.items / wall_seconds, 1) if wall_seconds else 0.0
+        }
+
+
+class IngestScheduler:
+    """
+    Three-stage producer/consumer ingest: chunk -> embed -> upload
+
+    - chunk: documents are chunked in a process pool (Config.INGEST_CHUNK_WORKERS);
+      a collector thread keeps document order and cuts fixed-size batches
+    - embed: one thread runs the embedding model with torch intra-op threads
+      pinned to Config.INGEST_EMBED_TORCH_THREADS
+    - upload: uploader threads drain the embedded batches into the vector store
+
+    Stages are connected by bounded queues (Config.INGEST_QUEUE_SIZE batches), so
+    CPU-bound embedding overlaps network-bound uploads and memory stays bounded.
+    A per-stage utilization report shows which stage is the bottleneck.
+    """
+
+    def __init__(self, embedding_generator, vector_store, document_processor: DocumentProcessor,
+                 chunk_workers: int = None, upload_workers: int = None, batch_size: int = None,
+                 queue_size: int = None, embed_torch_threads: int = None, sparse_index=None,
+                 structured_store=None):
+        """
+        Initialize the scheduler
+
+        Args:
+            embedding_generator: EmbeddingGenerator used by the embed stage
+            vector_store: FAISSVectorStore or QdrantVectorStore written by the upload stage
+            document_processor: DocumentProcessor (its chunk settings are copied to workers)
+            chunk_workers: Chunking processes, 0 = chunk in the collector thread (default from Config)
+            upload_workers: Uploader threads (default from Config.INGEST_UPLOAD_WORKERS)
+            batch_size: Chunks per embedding batch (default from Config.INGEST_STREAM_BATCH_SIZE)
+            queue_size: Max batches buffered between stages (default from Config.INGEST_QUEUE_SIZE)
+            embed_torch_threads: torch intra-op threads for the embedder, 0 = unchanged, ignored
+                                 unless the embedder runs the torch backend
+                                 (default from Config.INGEST_EMBED_TORCH_THREADS)
+            sparse_index: Optional BM25Index updated with every uploaded batch
+            structured_store: Optional StructuredStore updated with every uploaded batch
+        """
+        self.embedding_generator = embedding_generator
+        self.vector_store = vector_store
+        self.document_processor = document_processor
+        self.chunk_workers = Config.INGEST_CHUNK_WORKERS if chunk_workers is None else chunk_workers
+        self.upload_workers = max(1, upload_workers or Config.INGEST_UPLOAD_WORKERS)
+        self.batch_size = batch_size or Config.INGEST_STREAM_BATCH_SIZE
+        self.queue_size = queue_size or Config.INGEST_QUEUE_SIZE
+        self.embed_torch_threads = (Config.INGEST_EMBED_TORCH_THREADS
+                                    if embed_torch_threads is None else embed_torch_threads)
+        if getattr(embedding_generator, "backend", None) != "torch":
+            # ONNX Runtime sizes its own thread pool and a remote embedder runs elsewhere:
+            # never import torch just to pin it
+            self.embed_torch_threads = 0
+        self.sparse_index = sparse_index
+        self.structured_store = structured_store
+        self._local_index_lock = threading.Lock()
+
+    def run(self, documents: Iterable[Dict], name_field: str = "name_vn",
+            metadata_fields: List[str] = None, manifest: Optional[IngestManifest] = None,
+            train_buffer_size: int = 0) -> Dict:
+        """
+        Ingest documents through the three stages
+
+        Args:
+            documents: Iterable of document dicts (may be a stream)
+            name_field: Field name for entity name
+            metadata_fields: Metadata fields to chunk (None = processor defaults)
+            manifest: Optional manifest that receives (doc id, field) -> hash -> point IDs
+            train_buffer_size: Vectors to accumulate before the first store write
+                               (lets an untrained IVF index train on a proper sample)
+
+        Returns:
+            Dictionary with counts, wall time and the per-stage report
+        """
+        self._stop = threading.Event()
+        self._errors = []
+        self._documents = 0
+        self._stages = {
+            "chunk": _StageStats("chunk", self.chunk_workers, "docs"),
+            "embed": _StageStats("embed", 1, "chunks"),
+            "upload": _StageStats("upload", self.upload_workers, "chunks")
+        }
+        embed_queue = queue.Queue(maxsize=self.queue_size)
+        upload_queue = queue.Queue(maxsize=self.queue_size)
+
+        print(f"Ingest scheduler: {self.chunk_workers or 'inline'} chunk workers, 1 embedder "
+              f"(torch threads: {self.embed_torch_threads or 'default'}), {self.upload_workers} uploaders, "
+              f"batches of {self.batch_size} chunks")
+
+        threads = [threading.Thread(target=self._collect, name="ingest-chunk", daemon=True,
+                                    args=(documents, name_field, metadata_fields, manifest, embed_queue)),
+                   threading.Thread(target=self._embed, name="ingest-embed", daemon=True,
+                                    args=(embed_queue, upload_queue, train_buffer_size))]
+        threads += [threading.Thread(target=self._upload, name=f"ingest-upload-{i}", daemon=True,
+                                     args=(upload_queue,))
+                    for i in range(self.upload_workers)]
+
+        wall_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        # Progress report while the stages run
+        next_report = wall_start + Config.INGEST_PROGRESS_SECONDS
+        while any(thread.is_alive() for thread in threads):
+            threads[-1].join(timeout=0.2)
+            if Config.INGEST_PROGRESS_SECONDS and time.perf_counter() >= next_report:
+                self._print_progress(time.perf_counter() - wall_start)
+                next_report += Config.INGEST_PROGRESS_SECONDS
+            if self._errors:
+                self._stop.set()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - wall_start
+
+        if self._errors:
+            raise self._errors[0]
+
+        report = {name: stage.report(wall_seconds) for name, stage in self._stages.items()}
+        bottleneck = max(report, key=lambda name: report[name]["utilization"])
+        self._print_report(report, bottleneck, wall_seconds)
+
+        return {
+            "total_documents": self._documents,
+            "total_chunks": self._stages["embed"].items,
+            "total_embeddings": self._stages["upload"].items,
+            "wall_seconds": round(wall_seconds, 2),
+            "stage_seconds": {name: stage["busy_seconds"] for name, stage in report.items()},
+            "stages": report,
+            "bottleneck": bottleneck
+        }
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Blocking put that gives up once the run is stopping"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        """Blocking get that returns None once the run is stopping"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _collect(self, documents, name_field, metadata_fields, manifest, embed_queue):
+        """Chunk stage: fan documents out to the process pool, emit ordered fixed-size batches"""
+        pool = None
+        try:
+            if self.chunk_workers > 0:
+                processor = self.document_processor
+                # "spawn": the embed/upload threads are already running (and may be
+                # loading torch), and forking a multi-threaded process can deadlock
+                pool = ProcessPoolExecutor(max_workers=self.chunk_workers,
+                                           mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=_init_chunk_worker,
+                                           initargs=(processor.chunk_size, processor.chunk_overlap))
+
+            chunks, metadata = [], []
+            in_flight = deque()
+
+            def drain_one():
+                groups, seconds = in_flight.popleft().result()
+                self._stages["chunk"].record(seconds, 1)
+                for field_chunks, field_metadata in groups:
+                    if field_chunks and manifest is not None:
+                        key = IngestManifest.entry_key(field_metadata[0]["id"], field_metadata[0]["field"])
+                        manifest.set(key, IngestManifest.content_hash(field_chunks, field_metadata),
+                                     self.vector_store.make_ids(field_metadata, field_chunks))
+                    chunks.extend(field_chunks)
+                    metadata.extend(field_metadata)
+
+            def emit(final: bool = False) -> bool:
+                nonlocal chunks, metadata
+                while len(chunks) >= self.batch_size or (final and chunks):
+                    if not self._put(embed_queue, (chunks[:self.batch_size], metadata[:self.batch_size])):
+                        return False
+                    chunks, metadata = chunks[self.batch_size:], metadata[self.batch_size:]
+                return True
+
+            for doc in documents:
+                if self._stop.is_set():
+                    return
+                self._documents += 1
+                if pool is None:
+                    future = _InlineResult(_chunk_document(doc, name_field, metadata_fields, self.document_processor))
+                else:
+                    future = pool.submit(_chunk_document, doc, name_field, metadata_fields)
+                in_flight.append(future)
+
+                # Keep a few documents per worker queued, in submission order
+                while len(in_flight) > max(1, 2 * self.chunk_workers):
+                    drain_one()
+                    if not emit():
+                        return
+
+            while in_flight:
+                drain_one()
+            emit(final=True)
+        except Exception as e:
+            self._errors.append(e)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            self._put(embed_queue, None)
+
+    def _embed(self, embed_queue, upload_queue, train_buffer_size):
+        """Embed stage: one thread, torch intra-op threads pinned (torch backend)"""
+        previous_threads = None
+        try:
+            if self.embed_torch_threads:
+                import torch
+                previous_threads = torch.get_num_threads()
+                torch.set_num_threads(self.embed_torch_threads)
+
+            buffered = []
+            while True:
+                item = self._get(embed_queue)
+                if item is None:
+                    break
+                chunks, metadata = item
+
+                started = time.perf_counter()
+                embeddings = self.embedding_generator.generate_embeddings(chunks, show_progress=False)
+                self._stages["embed"].record(time.perf_counter() - started, len(chunks))
+
+                if train_buffer_size:
+                    buffered.append((embeddings, chunks, metadata))
+                    if sum(len(b[1]) for b in buffered) < train_buffer_size:
+                        continue
+                    item, buffered, train_buffer_size = _merge_batches(buffered), [], 0
+                else:
+                    item = (embeddings, chunks, metadata)
+                if not self._put(upload_queue, item):
+                    return
+
+            if buffered:
+                self._put(upload_queue, _merge_batches(buffered))
+        except Exception as e:
+            self._errors.append(e)
+        finally:
+            if previous_threads is not None:
+                import torch
+                torch.set_num_threads(previous_threads)
+            for _ in range(self.upload_workers):
+                self._put(upload_queue, None)
+
+    def _upload(self, upload_queue):
+        """Upload stage: drain embedded batches into the vector store"""
+        try:
+            while True:
+                item = self._get(upload_queue)
+                if item is None:
+                    return
+                embeddings, chunks, metadata = item
+                started = time.perf_counter()
+                if self.vector_store.supports_concurrent_writes:
+                    # The uploader threads are the concurrency: no process pool per batch
+                    self.vector_store.add_embeddings(embeddings, chunks, metadata=metadata, parallel=1)
+                else:
+                    self.vector_store.add_embeddings(embeddings, chunks, metadata=metadata)
+                if self.sparse_index is not None or self.structured_store is not None:
+                    ids = self.vector_store.make_ids(metadata, chunks)
+                    with self._local_index_lock:
+                        if self.sparse_index is not None:
+                            self.sparse_index.add(chunks, metadata, ids)
+                        if self.structured_store is not None:
+                            self.structured_store.add(embeddings, chunks, metadata, ids)
+                self._stages["upload"].record(time.perf_counter() - started, len(chunks))
+        except Exception as e:
+            self._errors.append(e)
+            self._stop.set()
+
+    def _print_progress(self, elapsed: float):
+        """One-line progress update"""
+        uploaded = self._stages["upload"].items
+        print(f"⏳ [{elapsed:6.1f}s] docs read: {self._documents} | chunks embedded: {self._stages['embed'].items} "
+              f"| uploaded: {uploaded} ({uploaded / elapsed:.1f} chunks/s)")
+
+    @staticmethod
+    def _print_report(report: Dict, bottleneck: str, wall_seconds: float):
+        """Per-stage utilization table"""
+        print(f"\n📊 Ingest stages (wall time {wall_seconds:.2f}s):")
+        print(f"  {'Stage':<8} {'Workers':>7} {'Busy (s)':>9} {'Util':>7} {'Items':>8} {'Rate/s':>9}")
+        for name, stage in report.items():
+            print(f"  {name:<8} {stage['workers'] or 'inline':>7} {stage['busy_seconds']:>9.2f} "
+                  f"{stage['utilization']:>7.1%} {stage['items']:>8} {stage['throughput_per_second']:>9.1f}")
+        print(f"  Bottleneck: {bottleneck}")
+
+
+class _InlineResult:
+    """Future-like wrapper for chunk results computed in the collector thread"""
+
+    def __init__(self, result):
+        self._result = result
+
+    def result(self):
+        return self._result
+
+
+def _merge_batches(batches: List[tuple]) -> tuple:
+    """Concatenate buffered (embeddings, chunks, metadata) batches"""
+    embeddings = np.vstack([b[0] for b in batches])
+    chunks = [chunk for b in batches for chunk in b[1]]
+    metadata = [meta for b in batches for meta in b[2]]
+    return embeddings, chunks, metadata
@@ -1,15 +1,26 @@
 from google import genai
 from google.genai import types
 from config.config import Config
-from typing import List
+from typing import Iterator, List
 
 class GeminiLLM:
     """Gemini 2.5 Flash LLM for generating responses"""
     
-    def __init__(self):
-        """Initialize Gemini LLM client"""
-        Config.validate()
-        self.client = genai.Client(api_key=Config.GOOGLE_API_KEY)
+    # Failed calls return an answer starting with this (never cached)
+    ERROR_PREFIX = "Sorry, I encountered an error while generating the response"
+    
+    def __init__(self, client=None):
+        """
+        Initialize Gemini LLM client
+        
+        Args:
+            client: Optional pre-built client (e.g. a stub for tests); must expose
+                    models.generate_content and aio.models.generate_content
+        """
+        if client is None:
+            Config.validate()
+            client = genai.Client(api_key=Config.GOOGLE_API_KEY)
+        self.client = client
         self.model = Config.LLM_MODEL
         
     def generate_response(self, query: str, context: List[str]) -> str:
@@ -23,6 +34,78 @@ class GeminiLLM:
         Returns:
             Generated response string
         """
+        try:
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=self._build_contents(self._build_prompt(query, context)),
+                config=self._generation_config()
+            )
+            
+            final_response = response.candidates[0].content.parts[0].text
+            return final_response
+            
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            return f"{self.ERROR_PREFIX}: {str(e)}"
+    
+    async def agenerate_response(self, query: str, context: List[str]) -> str:
+        """
+        Generate response asynchronously (non-blocking network wait)
+        
+        Args:
+            query: User's question
+            context: List of relevant text chunks from vector search
+            
+        Returns:
+            Generated response string
+        """
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=self._build_contents(self._build_prompt(query, context)),
+                config=self._generation_config()
+            )
+            
+            final_response = response.candidates[0].content.parts[0].text
+            return final_response
+            
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            return f"{self.ERROR_PREFIX}: {str(e)}"
+    
+    def generate_response_stream(self, query: str, context: List[str]) -> Iterator[str]:
+        """
+        Generate response as a stream of text deltas
+        
+        Args:
+            query: User's question
+            context: List of relevant text chunks from vector search
+            
+        Yields:
+            Text deltas as they arrive from the model
+            
+        Raises:
+            Exception: if the request or the stream fails (possibly after some deltas),
+                       so callers can tell a truncated answer from a complete one
+        """
+        try:
+            stream = self.client.models.generate_content_stream(
+                model=self.model,
+                contents=self._build_contents(self._build_prompt(query, context)),
+                config=self._generation_config()
+            )
+            
+            for chunk in stream:
+                text = chunk.text
+                if text:
+                    yield text
+                    
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            raise
+    
+    def _build_prompt(self, query: str, context: List[str]) -> str:
+        """Build the expert-answer prompt from the question and retrieved context"""
         # Prepare context
         context_text = "\n\n".join([f"Context {i+1}: {text}" for i, text in enumerate(context)])
         
@@ -55,36 +138,26 @@ With the question structure including the main content as follows, 3 to 5 questi
 -Human relevance
 -Symptoms when bitten
 -How to handle"""
-
-        try:
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_text(text=prompt),
-                    ],
-                ),
-            ]
-            
-            # Configure generation with thinking disabled
-            generate_content_config = types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(
-                    thinking_budget=0,
-                ),
-            )
-            
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=contents,
-                config=generate_content_config
-            )
-            
-            final_response = response.candidates[0].content.parts[0].text
-            return final_response
-            
-        except Exception as e:
-            print(f"Error generating response: {e}")
-            return f"Sorry, I encountered an error while generating the response: {str(e)}"
+        return prompt
+    
+    def _build_contents(self, text: str) -> list:
+        """Wrap prompt text as a single user turn"""
+        return [
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part.from_text(text=text),
+                ],
+            ),
+        ]
+    
+    def _generation_config(self) -> types.GenerateContentConfig:
+        """Configure generation with thinking disabled"""
+        return types.GenerateContentConfig(
+            thinking_config=types.ThinkingConfig(
+                thinking_budget=0,
+            ),
+        )
     
     def generate_simple_response(self, text: str) -> str:
         """
@@ -97,25 +170,10 @@ With the question structure including the main content as follows, 3 to 5 questi
             Generated response string
         """
         try:
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_text(text=text),
-                    ],
-                ),
-            ]
-            
-            generate_content_config = types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(
-                    thinking_budget=0,
-                ),
-            )
-            
             response = self.client.models.generate_content(
                 model=self.model,
-                contents=contents,
-                config=generate_content_config
+                contents=self._build_contents(text),
+                config=self._generation_config()
             )
             
             final_response = response.candidates[0].content.parts[0].text
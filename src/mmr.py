@@ -0,0 +1,47 @@
+from typing import List
+import numpy as np
+from config.config import Config
+
+
+def mmr_select(vectors: np.ndarray, relevance: List[float], k: int, lambda_: float = None) -> List[int]:
+    """
+    Maximal marginal relevance: pick k candidates that are relevant but not redundant
+
+    Each step takes the candidate maximizing
+        lambda * relevance - (1 - lambda) * max cosine similarity to the picked ones
+    with one pairwise similarity matmul up front and a running max, so a step
+    is a vector update over the candidates.
+
+    Args:
+        vectors: Candidate embeddings (n, dimension); zero rows count as unrelated to every other candidate
+        relevance: Candidate scores (any scale, min-max normalized here)
+        k: Number of candidates to keep
+        lambda_: Relevance / diversity trade-off (default from Config.MMR_LAMBDA, 1 = relevance only)
+
+    Returns:
+        Indices of the picked candidates, in pick order
+    """
+    lambda_ = Config.MMR_LAMBDA if lambda_ is None else lambda_
+    relevance = np.asarray(relevance, dtype='float32')
+    if len(relevance) <= k:
+        return list(range(len(relevance)))
+
+    spread = relevance.max() - relevance.min()
+    relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones_like(relevance)
+
+    vectors = np.asarray(vectors, dtype='float32')
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms > 0, norms, 1)
+    similarity = vectors @ vectors.T
+
+    picked = [int(np.argmax(relevance))]
+    max_similarity = similarity[picked[0]].copy()
+    available = np.ones(len(relevance), dtype=bool)
+    available[picked[0]] = False
+    for _ in range(k - 1):
+        scores = np.where(available, lambda_ * relevance - (1 - lambda_) * max_similarity, -np.inf)
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return picked
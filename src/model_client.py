@@ -0,0 +1,165 @@
+import base64
+import json
+import urllib.error
+import urllib.request
+from typing import List, Optional, Union
+import numpy as np
+from config.config import Config
+from src.embedding_backends import embedding_cache_id
+from src.embedding_cache import QueryEmbeddingCache
+
+
+def encode_array(array: np.ndarray) -> dict:
+    """JSON-safe float32 array (base64 of the raw bytes, exact and ~4x smaller than float lists)"""
+    array = np.ascontiguousarray(array, dtype='float32')
+    return {"shape": list(array.shape), "data": base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def decode_array(payload: dict) -> np.ndarray:
+    """Inverse of encode_array"""
+    return np.frombuffer(base64.b64decode(payload["data"]), dtype='float32').reshape(payload["shape"]).copy()
+
+
+class ModelServerClient:
+    """Thin HTTP client for the warm model server (src/model_server.py)"""
+
+    def __init__(self, host: str = None, port: int = None, timeout: float = None):
+        """
+        Args:
+            host: Server host (default from Config.MODEL_SERVER_HOST)
+            port: Server port (default from Config.MODEL_SERVER_PORT)
+            timeout: Request timeout in seconds (default from Config.MODEL_SERVER_TIMEOUT)
+        """
+        self.host = host or Config.MODEL_SERVER_HOST
+        self.port = port or Config.MODEL_SERVER_PORT
+        self.timeout = timeout or Config.MODEL_SERVER_TIMEOUT
+        self.url = f"http://{self.host}:{self.port}"
+        self.info = {}
+
+    @classmethod
+    def connect(cls) -> Optional["ModelServerClient"]:
+        """
+        Client for a running server whose embedding model matches this process' Config
+
+        Returns:
+            Connected client, or None if no server is running (or it embeds differently)
+        """
+        client = cls()
+        try:
+            client.info = client._request("GET", "/health", timeout=Config.MODEL_SERVER_CONNECT_TIMEOUT)
+        except (urllib.error.URLError, OSError, ValueError):
+            return None
+
+        expected = embedding_cache_id()
+        if client.info.get("embedding_model") != expected:
+            print(f"⚠️  Model server at {client.url} serves {client.info.get('embedding_model')}, "
+                  f"expected {expected}: loading models locally")
+            return None
+        return client
+
+    def _request(self, method: str, path: str, body: dict = None, timeout: float = None) -> dict:
+        """Send one JSON request and decode the JSON response"""
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(
+            self.url + path, data=data, method=method,
+            headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            message = json.loads(e.read().decode('utf-8') or "{}").get("error", str(e))
+            raise RuntimeError(f"Model server error on {path}: {message}") from e
+
+    def encode(self, texts: List[str], kind: str = "passage") -> np.ndarray:
+        """
+        Embed texts on the server
+
+        Args:
+            texts: Raw texts (the server adds the "passage: " / "query: " prefix)
+            kind: "passage" (embedding cache + token-budget batching) or "query"
+
+        Returns:
+            numpy array of normalized float32 embeddings
+        """
+        response = self._request("POST", "/encode", {"texts": texts, "kind": kind})
+        return decode_array(response["embeddings"])
+
+    def rerank(self, pairs: List[List[str]]) -> np.ndarray:
+        """
+        Score (query, passage) pairs with the server's cross-encoder
+
+        Returns:
+            float32 array with one relevance score per pair
+        """
+        response = self._request("POST", "/rerank", {"pairs": pairs})
+        return decode_array(response["scores"])
+
+
+class RemoteEmbeddingGenerator:
+    """EmbeddingGenerator served by a warm model server (same public methods)"""
+
+    def __init__(self, client: ModelServerClient):
+        """
+        Args:
+            client: Connected ModelServerClient
+        """
+        self.client = client
+        self.cache_id = client.info["embedding_model"]
+        self.dimension = client.info["dimension"]
+
+        # Questions are still cached in-process (no round trip for repeats)
+        self.query_cache = QueryEmbeddingCache()
+
+    def generate_embeddings(self, texts: Union[str, List[str]], batch_size: int = None, show_progress: bool = True) -> np.ndarray:
+        """Passage embeddings (batch_size / show_progress are handled server-side)"""
+        if isinstance(texts, str):
+            texts = [texts]
+        if not texts:
+            return np.zeros((0, self.dimension), dtype='float32')
+
+        try:
+            print(f"  Generating {len(texts)} embeddings on model server {self.client.url}...")
+            embeddings = self.client.encode(texts, kind="passage")
+            print(f"  ✓ Successfully generated {len(embeddings)} embeddings")
+            return embeddings
+        except Exception as e:
+            print(f"Error generating embeddings: {e}")
+            raise
+
+    def generate_single_embedding(self, text: str) -> np.ndarray:
+        """Query embedding for one question"""
+        return self.generate_query_embeddings([text])[0]
+
+    def generate_query_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Query embeddings for many questions (one request for all cache misses)"""
+        try:
+            embeddings = [self.query_cache.get(text) for text in texts]
+            misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+            if misses:
+                new_embeddings = self.client.encode([texts[i] for i in misses], kind="query")
+                for i, embedding in zip(misses, new_embeddings):
+                    self.query_cache.put(texts[i], embedding)
+                    embeddings[i] = embedding
+
+            return np.vstack(embeddings).astype('float32') if embeddings else np.zeros((0, self.dimension), dtype='float32')
+
+        except Exception as e:
+            print(f"Error generating query embeddings: {e}")
+            raise
+
+    def close(self):
+        """Nothing to release (the server owns the model)"""
+
+
+class RemoteCrossEncoderModel:
+    """Cross-encoder served by a warm model server, a drop-in for CrossEncoder.predict"""
+
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+
+    def predict(self, sentences: List[List[str]], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        if not sentences:
+            return np.zeros(0, dtype='float32')
+        return self.client.rerank([list(pair) for pair in sentences])
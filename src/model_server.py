@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config.config import Config
+from src.model_client import encode_array
+
+
+class ModelServer:
+    """
+    Long-lived localhost HTTP server keeping the embedding model and cross-encoder warm
+
+    CLI runs, evaluation scripts and tests connect through ModelServerClient
+    (RAGPipeline does so automatically when the server is running) instead of
+    loading both models from disk on every invocation.
+
+    Endpoints (JSON; arrays are base64 float32, see encode_array):
+        GET  /health  -> served models and embedding dimension
+        POST /encode  {"texts": [...], "kind": "passage" | "query"} -> {"embeddings": array}
+        POST /rerank  {"pairs": [[query, passage], ...]} -> {"scores": array}
+    """
+
+    def __init__(self, host: str = None, port: int = None, embedding_generator=None, reranker=None):
+        """
+        Load the models (unless given) and bind the server
+
+        Args:
+            host: Bind address (default from Config.MODEL_SERVER_HOST, keep it on localhost)
+            port: Port (default from Config.MODEL_SERVER_PORT)
+            embedding_generator: Already-loaded EmbeddingGenerator
+            reranker: Already-loaded CrossEncoderReranker (loaded if Config.USE_RERANKING)
+        """
+        if embedding_generator is None:
+            from src.embeddings import EmbeddingGenerator
+            embedding_generator = EmbeddingGenerator()
+        if reranker is None and Config.USE_RERANKING:
+            from src.reranker import CrossEncoderReranker
+            reranker = CrossEncoderReranker()
+
+        self.embedding_generator = embedding_generator
+        self.reranker = reranker
+        # One request per model at a time (the embedding cache is not thread-safe);
+        # encode and rerank requests still run concurrently
+        self._encode_lock = threading.Lock()
+        self._rerank_lock = threading.Lock()
+
+        self.host = host or Config.MODEL_SERVER_HOST
+        self.port = port or Config.MODEL_SERVER_PORT
+        self.httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    def info(self) -> dict:
+        """Served models (clients only connect if the embedding model matches theirs)"""
+        return {
+            "status": "ok",
+            "embedding_model": self.embedding_generator.cache_id,
+            "dimension": self.embedding_generator.model.get_sentence_embedding_dimension(),
+            "reranker_model": self.reranker.model_name if self.reranker is not None else None,
+            "reranker_backend": self.reranker.backend if self.reranker is not None else None
+        }
+
+    def encode(self, texts, kind: str = "passage"):
+        """Passage (cached, token-budget batched) or query embeddings"""
+        with self._encode_lock:
+            if kind == "query":
+                return self.embedding_generator.generate_query_embeddings(texts)
+            if kind != "passage":
+                raise ValueError(f"Unknown kind '{kind}'. Expected 'passage' or 'query'")
+            return self.embedding_generator.generate_embeddings(texts, show_progress=False)
+
+    def rerank(self, pairs):
+        """Cross-encoder scores for (query, passage) pairs"""
+        if self.reranker is None:
+            raise ValueError("Re-ranking is disabled on this server")
+        with self._rerank_lock:
+            return self.reranker.model.predict(pairs)
+
+    def _make_handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/health":
+                    self._send(200, server.info())
+                else:
+                    self._send(404, {"error": f"Unknown endpoint {self.path}"})
+
+            def do_POST(self):
+                started = time.perf_counter()
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                    if self.path == "/encode":
+                        texts = body["texts"]
+                        result = {"embeddings": encode_array(server.encode(texts, body.get("kind", "passage")))}
+                        summary = f"encode {body.get('kind', 'passage')}: {len(texts)} texts"
+                    elif self.path == "/rerank":
+                        pairs = body["pairs"]
+                        result = {"scores": encode_array(server.rerank(pairs))}
+                        summary = f"rerank: {len(pairs)} pairs"
+                    else:
+                        self._send(404, {"error": f"Unknown endpoint {self.path}"})
+                        return
+                except (KeyError, ValueError) as e:
+                    self._send(400, {"error": str(e)})
+                    return
+                except Exception as e:
+                    print(f"❌ Error handling {self.path}: {e}")
+                    self._send(500, {"error": str(e)})
+                    return
+                self._send(200, result)
+                print(f"  {summary} in {time.perf_counter() - started:.3f}s")
+
+            def _send(self, status: int, payload: dict):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                # Requests are summarized in do_POST
+                pass
+
+        return _Handler
+
+    def serve_forever(self):
+        """Serve until interrupted (Ctrl+C)"""
+        print(f"🚀 Model server listening on http://{self.host}:{self.port}")
+        print(f"   Embedding model: {self.embedding_generator.cache_id}")
+        if self.reranker is not None:
+            print(f"   Cross-encoder: {self.reranker.model_name} ({self.reranker.backend})")
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStopping model server...")
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Close the socket and release the models"""
+        self.httpd.server_close()
+        self.embedding_generator.close()
@@ -0,0 +1,148 @@
+import json
+import os
+from typing import List
+from config.config import Config
+from src.embedding_backends import onnx_export_path
+
+
+def export_embedding_model(model_name: str = Config.EMBEDDING_MODEL, export_dir: str = None,
+                           quantize: bool = True, opset: int = 17) -> str:
+    """
+    Export a sentence-transformers embedding model to ONNX (+ dynamic int8 copy)
+
+    Writes model.onnx (transformer, outputs last_hidden_state), model_int8.onnx,
+    the tokenizer files and export_info.json (dimension, max_seq_length, pooling),
+    so OnnxEmbeddingModel can run fully offline from the directory.
+
+    Args:
+        model_name: Embedding model (loaded from the local HuggingFace cache)
+        export_dir: Output directory (default: onnx_export_path(model_name))
+        quantize: Also write a dynamically int8-quantized model
+        opset: ONNX opset version
+
+    Returns:
+        Export directory
+    """
+    from sentence_transformers import SentenceTransformer
+
+    export_dir = export_dir or onnx_export_path(model_name)
+    os.makedirs(export_dir, exist_ok=True)
+
+    print(f"Loading {model_name} for ONNX export...")
+    model = SentenceTransformer(model_name, device='cpu')
+    tokenizer = model.tokenizer
+    pooling = "mean" if getattr(model[1], "pooling_mode_mean_tokens", True) else "cls"
+
+    sample = tokenizer(["passage: Rắn lục cườm có độc không?"], return_tensors="pt")
+    input_names = _export_transformer(
+        model[0].auto_model, "last_hidden_state", sample, export_dir, opset
+    )
+    tokenizer.save_pretrained(export_dir)
+    if quantize:
+        _quantize(export_dir)
+
+    _write_info(export_dir, {
+        "model_name": model_name,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "pooling": pooling,
+        "input_names": input_names,
+        "quantized": quantize
+    })
+    return export_dir
+
+
+def export_reranker_model(model_name: str = Config.CROSS_ENCODER_MODEL, export_dir: str = None,
+                          quantize: bool = True, opset: int = 17) -> str:
+    """
+    Export a sentence-transformers cross-encoder to ONNX (+ dynamic int8 copy)
+
+    Writes model.onnx (sequence classifier, outputs logits), model_int8.onnx,
+    the tokenizer files and export_info.json (max_seq_length, activation),
+    so OnnxCrossEncoderModel can run fully offline from the directory.
+
+    Args:
+        model_name: Cross-encoder model (loaded from the local HuggingFace cache)
+        export_dir: Output directory (default: onnx_export_path(model_name))
+        quantize: Also write a dynamically int8-quantized model
+        opset: ONNX opset version
+
+    Returns:
+        Export directory
+    """
+    from sentence_transformers import CrossEncoder
+
+    export_dir = export_dir or onnx_export_path(model_name)
+    os.makedirs(export_dir, exist_ok=True)
+
+    print(f"Loading {model_name} for ONNX export...")
+    model = CrossEncoder(model_name, device='cpu')
+    tokenizer = model.tokenizer
+    # predict() applies this to the logits (Sigmoid for most 1-label cross-encoders)
+    activation = getattr(model, "activation_fn", None) or getattr(model, "default_activation_function", None)
+    activation = "sigmoid" if type(activation).__name__ == "Sigmoid" else "identity"
+
+    sample = tokenizer(["Rắn lục cườm có độc không?"], ["Rắn lục cườm là loài rắn độc."], return_tensors="pt")
+    input_names = _export_transformer(model.model, "logits", sample, export_dir, opset)
+    tokenizer.save_pretrained(export_dir)
+    if quantize:
+        _quantize(export_dir)
+
+    _write_info(export_dir, {
+        "model_name": model_name,
+        "max_seq_length": getattr(model, "max_length", None) or tokenizer.model_max_length,
+        "activation": activation,
+        "input_names": input_names,
+        "quantized": quantize
+    })
+    return export_dir
+
+
+def _export_transformer(transformer, output_name: str, sample, export_dir: str, opset: int) -> List[str]:
+    """Export a HuggingFace model to {export_dir}/model.onnx with dynamic batch/sequence axes"""
+    import torch
+
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class _SingleOutput(torch.nn.Module):
+        """Positional-input wrapper returning one output tensor"""
+
+        def __init__(self, transformer):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *inputs):
+            return getattr(self.transformer(**dict(zip(input_names, inputs))), output_name)
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes[output_name] = {0: "batch"} if output_name == "logits" else {0: "batch", 1: "sequence"}
+    model_path = os.path.join(export_dir, "model.onnx")
+
+    print(f"Exporting to {model_path} (opset {opset})...")
+    with torch.no_grad():
+        torch.onnx.export(
+            _SingleOutput(transformer.eval()),
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+    return input_names
+
+
+def _quantize(export_dir: str):
+    """Write a dynamically int8-quantized copy of model.onnx (weights int8, activations quantized at runtime)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = os.path.join(export_dir, "model_int8.onnx")
+    print(f"Quantizing (dynamic int8) to {int8_path}...")
+    quantize_dynamic(os.path.join(export_dir, "model.onnx"), int8_path, weight_type=QuantType.QInt8)
+
+
+def _write_info(export_dir: str, info: dict):
+    """Write export_info.json (read back by load_onnx_export)"""
+    with open(os.path.join(export_dir, "export_info.json"), 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+    print(f"✓ ONNX export written to {export_dir}")
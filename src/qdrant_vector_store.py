@@ -1,33 +1,76 @@
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.local.qdrant_local import QdrantLocal
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, MatchAny,
+    PayloadSchemaType, QueryRequest, PointIdsList
+)
 import numpy as np
 from typing import List, Tuple, Optional
 from config.config import Config
+from src.document_processor import DocumentProcessor
 import uuid
 import time
 
+# Namespace for deterministic point IDs (uuid5 of the chunk key)
+POINT_ID_NAMESPACE = uuid.UUID("5b2f8c1e-9d43-4a7e-8f0a-3c6d2e1b7a94")
+
+
+def make_point_id(metadata: Optional[dict], text: str) -> str:
+    """
+    Deterministic Qdrant point ID for a chunk
+    
+    Derived from (doc id, field, chunk ordinal) when metadata is available, else
+    from the text content, so re-ingesting the same chunk upserts instead of duplicating.
+    
+    Args:
+        metadata: Chunk metadata dict (may be None)
+        text: Chunk text
+        
+    Returns:
+        UUID string
+    """
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, DocumentProcessor.chunk_key(metadata, text)))
+
 class QdrantVectorStore:
     """Qdrant-based vector store for similarity search"""
     
-    def __init__(self):
-        """Initialize Qdrant vector store"""
+    def __init__(self, client: QdrantClient = None, collection_name: str = None):
+        """
+        Initialize Qdrant vector store
+        
+        Args:
+            client: Optional pre-built client (e.g. QdrantClient(":memory:") for local runs)
+            collection_name: Collection to use (default from Config.QDRANT_COLLECTION_NAME)
+        """
         self.dimension = Config.VECTOR_DIMENSION
-        self.collection_name = Config.QDRANT_COLLECTION_NAME
+        self.collection_name = collection_name or Config.QDRANT_COLLECTION_NAME
         self.client = None
         self.texts = []  # Local cache for texts (optional, for compatibility)
         
+        # Cached collection state: avoids a get_collection round trip per search
+        self._points_count = None
+        self._count_refreshed_at = 0.0
+        
         # Initialize Qdrant client
-        self._initialize_client()
+        self._initialize_client(client)
         
-    def _initialize_client(self):
+    @property
+    def supports_concurrent_writes(self) -> bool:
+        """Whether add_embeddings may be called from several threads (not for local/in-memory mode)"""
+        return not isinstance(getattr(self.client, "_client", None), QdrantLocal)
+    
+    def _initialize_client(self, client: QdrantClient = None):
         """Initialize Qdrant client and create collection if needed"""
         try:
-            print(f"Connecting to Qdrant at {Config.QDRANT_URL}...")
-            self.client = QdrantClient(
-                url=Config.QDRANT_URL,
-                api_key=Config.QDRANT_API_KEY,
-                timeout=300  # 5 minutes timeout for large uploads
-            )
+            if client is not None:
+                self.client = client
+            else:
+                print(f"Connecting to Qdrant at {Config.QDRANT_URL}...")
+                self.client = QdrantClient(
+                    url=Config.QDRANT_URL,
+                    api_key=Config.QDRANT_API_KEY,
+                    timeout=300  # 5 minutes timeout for large uploads
+                )
             
             # Check if collection exists, create if not
             collections = self.client.get_collections().collections
@@ -45,6 +88,8 @@ class QdrantVectorStore:
                 print(f"✓ Collection '{self.collection_name}' created successfully!")
             else:
                 print(f"✓ Using existing collection '{self.collection_name}'")
+            
+            self._ensure_payload_indexes()
                 
         except Exception as e:
             print(f"Error initializing Qdrant client: {e}")
@@ -71,127 +116,367 @@ class QdrantVectorStore:
             )
             print(f"Created new Qdrant collection '{self.collection_name}' with dimension {self.dimension}")
             
+            self._set_points_count(0)
+            self._ensure_payload_indexes()
+            
         except Exception as e:
             print(f"Error creating collection: {e}")
             raise
     
-    def add_embeddings(self, embeddings: np.ndarray, texts: List[str], metadata: Optional[List[dict]] = None, batch_size: int = 50):
+    def _get_points_count(self, force_refresh: bool = False) -> int:
         """
-        Add embeddings and corresponding texts to Qdrant in batches
+        Get the collection's point count from the local cache
+        
+        The count is refreshed from Qdrant when forced (after writes or an empty
+        search) or once it is older than Config.QDRANT_COUNT_REFRESH_SECONDS.
+        
+        Args:
+            force_refresh: Always fetch the count from Qdrant
+            
+        Returns:
+            Number of points in the collection
+        """
+        age = time.monotonic() - self._count_refreshed_at
+        if force_refresh or self._points_count is None or age > Config.QDRANT_COUNT_REFRESH_SECONDS:
+            collection_info = self.client.get_collection(collection_name=self.collection_name)
+            self._set_points_count(collection_info.points_count or 0)
+        return self._points_count
+    
+    def _set_points_count(self, points_count: int):
+        """Update the cached point count"""
+        self._points_count = points_count
+        self._count_refreshed_at = time.monotonic()
+    
+    def _ensure_payload_indexes(self):
+        """Create keyword payload indexes used by filtered search (idempotent)"""
+        for field_name in Config.PAYLOAD_INDEX_FIELDS:
+            try:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=PayloadSchemaType.KEYWORD
+                )
+            except Exception as e:
+                print(f"  ⚠️  Could not create payload index on '{field_name}': {e}")
+    
+    @staticmethod
+    def _build_filter(filter: Optional[dict]) -> Optional[Filter]:
+        """
+        Convert a {field: value or list of values} filter into a Qdrant Filter
+        
+        Args:
+            filter: Payload filter; all conditions must match
+            
+        Returns:
+            Qdrant Filter or None
+        """
+        if not filter:
+            return None
+        
+        conditions = []
+        for field_name, wanted in filter.items():
+            if isinstance(wanted, (list, tuple, set)):
+                conditions.append(FieldCondition(key=field_name, match=MatchAny(any=list(wanted))))
+            else:
+                conditions.append(FieldCondition(key=field_name, match=MatchValue(value=wanted)))
+        return Filter(must=conditions)
+    
+    @staticmethod
+    def _payload_metadata(payload: dict) -> dict:
+        """Strip stored text/index from a point payload, leaving chunk metadata"""
+        return {key: value for key, value in payload.items() if key not in ("text", "index")}
+    
+    def add_embeddings(self, embeddings: np.ndarray, texts: List[str], metadata: Optional[List[dict]] = None,
+                       batch_size: int = 50, ids: Optional[List[str]] = None, parallel: int = None):
+        """
+        Add (upsert) embeddings and corresponding texts to Qdrant
+        
+        Point IDs are deterministic (see make_point_id), so repeating or retrying
+        an ingest overwrites existing points instead of duplicating them.
         
         Args:
             embeddings: numpy array of embeddings
             texts: list of corresponding text chunks
             metadata: optional list of metadata dicts for each text
-            batch_size: number of points to upload per batch (default 50 for stability with large uploads)
+            batch_size: number of points per request in serial mode (default 50 for stability with large uploads)
+            ids: optional explicit point IDs (default derived from metadata/text)
+            parallel: upload worker processes in bulk mode (default from Config.QDRANT_UPLOAD_PARALLEL;
+                      callers uploading from several threads pass 1)
         """
         try:
-            embeddings = embeddings.astype('float32')
+            embeddings = np.ascontiguousarray(embeddings, dtype='float32')
             total_embeddings = len(embeddings)
             
-            print(f"Uploading {total_embeddings} embeddings to Qdrant in batches of {batch_size}...")
+            if ids is None:
+                ids = self.make_ids(metadata, texts)
             
-            # Process in batches
-            for batch_start in range(0, total_embeddings, batch_size):
-                batch_end = min(batch_start + batch_size, total_embeddings)
-                batch_embeddings = embeddings[batch_start:batch_end]
-                batch_texts = texts[batch_start:batch_end]
-                batch_metadata = metadata[batch_start:batch_end] if metadata else None
-                
-                # Prepare points for this batch
-                points = []
-                for i, (embedding, text) in enumerate(zip(batch_embeddings, batch_texts)):
-                    point_id = str(uuid.uuid4())
-                    
-                    payload = {
-                        "text": text,
-                        "index": len(self.texts) + batch_start + i
-                    }
-                    
-                    # Add metadata if provided
-                    if batch_metadata and i < len(batch_metadata):
-                        payload.update(batch_metadata[i])
-                    
-                    points.append(
-                        PointStruct(
-                            id=point_id,
-                            vector=embedding.tolist(),
-                            payload=payload
-                        )
-                    )
-                
-                # Upload this batch to Qdrant with retry logic
-                max_retries = 3
-                retry_delay = 2  # seconds
-                
-                for attempt in range(max_retries):
-                    try:
-                        self.client.upsert(
-                            collection_name=self.collection_name,
-                            points=points
-                        )
-                        break  # Success, exit retry loop
-                    except Exception as e:
-                        if attempt < max_retries - 1:
-                            print(f"  ⚠️  Upload failed (attempt {attempt + 1}/{max_retries}), retrying in {retry_delay}s...")
-                            time.sleep(retry_delay)
-                            retry_delay *= 2  # Exponential backoff
-                        else:
-                            raise  # Final attempt failed, raise error
-                
-                # Update local text cache
-                self.texts.extend(batch_texts)
+            payloads = []
+            for i, text in enumerate(texts):
+                payload = {
+                    "text": text,
+                    "index": len(self.texts) + i
+                }
                 
-                batch_num = (batch_start // batch_size) + 1
-                total_batches = (total_embeddings + batch_size - 1) // batch_size
-                print(f"  ✓ Uploaded batch {batch_num}/{total_batches} ({batch_end}/{total_embeddings} embeddings)")
+                # Add metadata if provided
+                if metadata and i < len(metadata) and metadata[i]:
+                    payload.update(metadata[i])
                 
-                # Small delay between batches to avoid overwhelming the server
-                if batch_end < total_embeddings:
-                    time.sleep(0.5)
+                payloads.append(payload)
             
-            print(f"✓ Successfully added {total_embeddings} embeddings to Qdrant. Total: {len(self.texts)}")
+            if Config.QDRANT_BULK_UPLOAD:
+                self._bulk_upload(embeddings, payloads, ids, parallel)
+            else:
+                self._serial_upload(embeddings, payloads, ids, batch_size)
+            
+            # Update local text cache
+            self.texts.extend(texts)
+            
+            # Writes invalidate the cached count (upserts may not change it)
+            points_count = self._get_points_count(force_refresh=True)
+            
+            print(f"✓ Successfully added {total_embeddings} embeddings to Qdrant. Total: {points_count}")
             
         except Exception as e:
             print(f"Error adding embeddings to Qdrant: {e}")
             raise
     
-    def search(self, query_embedding: np.ndarray, k: int = Config.TOP_K_RESULTS) -> Tuple[List[str], List[float]]:
+    def make_ids(self, metadata: Optional[List[dict]], texts: List[str]) -> List[str]:
+        """
+        Deterministic point IDs for chunks (see make_point_id)
+        
+        Args:
+            metadata: optional list of metadata dicts for each text
+            texts: list of text chunks
+            
+        Returns:
+            List of UUID strings
+        """
+        return [make_point_id(metadata[i] if metadata and i < len(metadata) else None, text)
+                for i, text in enumerate(texts)]
+    
+    def delete_ids(self, ids: List[str]) -> int:
+        """
+        Delete points by ID
+        
+        Args:
+            ids: point IDs to delete (unknown IDs are ignored)
+            
+        Returns:
+            Number of IDs requested for deletion
+        """
+        if not ids:
+            return 0
+        try:
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=list(ids)),
+                wait=True
+            )
+            points_count = self._get_points_count(force_refresh=True)
+            print(f"✓ Deleted {len(ids)} points from Qdrant. Total: {points_count}")
+            return len(ids)
+        except Exception as e:
+            print(f"Error deleting points from Qdrant: {e}")
+            raise
+    
+    def _bulk_upload(self, embeddings: np.ndarray, payloads: List[dict], ids: List[str], parallel: int = None):
+        """Upload with upload_collection: numpy vectors as-is, parallel workers, built-in retries"""
+        parallel = parallel or Config.QDRANT_UPLOAD_PARALLEL
+        if len(embeddings) <= Config.QDRANT_UPLOAD_BATCH_SIZE:
+            # A single request: starting a pool of worker processes would cost more than it saves
+            parallel = 1
+        print(f"Bulk uploading {len(embeddings)} embeddings to Qdrant "
+              f"(batch size {Config.QDRANT_UPLOAD_BATCH_SIZE}, {parallel} workers)...")
+        
+        self.client.upload_collection(
+            collection_name=self.collection_name,
+            vectors=embeddings,
+            payload=payloads,
+            ids=ids,
+            batch_size=Config.QDRANT_UPLOAD_BATCH_SIZE,
+            parallel=parallel,
+            max_retries=3,
+            wait=True
+        )
+    
+    def _serial_upload(self, embeddings: np.ndarray, payloads: List[dict], ids: List[str], batch_size: int):
+        """Upload batch by batch with upsert (slow, conservative fallback)"""
+        total_embeddings = len(embeddings)
+        print(f"Uploading {total_embeddings} embeddings to Qdrant in batches of {batch_size}...")
+        
+        # Process in batches
+        for batch_start in range(0, total_embeddings, batch_size):
+            batch_end = min(batch_start + batch_size, total_embeddings)
+            
+            # Prepare points for this batch
+            points = [
+                PointStruct(id=ids[i], vector=embeddings[i].tolist(), payload=payloads[i])
+                for i in range(batch_start, batch_end)
+            ]
+            
+            # Upload this batch to Qdrant with retry logic
+            max_retries = 3
+            retry_delay = 2  # seconds
+            
+            for attempt in range(max_retries):
+                try:
+                    self.client.upsert(
+                        collection_name=self.collection_name,
+                        points=points
+                    )
+                    break  # Success, exit retry loop
+                except Exception as e:
+                    if attempt < max_retries - 1:
+                        print(f"  ⚠️  Upload failed (attempt {attempt + 1}/{max_retries}), retrying in {retry_delay}s...")
+                        time.sleep(retry_delay)
+                        retry_delay *= 2  # Exponential backoff
+                    else:
+                        raise  # Final attempt failed, raise error
+            
+            batch_num = (batch_start // batch_size) + 1
+            total_batches = (total_embeddings + batch_size - 1) // batch_size
+            print(f"  ✓ Uploaded batch {batch_num}/{total_batches} ({batch_end}/{total_embeddings} embeddings)")
+            
+            # Small delay between batches to avoid overwhelming the server
+            if batch_end < total_embeddings:
+                time.sleep(0.5)
+    
+    def search(self, query_embedding: np.ndarray, k: int = Config.TOP_K_RESULTS,
+               filter: Optional[dict] = None) -> Tuple[List[str], List[float]]:
         """
         Search for similar embeddings in Qdrant
         
         Args:
             query_embedding: query embedding vector
             k: number of top results to return
+            filter: optional payload filter {field: value or list of values}, e.g. {"id": "12", "field": "Độc tính"}
             
         Returns:
             tuple of (similar_texts, similarity_scores)
         """
-        try:
-            # Get collection info to check if it has data
-            collection_info = self.client.get_collection(collection_name=self.collection_name)
-            if collection_info.points_count == 0:
-                return [], []
+        similar_texts, similarity_scores, _ = self.search_with_metadata(query_embedding, k, filter)
+        return similar_texts, similarity_scores
+    
+    def search_with_metadata(self, query_embedding: np.ndarray, k: int = Config.TOP_K_RESULTS,
+                             filter: Optional[dict] = None) -> Tuple[List[str], List[float], List[dict]]:
+        """
+        Search for similar embeddings in Qdrant and return their metadata payloads
+        
+        Args:
+            query_embedding: query embedding vector
+            k: number of top results to return
+            filter: optional payload filter {field: value or list of values}
             
-            # Convert to list for Qdrant
-            query_vector = query_embedding.astype('float32').tolist()
+        Returns:
+            tuple of (similar_texts, similarity_scores, metadata)
+        """
+        try:
+            # Cached count: no extra round trip on the hot query path
+            if self._get_points_count() == 0:
+                return [], [], []
             
-            # Search in Qdrant
-            search_results = self.client.search(
+            # Search in Qdrant (filtered searches use the keyword payload indexes)
+            response = self.client.query_points(
                 collection_name=self.collection_name,
-                query_vector=query_vector,
-                limit=k
+                query=query_embedding.astype('float32').tolist(),
+                query_filter=self._build_filter(filter),
+                limit=k,
+                with_payload=Config.QDRANT_SEARCH_PAYLOAD_FIELDS
             )
+            search_results = response.points
+            
+            if not search_results and not filter:
+                # The collection may have been emptied elsewhere; re-sync the count
+                self._get_points_count(force_refresh=True)
             
-            # Extract texts and scores
+            # Extract texts, scores and metadata
             similar_texts = [hit.payload["text"] for hit in search_results]
             similarity_scores = [hit.score for hit in search_results]
+            metadata = [self._payload_metadata(hit.payload) for hit in search_results]
             
-            return similar_texts, similarity_scores
+            return similar_texts, similarity_scores, metadata
             
         except Exception as e:
             print(f"Error searching in Qdrant: {e}")
-            return [], []
+            return [], [], []
+    
+    def search_batch(self, query_embeddings: np.ndarray, k: int = Config.TOP_K_RESULTS,
+                     filter: Optional[dict] = None) -> List[Tuple[List[str], List[float], List[dict]]]:
+        """
+        Search for many queries in one Qdrant batch query request
+        
+        Args:
+            query_embeddings: 2D array of query embeddings (one row per query)
+            k: number of top results to return per query
+            filter: optional payload filter applied to every query
+            
+        Returns:
+            list of (similar_texts, similarity_scores, metadata) tuples, one per query
+        """
+        query_embeddings = np.asarray(query_embeddings, dtype='float32').reshape(-1, self.dimension)
+        try:
+            if self._get_points_count() == 0:
+                return [([], [], []) for _ in range(len(query_embeddings))]
+            
+            query_filter = self._build_filter(filter)
+            requests = [
+                QueryRequest(
+                    query=query_vector.tolist(),
+                    filter=query_filter,
+                    limit=k,
+                    with_payload=Config.QDRANT_SEARCH_PAYLOAD_FIELDS
+                )
+                for query_vector in query_embeddings
+            ]
+            batch_results = self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=requests
+            )
+            
+            return [
+                (
+                    [hit.payload["text"] for hit in response.points],
+                    [hit.score for hit in response.points],
+                    [self._payload_metadata(hit.payload) for hit in response.points]
+                )
+                for response in batch_results
+            ]
+            
+        except Exception as e:
+            print(f"Error batch searching in Qdrant: {e}")
+            return [([], [], []) for _ in range(len(query_embeddings))]
+    
+    def get_vectors(self, metadata: Optional[List[dict]], texts: List[str]) -> Optional[np.ndarray]:
+        """
+        Stored vectors of search results, fetched by point ID in one retrieve request
+        
+        Args:
+            metadata: metadata of the results (as returned by search_with_metadata)
+            texts: texts of the results
+            
+        Returns:
+            Array of shape (len(texts), dimension), zero rows for unknown points,
+            or None if the request failed
+        """
+        vectors = np.zeros((len(texts), self.dimension), dtype='float32')
+        if not texts:
+            return vectors
+        point_ids = self.make_ids(metadata, texts)
+        try:
+            records = self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=list(set(point_ids)),
+                with_payload=False,
+                with_vectors=True
+            )
+            vector_of = {str(record.id): record.vector for record in records}
+            for i, point_id in enumerate(point_ids):
+                if vector_of.get(point_id) is not None:
+                    vectors[i] = vector_of[point_id]
+            return vectors
+        except Exception as e:
+            print(f"Error retrieving vectors from Qdrant: {e}")
+            return None
     
     def save_index(self, filepath: str = None):
         """
@@ -219,8 +504,7 @@ class QdrantVectorStore:
                 return False
             
             # Get collection info
-            collection_info = self.client.get_collection(collection_name=self.collection_name)
-            points_count = collection_info.points_count
+            points_count = self._get_points_count(force_refresh=True)
             
             if points_count == 0:
                 print(f"Collection '{self.collection_name}' exists but is empty")
@@ -257,10 +541,8 @@ class QdrantVectorStore:
     def get_stats(self):
         """Get statistics about the vector store"""
         try:
-            collection_info = self.client.get_collection(collection_name=self.collection_name)
-            
             return {
-                "total_embeddings": collection_info.points_count,
+                "total_embeddings": self._get_points_count(force_refresh=True),
                 "dimension": self.dimension,
                 "total_texts": len(self.texts),
                 "collection_name": self.collection_name,
@@ -283,6 +565,7 @@ class QdrantVectorStore:
             self.client.delete_collection(collection_name=self.collection_name)
             print(f"✓ Deleted collection '{self.collection_name}' from Qdrant")
             self.texts = []
+            self._points_count = None
             
         except Exception as e:
             print(f"Error deleting collection: {e}")
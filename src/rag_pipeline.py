@@ -1,50 +1,241 @@
-from typing import List, Dict, Any
-from src.embeddings import EmbeddingGenerator
-from src.vector_store import FAISSVectorStore
-from src.qdrant_vector_store import QdrantVectorStore
-from src.llm import GeminiLLM
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from src.document_processor import DocumentProcessor
-from src.reranker import CrossEncoderReranker
+from src.ingest_manifest import IngestManifest
+from src.ingest_scheduler import IngestScheduler
 from config.config import Config
 
+# Heavy components (torch / sentence-transformers, faiss, qdrant_client, google.genai)
+# are imported and constructed on first use, see the properties below
+
+_UNSET = object()
+
 class RAGPipeline:
     """Main RAG Pipeline orchestrator"""
     
     def __init__(self):
-        """Initialize all components of the RAG pipeline"""
-        print("Initializing RAG Pipeline...")
-        
-        # Initialize components
-        self.embedding_generator = EmbeddingGenerator()
+        """
+        Initialize the RAG pipeline
         
-        # Choose vector store based on config
-        if Config.USE_QDRANT:
-            print("Using Qdrant Cloud as vector store...")
-            self.vector_store = QdrantVectorStore()
-        else:
-            print("Using FAISS as vector store...")
-            self.vector_store = FAISSVectorStore()
+        Only cheap state is set up here. The embedding model, vector store,
+        LLM client and cross-encoder are built on first use, so commands that
+        need none of them (--stats, --reset) start instantly.
+        """
+        print("Initializing RAG Pipeline...")
         
-        self.llm = GeminiLLM()
         self.document_processor = DocumentProcessor()
         
-        # Initialize re-ranker if enabled
-        self.reranker = None
-        if Config.USE_RERANKING:
-            try:
-                print("Initializing cross-encoder re-ranker...")
-                self.reranker = CrossEncoderReranker(Config.CROSS_ENCODER_MODEL)
-                print("Re-ranker initialized successfully!")
-            except Exception as e:
-                print(f"Warning: Failed to initialize re-ranker: {e}")
-                print("Continuing without re-ranking...")
-                Config.USE_RERANKING = False
+        # Lazily constructed components (see the properties below)
+        self._model_server = _UNSET
+        self._embedding_generator = None
+        self._vector_store = None
+        self._llm = None
+        self._reranker = _UNSET
+        self._semantic_cache = _UNSET
+        self._sparse_index = None
+        self._sparse_executor = None
+        self._entity_router = None
+        self._structured_store = None
+        self._context_assembler = None
+        self._init_lock = threading.RLock()
         
         # Pipeline state
         self.is_indexed = False
         
+        # Async serving: CPU-bound stages run in a bounded thread pool,
+        # in-flight questions are limited per event loop
+        self._async_executor = None
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        
         print("RAG Pipeline initialized successfully!")
     
+    @property
+    def model_server(self):
+        """Client of the warm model server (python main.py --serve-models), None if not running"""
+        if self._model_server is _UNSET:
+            with self._init_lock:
+                if self._model_server is _UNSET:
+                    client = None
+                    if Config.USE_MODEL_SERVER:
+                        from src.model_client import ModelServerClient
+                        client = ModelServerClient.connect()
+                    self._model_server = client
+        return self._model_server
+    
+    @model_server.setter
+    def model_server(self, value):
+        self._model_server = value
+    
+    @property
+    def embedding_generator(self):
+        """Embedding generator (remote when the model server is running), loaded on first use"""
+        if self._embedding_generator is None:
+            with self._init_lock:
+                if self._embedding_generator is None:
+                    if self.model_server is not None:
+                        from src.model_client import RemoteEmbeddingGenerator
+                        print(f"🔌 Using warm model server at {self.model_server.url}")
+                        self._embedding_generator = RemoteEmbeddingGenerator(self.model_server)
+                    else:
+                        from src.embeddings import EmbeddingGenerator
+                        self._embedding_generator = EmbeddingGenerator()
+        return self._embedding_generator
+    
+    @embedding_generator.setter
+    def embedding_generator(self, value):
+        self._embedding_generator = value
+    
+    @property
+    def vector_store(self):
+        """Vector store chosen by Config.USE_QDRANT, created on first use"""
+        if self._vector_store is None:
+            with self._init_lock:
+                if self._vector_store is None:
+                    self._vector_store = self._create_vector_store()
+        return self._vector_store
+    
+    @vector_store.setter
+    def vector_store(self, value):
+        self._vector_store = value
+    
+    @staticmethod
+    def _create_vector_store():
+        """New (empty) vector store of the configured backend"""
+        if Config.USE_QDRANT:
+            from src.qdrant_vector_store import QdrantVectorStore
+            print("Using Qdrant Cloud as vector store...")
+            return QdrantVectorStore()
+        from src.vector_store import FAISSVectorStore
+        print("Using FAISS as vector store...")
+        return FAISSVectorStore()
+    
+    @property
+    def llm(self):
+        """Gemini client, created on first use"""
+        if self._llm is None:
+            with self._init_lock:
+                if self._llm is None:
+                    from src.llm import GeminiLLM
+                    self._llm = GeminiLLM()
+        return self._llm
+    
+    @llm.setter
+    def llm(self, value):
+        self._llm = value
+    
+    @property
+    def reranker(self):
+        """Cross-encoder re-ranker (None if disabled or failed to load), loaded on first use"""
+        if self._reranker is _UNSET:
+            with self._init_lock:
+                if self._reranker is _UNSET:
+                    self._reranker = self._create_reranker()
+        return self._reranker
+    
+    @reranker.setter
+    def reranker(self, value):
+        self._reranker = value
+    
+    @property
+    def semantic_cache(self):
+        """Semantic answer cache (None if disabled), loaded from disk on first use"""
+        if self._semantic_cache is _UNSET:
+            with self._init_lock:
+                if self._semantic_cache is _UNSET:
+                    cache = None
+                    if Config.USE_SEMANTIC_CACHE:
+                        from src.semantic_cache import SemanticAnswerCache
+                        cache = SemanticAnswerCache()
+                    self._semantic_cache = cache
+        return self._semantic_cache
+    
+    @semantic_cache.setter
+    def semantic_cache(self, value):
+        self._semantic_cache = value
+    
+    @property
+    def sparse_index(self):
+        """BM25 index kept next to the vector store (None if hybrid search is disabled)"""
+        if self._sparse_index is None and Config.USE_HYBRID_SEARCH:
+            with self._init_lock:
+                if self._sparse_index is None:
+                    from src.sparse_index import BM25Index
+                    self._sparse_index = BM25Index()
+        return self._sparse_index
+    
+    @sparse_index.setter
+    def sparse_index(self, value):
+        self._sparse_index = value
+    
+    @property
+    def entity_router(self):
+        """Species / field detector used to route questions (None if routing is disabled)"""
+        if self._entity_router is None and Config.USE_ENTITY_ROUTING:
+            with self._init_lock:
+                if self._entity_router is None:
+                    from src.entity_router import EntityRouter
+                    self._entity_router = EntityRouter()
+        return self._entity_router
+    
+    @entity_router.setter
+    def entity_router(self, value):
+        self._entity_router = value
+    
+    @property
+    def structured_store(self):
+        """(species id, field) -> chunks + vectors used for routed questions (None if disabled)"""
+        if self._structured_store is None and Config.USE_STRUCTURED_STORE:
+            with self._init_lock:
+                if self._structured_store is None:
+                    from src.structured_store import StructuredStore
+                    self._structured_store = StructuredStore()
+        return self._structured_store
+    
+    @structured_store.setter
+    def structured_store(self, value):
+        self._structured_store = value
+    
+    @property
+    def context_assembler(self):
+        """Overlap merging / token budget packing of the LLM context (None if disabled)"""
+        if self._context_assembler is None and Config.USE_CONTEXT_ASSEMBLY:
+            with self._init_lock:
+                if self._context_assembler is None:
+                    from src.context_assembler import ContextAssembler
+                    self._context_assembler = ContextAssembler()
+        return self._context_assembler
+    
+    @context_assembler.setter
+    def context_assembler(self, value):
+        self._context_assembler = value
+    
+    def _create_reranker(self):
+        """Load the re-ranker if enabled (served by the model server when it is running)"""
+        if not Config.USE_RERANKING:
+            return None
+        from src.reranker import CrossEncoderReranker
+        try:
+            print("Initializing cross-encoder re-ranker...")
+            if self.model_server is not None and self.model_server.info.get("reranker_model"):
+                from src.model_client import RemoteCrossEncoderModel
+                reranker = CrossEncoderReranker(
+                    self.model_server.info["reranker_model"],
+                    backend="server",
+                    model=RemoteCrossEncoderModel(self.model_server)
+                )
+            else:
+                reranker = CrossEncoderReranker(Config.CROSS_ENCODER_MODEL)
+            print("Re-ranker initialized successfully!")
+            return reranker
+        except Exception as e:
+            print(f"Warning: Failed to initialize re-ranker: {e}")
+            print("Continuing without re-ranking...")
+            Config.USE_RERANKING = False
+            return None
+    
     def ingest_documents(self, documents: List[str]) -> Dict[str, Any]:
         """
         Ingest documents into the RAG pipeline
@@ -76,9 +267,12 @@ class RAGPipeline:
         # Add to vector store
         print("Adding embeddings to vector store...")
         self.vector_store.add_embeddings(embeddings, all_chunks)
+        if self.sparse_index is not None:
+            self.sparse_index.add(all_chunks, ids=self.vector_store.make_ids(None, all_chunks))
         
         # Save the index
-        self.vector_store.save_index()
+        self._save_indexes()
+        self._invalidate_answers()
         
         self.is_indexed = True
         
@@ -109,40 +303,216 @@ class RAGPipeline:
         """
         print(f"Starting metadata-level document ingestion for {len(documents)} entities...")
         
-        # Process all documents with metadata context
-        all_chunks = self.document_processor.process_document_with_metadata(
+        # Chunking, embedding and store writes overlap (see IngestScheduler)
+        stats = self._run_ingest_scheduler(documents, name_field, metadata_fields)
+        
+        print("Metadata-level document ingestion completed!")
+        return stats
+    
+    def ingest_documents_streaming(self,
+                                   documents: Iterable[Dict],
+                                   name_field: str = "name_vn",
+                                   metadata_fields: List[str] = None,
+                                   batch_size: int = None) -> Dict[str, Any]:
+        """
+        Ingest a stream of documents (metadata-level chunking) with bounded memory
+        
+        Documents are consumed lazily, so they can come straight from
+        data.json_loader.iter_json_documents; at most a few batches are held
+        between the chunk, embed and upload stages.
+        
+        Args:
+            documents: Iterable of document dictionaries (e.g. a generator)
+            name_field: Field name for entity name (e.g., "name_vn", "name_en")
+            metadata_fields: List of metadata field names to process
+            batch_size: Chunks per embedding batch (default from Config.INGEST_STREAM_BATCH_SIZE)
+            
+        Returns:
+            Dictionary with ingestion statistics
+        """
+        print("Starting streaming ingestion...")
+        stats = self._run_ingest_scheduler(documents, name_field, metadata_fields, batch_size)
+        print("Streaming ingestion completed!")
+        return stats
+    
+    def _run_ingest_scheduler(self, documents: Iterable[Dict], name_field: str,
+                              metadata_fields: Optional[List[str]], batch_size: int = None) -> Dict[str, Any]:
+        """Run the chunk -> embed -> upload scheduler, save the index and write the manifest"""
+        manifest = IngestManifest()
+        manifest.settings = self._manifest_settings(name_field)
+        
+        # IVF indexes are trained on their first add: buffer enough vectors for a good sample
+        train_buffer_size = 0
+        if not Config.USE_QDRANT and self.vector_store.index_type in ("ivf_flat", "ivf_pq"):
+            if self.vector_store.index is None or not self.vector_store.index.is_trained:
+                train_buffer_size = Config.FAISS_TRAIN_SAMPLE_SIZE
+        
+        scheduler = IngestScheduler(
+            self.embedding_generator,
+            self.vector_store,
+            self.document_processor,
+            upload_workers=None if self.vector_store.supports_concurrent_writes else 1,
+            batch_size=batch_size,
+            # Embedding runs in the server process: leave this process' torch threads alone
+            embed_torch_threads=0 if self.model_server is not None else None,
+            sparse_index=self.sparse_index,
+            structured_store=self.structured_store
+        )
+        if self.entity_router is not None:
+            documents = self.entity_router.track(documents)
+        stats = scheduler.run(documents, name_field, metadata_fields, manifest=manifest,
+                              train_buffer_size=train_buffer_size)
+        
+        # Save the index and record what was indexed so later runs can be incremental
+        self._save_indexes()
+        manifest.save()
+        self._invalidate_answers()
+        
+        self.is_indexed = True
+        
+        stats["vector_store_stats"] = self.vector_store.get_stats()
+        stats["metadata_fields"] = metadata_fields
+        return stats
+    
+    def ingest_documents_incremental(self,
+                                     documents: List[Dict],
+                                     name_field: str = "name_vn",
+                                     metadata_fields: List[str] = None) -> Dict[str, Any]:
+        """
+        Incrementally sync the vector store with documents (metadata-level chunking)
+        
+        Only (doc id, field) entries whose chunks changed since the last ingest are
+        embedded and upserted; points of changed or vanished entries are deleted.
+        Falls back to a full ingest when no matching manifest/index exists.
+        
+        Args:
+            documents: List of document dictionaries with metadata
+            name_field: Field name for entity name (e.g., "name_vn", "name_en")
+            metadata_fields: List of metadata field names to process
+            
+        Returns:
+            Dictionary with ingestion statistics
+        """
+        print(f"Starting incremental ingestion for {len(documents)} entities...")
+        
+        settings = self._manifest_settings(name_field)
+        manifest = IngestManifest()
+        if not (manifest.load() and manifest.settings == settings and self.vector_store.load_index()
+                and (self.sparse_index is None or self.sparse_index.load())
+                and (self.structured_store is None or self.structured_store.load())):
+            print("No matching ingest manifest/index found, rebuilding from scratch...")
+            if Config.USE_QDRANT:
+                self.vector_store.create_index()
+            else:
+                self.vector_store = self._create_vector_store()
+            if self.sparse_index is not None:
+                self.sparse_index.reset()
+            if self.structured_store is not None:
+                self.structured_store.reset()
+            manifest = IngestManifest()
+            manifest.settings = settings
+        
+        # Species names are cheap to collect: rebuilt from the full input every run
+        if self.entity_router is not None:
+            self.entity_router.reset()
+            self.entity_router.add_documents(documents)
+        
+        # Chunking is cheap; embedding and uploading are what we avoid
+        all_chunks, chunk_metadata = self.document_processor.process_document_with_metadata(
             documents=documents,
             name_field=name_field,
-            metadata_fields=metadata_fields
+            metadata_fields=metadata_fields,
+            return_metadata=True
         )
+        groups = IngestManifest.group_chunks(all_chunks, chunk_metadata)
         
-        total_chunks = len(all_chunks)
-        print(f"Total chunks created with metadata context: {total_chunks}")
+        new_chunks, new_metadata, new_ids, stale_ids = [], [], [], []
+        unchanged_fields = 0
+        for key, group in groups.items():
+            entry = manifest.get(key)
+            if entry and entry["hash"] == group["hash"]:
+                unchanged_fields += 1
+                continue
+            
+            ids = self.vector_store.make_ids(group["metadata"], group["chunks"])
+            if entry:
+                keep = set(ids)
+                stale_ids.extend(point_id for point_id in entry["ids"] if point_id not in keep)
+            new_chunks.extend(group["chunks"])
+            new_metadata.extend(group["metadata"])
+            new_ids.extend(ids)
+            manifest.set(key, group["hash"], ids)
         
-        # Generate embeddings for all chunks
-        print("Generating embeddings...")
-        embeddings = self.embedding_generator.generate_embeddings(all_chunks)
+        # Entries no longer present in the input
+        removed_keys = [key for key in manifest.entries if key not in groups]
+        for key in removed_keys:
+            stale_ids.extend(manifest.get(key)["ids"])
+            manifest.remove(key)
         
-        # Add to vector store
-        print("Adding embeddings to vector store...")
-        self.vector_store.add_embeddings(embeddings, all_chunks)
+        changed_fields = len(groups) - unchanged_fields
+        print(f"Fields: {changed_fields} changed, {unchanged_fields} unchanged, {len(removed_keys)} removed")
         
-        # Save the index
-        self.vector_store.save_index()
+        # Upsert before deleting: stale IDs never overlap new ones, and an interrupted
+        # run is repaired by the next one (the manifest is written last)
+        if new_chunks:
+            print(f"Generating embeddings for {len(new_chunks)} changed chunks...")
+            embeddings = self.embedding_generator.generate_embeddings(new_chunks)
+            self.vector_store.add_embeddings(embeddings, new_chunks, metadata=new_metadata, ids=new_ids)
+            if self.sparse_index is not None:
+                self.sparse_index.add(new_chunks, new_metadata, new_ids)
+            if self.structured_store is not None:
+                self.structured_store.add(embeddings, new_chunks, new_metadata, new_ids)
+        
+        deleted_points = self.vector_store.delete_ids(stale_ids) if stale_ids else 0
+        for local_index in (self.sparse_index, self.structured_store):
+            if stale_ids and local_index is not None:
+                local_index.delete_ids(stale_ids)
+        
+        self._save_indexes()
+        manifest.save()
+        if new_chunks or stale_ids:
+            self._invalidate_answers()
         
         self.is_indexed = True
         
         stats = {
             "total_documents": len(documents),
-            "total_chunks": total_chunks,
-            "total_embeddings": len(embeddings),
+            "total_chunks": len(all_chunks),
+            "total_embeddings": len(new_chunks),
+            "changed_fields": changed_fields,
+            "unchanged_fields": unchanged_fields,
+            "removed_fields": len(removed_keys),
+            "deleted_points": deleted_points,
             "vector_store_stats": self.vector_store.get_stats(),
             "metadata_fields": metadata_fields
         }
         
-        print("Metadata-level document ingestion completed!")
+        print("Incremental ingestion completed!")
         return stats
     
+    def _save_indexes(self):
+        """Persist the vector store and the BM25 index / structured store / species names next to it"""
+        self.vector_store.save_index()
+        if self.sparse_index is not None:
+            self.sparse_index.save()
+        if self.structured_store is not None:
+            self.structured_store.save()
+        if self.entity_router is not None:
+            self.entity_router.save()
+    
+    def _manifest_settings(self, name_field: str) -> Dict[str, str]:
+        """Settings an ingest manifest is only valid for"""
+        if Config.USE_QDRANT:
+            backend, location = "qdrant", self.vector_store.collection_name
+        else:
+            backend, location = "faiss", self.vector_store.index_path
+        return {
+            "backend": backend,
+            "location": location,
+            "embedding_model": self.embedding_generator.cache_id,
+            "name_field": name_field
+        }
+    
     def load_existing_index(self) -> bool:
         """
         Load existing vector index from disk
@@ -153,73 +523,450 @@ class RAGPipeline:
         print("Attempting to load existing index...")
         success = self.vector_store.load_index()
         if success:
+            if self.sparse_index is not None and not self.sparse_index.load():
+                print("⚠️  No BM25 index found (re-ingest to build it), using dense search only")
+            if self.structured_store is not None and not self.structured_store.load():
+                print("⚠️  No structured store found (re-ingest to build it), routed questions use the vector store")
+            if self.entity_router is not None and not self.entity_router.load():
+                print("⚠️  No entity index found (re-ingest to build it), questions are not routed")
             self.is_indexed = True
             print("Existing index loaded successfully!")
         else:
             print("No existing index found.")
         return success
     
-    def query(self, question: str, top_k: int = Config.TOP_K_RESULTS) -> Dict[str, Any]:
+    def query(self, question: str, top_k: int = Config.TOP_K_RESULTS, filter: Optional[dict] = None) -> Dict[str, Any]:
         """
         Query the RAG pipeline with optional re-ranking
         
         Args:
             question: User's question
             top_k: Number of top similar chunks to retrieve (overridden if re-ranking is enabled)
+            filter: Optional metadata filter, e.g. {"id": "12", "field": "Độc tính"}
             
         Returns:
             Dictionary containing the response and metadata
         """
         if not self.is_indexed:
-            return {
-                "response": "Error: No documents have been indexed yet. Please ingest documents first.",
-                "context": [],
-                "similarity_scores": [],
-                "error": "No index available"
-            }
+            return self._not_indexed_result()
+        
+        print(f"Processing query: {question}")
+        
+        retrieved = self._retrieve_context(question, top_k, filter)
+        if retrieved is None:
+            return self._no_context_result()
+        final_texts, final_scores, rerank_info, context_metadata, query_embedding = retrieved
+        
+        # Paraphrase of an answered question with the same context: no LLM call
+        cached = self._lookup_answer(query_embedding, final_texts)
+        if cached is not None:
+            return self._build_result(cached["answer"], final_texts, final_scores, rerank_info, context_metadata, cached)
+        
+        # Generate response using LLM
+        print("Generating response...")
+        response = self.llm.generate_response(question, final_texts)
+        self._store_answer(question, query_embedding, final_texts, response)
+        
+        print("Query processed successfully!")
+        return self._build_result(response, final_texts, final_scores, rerank_info, context_metadata)
+    
+    def query_stream(self, question: str, top_k: int = Config.TOP_K_RESULTS,
+                     filter: Optional[dict] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Query the RAG pipeline and stream the answer as it is generated
+        
+        Args:
+            question: User's question
+            top_k: Number of top similar chunks to retrieve (overridden if re-ranking is enabled)
+            filter: Optional metadata filter, e.g. {"id": "12", "field": "Độc tính"}
+            
+        Yields:
+            Event dictionaries:
+            - {"type": "metadata", "context", "similarity_scores", "num_context_chunks", "rerank_info", "context_metadata"} first
+            - {"type": "delta", "text"} for every text delta from the LLM
+            - {"type": "done", "response"} with the full answer at the end
+            - {"type": "error", "response", "error"} instead of "done" if retrieval or
+              generation fails ("response" is then the error message; deltas already
+              sent are a truncated answer)
+        """
+        if not self.is_indexed:
+            yield {"type": "error", **self._not_indexed_result()}
+            return
         
         print(f"Processing query: {question}")
         
+        retrieved = self._retrieve_context(question, top_k, filter)
+        if retrieved is None:
+            yield {"type": "error", **self._no_context_result()}
+            return
+        final_texts, final_scores, rerank_info, context_metadata, query_embedding = retrieved
+        cached = self._lookup_answer(query_embedding, final_texts)
+        
+        # Send retrieval metadata before the first token
+        metadata = self._build_result(None, final_texts, final_scores, rerank_info, context_metadata, cached)
+        del metadata["response"]
+        yield {"type": "metadata", **metadata}
+        
+        if cached is not None:
+            yield {"type": "delta", "text": cached["answer"]}
+            yield {"type": "done", "response": cached["answer"]}
+            return
+        
+        parts = []
+        try:
+            for delta in self.llm.generate_response_stream(question, final_texts):
+                parts.append(delta)
+                yield {"type": "delta", "text": delta}
+        except Exception as e:
+            # Not cached: the deltas sent so far are only part of an answer
+            error_prefix = getattr(self.llm, "ERROR_PREFIX", "Error generating response")
+            yield {"type": "error", "response": f"{error_prefix}: {str(e)}", "error": str(e)}
+            return
+        
+        response = "".join(parts)
+        self._store_answer(question, query_embedding, final_texts, response)
+        yield {"type": "done", "response": response}
+    
+    async def aquery(self, question: str, top_k: int = Config.TOP_K_RESULTS,
+                     filter: Optional[dict] = None) -> Dict[str, Any]:
+        """
+        Query the RAG pipeline asynchronously
+        
+        Embedding, search and re-ranking run in a bounded thread pool while the
+        LLM call awaits the async Gemini client, so many in-flight questions
+        overlap their network waits. At most Config.ASYNC_MAX_CONCURRENCY
+        questions are processed at once per event loop.
+        
+        Args:
+            question: User's question
+            top_k: Number of top similar chunks to retrieve (overridden if re-ranking is enabled)
+            filter: Optional metadata filter, e.g. {"id": "12", "field": "Độc tính"}
+            
+        Returns:
+            Dictionary containing the response and metadata (same shape as query())
+        """
+        if not self.is_indexed:
+            return self._not_indexed_result()
+        
+        async with self._get_async_semaphore():
+            loop = asyncio.get_running_loop()
+            retrieved = await loop.run_in_executor(
+                self._get_async_executor(), self._retrieve_context, question, top_k, filter
+            )
+            if retrieved is None:
+                return self._no_context_result()
+            final_texts, final_scores, rerank_info, context_metadata, query_embedding = retrieved
+            
+            cached = self._lookup_answer(query_embedding, final_texts)
+            if cached is not None:
+                return self._build_result(cached["answer"], final_texts, final_scores, rerank_info, context_metadata, cached)
+            
+            response = await self.llm.agenerate_response(question, final_texts)
+            self._store_answer(question, query_embedding, final_texts, response)
+        
+        return self._build_result(response, final_texts, final_scores, rerank_info, context_metadata)
+    
+    async def aquery_many(self, questions: List[str], top_k: int = Config.TOP_K_RESULTS) -> List[Dict[str, Any]]:
+        """
+        Run many questions concurrently through aquery()
+        
+        Args:
+            questions: List of user questions
+            top_k: Number of top similar chunks to retrieve (overridden if re-ranking is enabled)
+            
+        Returns:
+            List of result dictionaries in input order
+        """
+        return await asyncio.gather(*(self.aquery(question, top_k) for question in questions))
+    
+    def _get_async_executor(self) -> ThreadPoolExecutor:
+        """Lazily create the bounded thread pool for CPU-bound stages"""
+        if self._async_executor is None:
+            self._async_executor = ThreadPoolExecutor(
+                max_workers=Config.ASYNC_WORKER_THREADS,
+                thread_name_prefix="rag-cpu"
+            )
+        return self._async_executor
+    
+    def _get_async_semaphore(self) -> asyncio.Semaphore:
+        """Concurrency limiter bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(Config.ASYNC_MAX_CONCURRENCY)
+            self._async_semaphores[loop] = semaphore
+        return semaphore
+    
+    def _retrieve_context(self, question: str, top_k: int = Config.TOP_K_RESULTS,
+                          filter: Optional[dict] = None) -> Optional[tuple]:
+        """
+        Embed the question, search the vector store (fused with BM25 in hybrid mode) and optionally re-rank
+        
+        Without an explicit filter, a question naming a species is routed to that
+        document's chunks (and the fields it asks about); the search is widened to
+        the species, then the whole index, if the routed search finds nothing.
+        
+        Returns:
+            tuple of (final_texts, final_scores, rerank_info, context_metadata, query_embedding),
+            or None if nothing was found
+        """
+        # Determine how many candidates to retrieve
+        retrieval_k = self._retrieval_k(top_k)
+        
+        route = self._route_question(question) if filter is None else None
+        search_filter = route["filter"] if route is not None else filter
+        
+        # BM25 runs in the background while the question is embedded and searched
+        sparse_future = self._submit_sparse_search(question, retrieval_k, search_filter)
+        
         # Generate embedding for the query
         print("Generating query embedding...")
         query_embedding = self.embedding_generator.generate_single_embedding(question)
         
-        # Determine how many candidates to retrieve
-        retrieval_k = Config.RERANK_TOP_K if Config.USE_RERANKING else top_k
-        
         # Search for similar chunks
         print(f"Searching for relevant context (retrieving top {retrieval_k})...")
-        similar_texts, similarity_scores = self.vector_store.search(query_embedding, retrieval_k)
+        similar_texts, similarity_scores, similar_metadata = self._search_candidates(
+            query_embedding, retrieval_k, search_filter, sparse_future
+        )
+        
+        for fallback_filter in (self._route_fallbacks(route) if not similar_texts else []):
+            similar_texts, similarity_scores, similar_metadata = self._search_candidates(
+                query_embedding, retrieval_k, fallback_filter,
+                self._submit_sparse_search(question, retrieval_k, fallback_filter)
+            )
+            if similar_texts:
+                break
         
         if not similar_texts:
-            return {
-                "response": "I couldn't find any relevant information to answer your question.",
-                "context": [],
-                "similarity_scores": [],
-                "error": "No relevant context found"
-            }
+            return None
         
         print(f"Found {len(similar_texts)} relevant chunks from vector search")
+        similar_texts, similarity_scores, similar_metadata = self._diversify(
+            similar_texts, similarity_scores, similar_metadata
+        )
         
         # Apply re-ranking if enabled
-        final_texts = similar_texts
-        final_scores = similarity_scores
-        rerank_info = {}
-        
+        reranked_results = None
         if Config.USE_RERANKING and self.reranker is not None:
             print("Applying cross-encoder re-ranking...")
             
-            # Combine original results
-            passages_with_scores = list(zip(similar_texts, similarity_scores))
-            
             # Re-rank with combined scoring
             reranked_results = self.reranker.rerank_with_original_scores(
                 question, 
-                passages_with_scores, 
+                list(zip(similar_texts, similarity_scores)), 
+                alpha=Config.RERANK_ALPHA,
+                top_k=Config.FINAL_TOP_K
+            )
+        
+        final_texts, final_scores, rerank_info = self._select_context(
+            similar_texts, similarity_scores, reranked_results, top_k
+        )
+        context_metadata = self._match_metadata(final_texts, similar_texts, similar_metadata)
+        if Config.CONTEXT_MODE == "whole_field":
+            final_texts, final_scores, context_metadata = self._whole_field_context(final_texts, final_scores, context_metadata)
+        final_texts, final_scores, rerank_info, context_metadata = self._assemble_context(
+            final_texts, final_scores, rerank_info, context_metadata
+        )
+        return final_texts, final_scores, rerank_info, context_metadata, query_embedding
+    
+    def query_batch(self, questions: List[str], top_k: int = Config.TOP_K_RESULTS) -> List[Dict[str, Any]]:
+        """
+        Query the RAG pipeline with many questions at once
+        
+        Query embedding, vector search and cross-encoder scoring each run as a
+        single batched call; the LLM is then called once per question.
+        
+        Args:
+            questions: List of user questions
+            top_k: Number of top similar chunks to retrieve (overridden if re-ranking is enabled)
+            
+        Returns:
+            List of result dictionaries, same shape as query(), in input order
+        """
+        if not questions:
+            return []
+        
+        if not self.is_indexed:
+            return [self._not_indexed_result() for _ in questions]
+        
+        print(f"Processing batch of {len(questions)} queries...")
+        
+        retrieval_k = self._retrieval_k(top_k)
+        routes = [self._route_question(question) for question in questions]
+        
+        # BM25 searches run in the background while the questions are embedded and searched
+        sparse_futures = [self._submit_sparse_search(question, retrieval_k, route["filter"] if route else None)
+                          for question, route in zip(questions, routes)]
+        
+        # One encode call for all queries
+        query_embeddings = self.embedding_generator.generate_query_embeddings(questions)
+        
+        # One multi-vector search for all unrouted queries, a filtered search per routed one
+        print(f"Searching for relevant context (retrieving top {retrieval_k} per query)...")
+        search_results = [None] * len(questions)
+        unrouted = [i for i, route in enumerate(routes) if route is None]
+        if unrouted:
+            for i, dense in zip(unrouted, self.vector_store.search_batch(query_embeddings[unrouted], retrieval_k)):
+                search_results[i] = self._search_candidates(None, retrieval_k, None, sparse_futures[i], dense)
+        for i, route in enumerate(routes):
+            if route is None:
+                continue
+            search_results[i] = self._search_candidates(query_embeddings[i], retrieval_k, route["filter"], sparse_futures[i])
+            for fallback_filter in (self._route_fallbacks(route) if not search_results[i][0] else []):
+                search_results[i] = self._search_candidates(
+                    query_embeddings[i], retrieval_k, fallback_filter,
+                    self._submit_sparse_search(questions[i], retrieval_k, fallback_filter)
+                )
+                if search_results[i][0]:
+                    break
+        search_results = [self._diversify(*candidates) for candidates in search_results]
+        
+        # One cross-encoder predict over every (query, passage) pair
+        reranked_batch = [None] * len(questions)
+        if Config.USE_RERANKING and self.reranker is not None:
+            print("Applying batched cross-encoder re-ranking...")
+            reranked_batch = self.reranker.rerank_batch_with_original_scores(
+                questions,
+                [list(zip(texts, scores)) for texts, scores, _ in search_results],
                 alpha=Config.RERANK_ALPHA,
                 top_k=Config.FINAL_TOP_K
             )
+        
+        results = []
+        for i, (question, (similar_texts, similarity_scores, similar_metadata)) in enumerate(zip(questions, search_results)):
+            if not similar_texts:
+                results.append(self._no_context_result())
+                continue
+            
+            final_texts, final_scores, rerank_info = self._select_context(
+                similar_texts, similarity_scores, reranked_batch[i], top_k
+            )
+            
+            context_metadata = self._match_metadata(final_texts, similar_texts, similar_metadata)
+            if Config.CONTEXT_MODE == "whole_field":
+                final_texts, final_scores, context_metadata = self._whole_field_context(final_texts, final_scores, context_metadata)
+            final_texts, final_scores, rerank_info, context_metadata = self._assemble_context(
+                final_texts, final_scores, rerank_info, context_metadata
+            )
+            
+            cached = self._lookup_answer(query_embeddings[i], final_texts)
+            if cached is not None:
+                results.append(self._build_result(cached["answer"], final_texts, final_scores, rerank_info, context_metadata, cached))
+                continue
             
+            print(f"Generating response {i + 1}/{len(questions)}...")
+            response = self.llm.generate_response(question, final_texts)
+            self._store_answer(question, query_embeddings[i], final_texts, response)
+            results.append(self._build_result(response, final_texts, final_scores, rerank_info, context_metadata))
+        
+        print(f"Batch of {len(questions)} queries processed successfully!")
+        return results
+    
+    def _retrieval_k(self, top_k: int) -> int:
+        """Number of candidates to retrieve (and to re-rank after fusion in hybrid mode)"""
+        return Config.RERANK_TOP_K if Config.USE_RERANKING else top_k
+    
+    def _use_hybrid(self) -> bool:
+        """Hybrid search is on and the BM25 index has documents"""
+        return Config.USE_HYBRID_SEARCH and self.sparse_index is not None and len(self.sparse_index) > 0
+    
+    def _get_sparse_executor(self) -> ThreadPoolExecutor:
+        """Thread pool running BM25 searches next to embedding and dense search"""
+        if self._sparse_executor is None:
+            with self._init_lock:
+                if self._sparse_executor is None:
+                    self._sparse_executor = ThreadPoolExecutor(max_workers=Config.ASYNC_WORKER_THREADS,
+                                                               thread_name_prefix="bm25")
+        return self._sparse_executor
+    
+    def _route_question(self, question: str) -> Optional[dict]:
+        """Entity route of a question (see EntityRouter.route), None if not routed"""
+        if self.entity_router is None or len(self.entity_router) == 0:
+            return None
+        route = self.entity_router.route(question)
+        if route is not None:
+            print(f"🧭 Routed to {' / '.join(route['species'])}"
+                  f"{' -> ' + ', '.join(route['fields']) if route['fields'] else ''}")
+        return route
+    
+    @staticmethod
+    def _route_fallbacks(route: Optional[dict]) -> List[Optional[dict]]:
+        """Filters to try when a routed search finds nothing: species only, then the whole index"""
+        if route is None:
+            return []
+        print("Routed search found nothing, widening the search...")
+        if "field" in route["filter"]:
+            return [{"id": route["filter"]["id"]}, None]
+        return [None]
+    
+    def _submit_sparse_search(self, question: str, k: int, filter: Optional[dict] = None):
+        """Start a BM25 search in the background (None if hybrid search is off)"""
+        if not self._use_hybrid():
+            return None
+        return self._get_sparse_executor().submit(self.sparse_index.search, question, k, filter)
+    
+    def _search_candidates(self, query_embedding, k: int, filter: Optional[dict] = None,
+                           sparse_future=None, dense: Optional[tuple] = None) -> tuple:
+        """
+        Dense search (unless results are given) fused with a pending BM25 search
+        
+        Species/field filters are answered by the structured store (one matmul
+        over those groups' vectors) when it holds them, other searches go to
+        the vector store.
+        
+        Returns:
+            tuple of (texts, scores, metadata)
+        """
+        if dense is None and filter and self.structured_store is not None:
+            dense = self.structured_store.search(query_embedding, k, filter)
+        if dense is None:
+            dense = self.vector_store.search_with_metadata(query_embedding, k, filter)
+        if sparse_future is None:
+            return dense
+        return self._fuse(dense, sparse_future.result(), k)
+    
+    @staticmethod
+    def _fuse(dense: tuple, sparse: tuple, k: int) -> tuple:
+        """Fuse dense and BM25 results (Config.HYBRID_FUSION) into k candidates"""
+        from src.sparse_index import fuse_results
+        fused = fuse_results(dense, sparse, k)
+        overlap = len(set(dense[0]) & set(sparse[0]))
+        print(f"Hybrid search: {len(dense[0])} dense + {len(sparse[0])} BM25 hits ({overlap} shared) "
+              f"-> {len(fused[0])} candidates ({Config.HYBRID_FUSION})")
+        return fused
+    
+    def _diversify(self, similar_texts: List[str], similarity_scores: List[float],
+                   similar_metadata: List[dict]) -> tuple:
+        """
+        Keep Config.MMR_TOP_K diverse candidates (maximal marginal relevance) for re-ranking
+        
+        Candidate vectors are looked up in the vector store by point ID, so BM25-only
+        hybrid candidates get theirs too. Candidates are returned in MMR pick order.
+        
+        Returns:
+            tuple of (texts, scores, metadata)
+        """
+        if not Config.USE_MMR or len(similar_texts) <= Config.MMR_TOP_K:
+            return similar_texts, similarity_scores, similar_metadata
+        vectors = self.vector_store.get_vectors(similar_metadata, similar_texts)
+        if vectors is None:
+            return similar_texts, similarity_scores, similar_metadata
+        
+        from src.mmr import mmr_select
+        picked = mmr_select(vectors, similarity_scores, Config.MMR_TOP_K)
+        print(f"🔀 MMR: {len(similar_texts)} candidates -> {len(picked)} diverse (λ={Config.MMR_LAMBDA})")
+        return ([similar_texts[i] for i in picked], [similarity_scores[i] for i in picked],
+                [similar_metadata[i] for i in picked])
+    
+    def _select_context(self, similar_texts: List[str], similarity_scores: List[float],
+                        reranked_results: List[tuple] = None, top_k: int = Config.TOP_K_RESULTS):
+        """
+        Pick the final context chunks from search (and optional re-ranking) results
+        
+        Returns:
+            tuple of (final_texts, final_scores, rerank_info)
+        """
+        if reranked_results is not None:
             # Extract re-ranked results
             final_texts = [item[0] for item in reranked_results]
             final_scores = [item[1] for item in reranked_results]  # Combined scores
@@ -237,49 +984,179 @@ class RAGPipeline:
         else:
             # Use original results, but limit to final_top_k
             final_k = Config.FINAL_TOP_K if Config.USE_RERANKING else top_k
-            final_texts = final_texts[:final_k]
-            final_scores = final_scores[:final_k]
+            final_texts = similar_texts[:final_k]
+            final_scores = similarity_scores[:final_k]
             rerank_info = {"reranking_used": False}
         
-        # Generate response using LLM
-        print("Generating response...")
-        response = self.llm.generate_response(question, final_texts)
+        return final_texts, final_scores, rerank_info
+    
+    def _match_metadata(self, final_texts: List[str], similar_texts: List[str],
+                        similar_metadata: List[dict]) -> List[dict]:
+        """Look up the metadata of the selected chunks (re-ranking reorders texts)"""
+        metadata_by_text = dict(zip(similar_texts, similar_metadata))
+        return [metadata_by_text.get(text, {}) for text in final_texts]
+    
+    def _whole_field_context(self, final_texts: List[str], final_scores: List[float],
+                             context_metadata: List[dict]) -> tuple:
+        """
+        Replace the selected chunks by their whole fields ("whole_field" context mode)
         
+        Fields come in the rank order of their best chunk (at most
+        Config.WHOLE_FIELD_MAX_FIELDS); each field is its chunks in document
+        order with the overlap written once. Chunks without a known field are kept.
+        
+        Returns:
+            tuple of (texts, scores, metadata)
+        """
+        if self.structured_store is None:
+            return final_texts, final_scores, context_metadata
+        from src.structured_store import group_key
+        
+        texts, scores, metadata, seen = [], [], [], set()
+        for text, score, chunk_metadata in zip(final_texts, final_scores, context_metadata):
+            key = group_key(chunk_metadata)
+            if key in seen:
+                continue
+            field = self.structured_store.get_field(chunk_metadata["id"], chunk_metadata["field"]) if key else None
+            if field is None:
+                texts.append(text)
+                scores.append(score)
+                metadata.append(chunk_metadata)
+                continue
+            if len(seen) >= Config.WHOLE_FIELD_MAX_FIELDS:
+                continue
+            seen.add(key)
+            merged_text, chunks_metadata = field
+            texts.append(merged_text)
+            scores.append(score)
+            metadata.append({**chunk_metadata, "chunk_index": None, "num_chunks": len(chunks_metadata)})
+        return texts, scores, metadata
+    
+    def _assemble_context(self, final_texts: List[str], final_scores: List[float],
+                          rerank_info: Dict[str, Any], context_metadata: List[dict]) -> tuple:
+        """
+        Merge overlapping chunks and pack them under the prompt token budget
+        
+        Returns:
+            tuple of (texts, scores, rerank_info with "context_assembly" stats, metadata)
+        """
+        if self.context_assembler is None or not final_texts:
+            return final_texts, final_scores, rerank_info, context_metadata
+        final_texts, final_scores, context_metadata, stats = self.context_assembler.assemble(
+            final_texts, final_scores, context_metadata
+        )
+        return final_texts, final_scores, {**rerank_info, "context_assembly": stats}, context_metadata
+    
+    def _build_result(self, response: str, final_texts: List[str], final_scores: List[float],
+                      rerank_info: Dict[str, Any], context_metadata: List[dict] = None,
+                      cached: Optional[dict] = None) -> Dict[str, Any]:
+        """Assemble the query result dictionary"""
         result = {
             "response": response,
             "context": final_texts,
             "similarity_scores": final_scores,
             "num_context_chunks": len(final_texts),
-            "rerank_info": rerank_info
+            "rerank_info": rerank_info,
+            "context_metadata": context_metadata or []
         }
-        
-        print("Query processed successfully!")
+        if cached is not None:
+            result["semantic_cache"] = {"cached_question": cached["question"], "similarity": cached["similarity"]}
         return result
     
+    def _lookup_answer(self, query_embedding, final_texts: List[str]) -> Optional[dict]:
+        """Stored answer of a similar question with the same context set, or None"""
+        if self.semantic_cache is None:
+            return None
+        from src.semantic_cache import context_fingerprint
+        cached = self.semantic_cache.lookup(query_embedding, context_fingerprint(final_texts))
+        if cached is not None:
+            print(f"⚡ Semantic cache hit (similarity {cached['similarity']:.3f}): \"{cached['question']}\"")
+        return cached
+    
+    def _store_answer(self, question: str, query_embedding, final_texts: List[str], response: str):
+        """Cache a generated answer (failed LLM calls are not cached)"""
+        if self.semantic_cache is None or not response:
+            return
+        if response.startswith(getattr(self.llm, "ERROR_PREFIX", "\0")):
+            return
+        from src.semantic_cache import context_fingerprint
+        self.semantic_cache.put(question, query_embedding, context_fingerprint(final_texts), response)
+    
+    def _invalidate_answers(self):
+        """Drop cached answers after the index changed (re-ingest / reset)"""
+        if self.semantic_cache is not None:
+            self.semantic_cache.invalidate()
+    
+    def _not_indexed_result(self) -> Dict[str, Any]:
+        """Result returned when no documents have been indexed"""
+        return {
+            "response": "Error: No documents have been indexed yet. Please ingest documents first.",
+            "context": [],
+            "similarity_scores": [],
+            "error": "No index available"
+        }
+    
+    def _no_context_result(self) -> Dict[str, Any]:
+        """Result returned when vector search finds nothing"""
+        return {
+            "response": "I couldn't find any relevant information to answer your question.",
+            "context": [],
+            "similarity_scores": [],
+            "error": "No relevant context found"
+        }
+    
     def get_pipeline_stats(self) -> Dict[str, Any]:
         """
         Get statistics about the current pipeline state
         
+        Does not load any component: stats of components that were not used yet
+        come from Config and the ingest manifest.
+        
         Returns:
             Dictionary with pipeline statistics
         """
+        reranker = self._reranker if self._reranker is not _UNSET else None
         rerank_info = {}
         if Config.USE_RERANKING:
             rerank_info = {
                 "reranking_enabled": True,
-                "cross_encoder_model": Config.CROSS_ENCODER_MODEL,
+                "cross_encoder_model": reranker.model_name if reranker is not None else Config.CROSS_ENCODER_MODEL,
+                "reranker_backend": reranker.backend if reranker is not None else Config.RERANKER_BACKEND,
                 "rerank_top_k": Config.RERANK_TOP_K,
                 "final_top_k": Config.FINAL_TOP_K,
                 "rerank_alpha": Config.RERANK_ALPHA,
-                "reranker_loaded": self.reranker is not None
+                "reranker_loaded": reranker is not None
             }
         else:
             rerank_info = {"reranking_enabled": False}
         
+        model_server = self._model_server if self._model_server is not _UNSET else None
         stats = {
             "is_indexed": self.is_indexed,
-            "vector_store_stats": self.vector_store.get_stats(),
+            "vector_store_stats": (self._vector_store.get_stats() if self._vector_store is not None
+                                   else self._manifest_index_stats()),
             "reranking": rerank_info,
+            "query_cache": (self._embedding_generator.query_cache.get_stats()
+                            if self._embedding_generator is not None else None),
+            "model_server": model_server.url if model_server is not None else None,
+            "semantic_cache": (self._semantic_cache.get_stats()
+                               if self._semantic_cache not in (_UNSET, None) else None),
+            "hybrid_search": {
+                "enabled": Config.USE_HYBRID_SEARCH,
+                "fusion": Config.HYBRID_FUSION,
+                "bm25_chunks": len(self._sparse_index) if self._sparse_index is not None else None,
+                "bm25_terms": len(self._sparse_index.vocab) if self._sparse_index is not None else None
+            },
+            "structured_store": (self._structured_store.get_stats()
+                                 if self._structured_store is not None else None),
+            "mmr": {"enabled": Config.USE_MMR, "lambda": Config.MMR_LAMBDA, "top_k": Config.MMR_TOP_K},
+            "context_mode": Config.CONTEXT_MODE,
+            "context_assembly": (self._context_assembler.get_stats()
+                                 if self._context_assembler is not None else None),
+            "entity_routing": {
+                "enabled": Config.USE_ENTITY_ROUTING,
+                "species": len(self._entity_router) if self._entity_router is not None else None
+            },
             "config": {
                 "chunk_size": Config.CHUNK_SIZE,
                 "chunk_overlap": Config.CHUNK_OVERLAP,
@@ -290,11 +1167,29 @@ class RAGPipeline:
         }
         return stats
     
+    @staticmethod
+    def _manifest_index_stats() -> Dict[str, Any]:
+        """Vector store stats from the ingest manifest (no index loading or network calls)"""
+        manifest = IngestManifest()
+        if not manifest.load():
+            return {"total_embeddings": 0, "dimension": Config.VECTOR_DIMENSION, "source": "no ingest manifest"}
+        return {
+            "total_embeddings": sum(len(entry["ids"]) for entry in manifest.entries.values()),
+            "dimension": Config.VECTOR_DIMENSION,
+            "backend": manifest.settings.get("backend"),
+            "location": manifest.settings.get("location"),
+            "source": "ingest manifest"
+        }
+    
     def reset_pipeline(self):
         """Reset the pipeline by clearing the vector store"""
         print("Resetting pipeline...")
-        self.vector_store = FAISSVectorStore()
+        self.vector_store = None  # a new, empty store is created on next use
+        self.sparse_index = None
+        self.entity_router = None
+        self.structured_store = None
         self.is_indexed = False
+        self._invalidate_answers()
         print("Pipeline reset completed!")
     
     def test_components(self) -> Dict[str, bool]:
@@ -1,31 +1,117 @@
 from typing import List, Tuple
 import numpy as np
-from sentence_transformers import CrossEncoder
 import logging
+from config.config import Config
+from src.embedding_backends import load_onnx_export, onnx_export_path
+
+RERANKER_BACKENDS = ("torch", "onnx")
+
+
+class OnnxCrossEncoderModel:
+    """ONNX Runtime (CPU) cross-encoder, a drop-in for CrossEncoder.predict"""
+    
+    def __init__(self, export_dir: str, quantized: bool = True, num_threads: int = 0):
+        """
+        Load an exported cross-encoder (see src/onnx_export.py) from a local directory
+        
+        Args:
+            export_dir: Directory with model.onnx / model_int8.onnx, tokenizer files and export_info.json
+            quantized: Use the dynamic int8 model when it exists
+            num_threads: ONNX Runtime intra-op threads (0 = runtime default)
+        """
+        self.info, self.session, self.tokenizer, self.model_path = load_onnx_export(export_dir, quantized, num_threads)
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.max_length = self.info["max_seq_length"]
+        self.activation = self.info.get("activation", "identity")
+    
+    def predict(self, sentences: List[List[str]], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Score (query, passage) pairs (same semantics as CrossEncoder.predict)
+        
+        Args:
+            sentences: List of [query, passage] pairs
+            batch_size: Pairs per session run
+            show_progress_bar: Unused (kept for API compatibility)
+            
+        Returns:
+            float32 array with one relevance score per pair
+        """
+        scores = np.zeros(len(sentences), dtype='float32')
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            encoded = self.tokenizer(
+                [pair[0] for pair in batch],
+                [pair[1] for pair in batch],
+                padding=True,
+                truncation="longest_first",
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            logits = self.session.run(None, feeds)[0][:, 0]
+            if self.activation == "sigmoid":
+                logits = 1 / (1 + np.exp(-logits))
+            scores[start:start + len(batch)] = logits
+        return scores
+
 
 class CrossEncoderReranker:
     """Cross-encoder based re-ranking for RAG pipeline"""
     
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-12-v2"):
+    def __init__(self, model_name: str = None, backend: str = None, fallback_model: str = None, model=None):
         """
         Initialize cross-encoder re-ranker
         
         Args:
-            model_name: Hugging Face model name for cross-encoder
+            model_name: Hugging Face model name for cross-encoder (default from Config.CROSS_ENCODER_MODEL)
+            backend: "torch" (sentence-transformers) or "onnx" (ONNX Runtime export),
+                     default from Config.RERANKER_BACKEND
+            fallback_model: Smaller model loaded (torch) if the configured one fails
+                            (default from Config.CROSS_ENCODER_FALLBACK_MODEL, "" = none)
+            model: Already-loaded model exposing predict(pairs), e.g. RemoteCrossEncoderModel
+                   (nothing is loaded; backend is only reported)
         """
-        self.model_name = model_name
-        self.model = None
+        self.model_name = model_name or Config.CROSS_ENCODER_MODEL
+        self.backend = backend or Config.RERANKER_BACKEND
+        self.fallback_model = Config.CROSS_ENCODER_FALLBACK_MODEL if fallback_model is None else fallback_model
+        self.model = model
+        if model is not None:
+            return
+        if self.backend not in RERANKER_BACKENDS:
+            raise ValueError(f"Unknown reranker backend '{self.backend}'. Expected one of {RERANKER_BACKENDS}")
         self._load_model()
         
     def _load_model(self):
-        """Load the cross-encoder model"""
+        """Load the cross-encoder model (configured backend, then the fallback model)"""
         try:
-            print(f"Loading cross-encoder model: {self.model_name}")
-            self.model = CrossEncoder(self.model_name)
+            print(f"Loading cross-encoder model: {self.model_name} (backend: {self.backend})")
+            self.model = self._load(self.model_name, self.backend)
             print("Cross-encoder model loaded successfully!")
         except Exception as e:
-            logging.error(f"Failed to load cross-encoder model: {e}")
-            raise e
+            if not self.fallback_model or (self.fallback_model, self.backend) == (self.model_name, "torch"):
+                logging.error(f"Failed to load cross-encoder model: {e}")
+                raise e
+            print(f"⚠️  Failed to load {self.model_name} ({self.backend}): {e}")
+            print(f"Falling back to {self.fallback_model} (torch)...")
+            self.model_name, self.backend = self.fallback_model, "torch"
+            try:
+                self.model = self._load(self.model_name, self.backend)
+                print("Cross-encoder model loaded successfully!")
+            except Exception as fallback_error:
+                logging.error(f"Failed to load cross-encoder model: {fallback_error}")
+                raise fallback_error
+    
+    @staticmethod
+    def _load(model_name: str, backend: str):
+        """Load one cross-encoder exposing predict(pairs)"""
+        if backend == "onnx":
+            return OnnxCrossEncoderModel(
+                onnx_export_path(model_name),
+                quantized=Config.ONNX_QUANTIZED,
+                num_threads=Config.ONNX_INTRA_OP_THREADS
+            )
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(model_name)
     
     def rerank(self, query: str, passages: List[str], top_k: int = None) -> List[Tuple[str, float]]:
         """
@@ -90,11 +176,75 @@ class CrossEncoderReranker:
             return []
         
         passages = [item[0] for item in passages_with_scores]
-        original_scores = [item[1] for item in passages_with_scores]
         
         # Get cross-encoder scores
         cross_encoder_scores = self.model.predict([[query, passage] for passage in passages])
         
+        combined_results = self._combine_scores(passages_with_scores, cross_encoder_scores, alpha, top_k)
+        
+        print(f"Combined re-ranking completed. Top combined score: {combined_results[0][1]:.4f}")
+        
+        return combined_results
+    
+    def rerank_batch_with_original_scores(
+        self,
+        queries: List[str],
+        passages_with_scores_list: List[List[Tuple[str, float]]],
+        alpha: float = 0.7,
+        top_k: int = None
+    ) -> List[List[Tuple[str, float, float, float]]]:
+        """
+        Re-rank candidates for many queries with a single cross-encoder predict call
+        
+        Args:
+            queries: List of search queries
+            passages_with_scores_list: Per-query list of tuples (passage, original_score)
+            alpha: Weight for cross-encoder score (1-alpha for original score)
+            top_k: Number of top passages to return per query
+            
+        Returns:
+            Per-query list of tuples (passage, combined_score, cross_encoder_score, original_score)
+        """
+        if self.model is None:
+            raise RuntimeError("Cross-encoder model not loaded")
+        
+        # Flatten every (query, passage) pair into one predict call
+        pairs = [
+            [query, passage]
+            for query, passages_with_scores in zip(queries, passages_with_scores_list)
+            for passage, _ in passages_with_scores
+        ]
+        if not pairs:
+            return [[] for _ in queries]
+        
+        print(f"Re-ranking {len(pairs)} passages for {len(queries)} queries...")
+        all_scores = self.model.predict(pairs)
+        
+        results = []
+        offset = 0
+        for passages_with_scores in passages_with_scores_list:
+            count = len(passages_with_scores)
+            if count == 0:
+                results.append([])
+                continue
+            query_scores = all_scores[offset:offset + count]
+            offset += count
+            results.append(self._combine_scores(passages_with_scores, query_scores, alpha, top_k))
+        
+        return results
+    
+    def _combine_scores(
+        self,
+        passages_with_scores: List[Tuple[str, float]],
+        cross_encoder_scores,
+        alpha: float,
+        top_k: int = None
+    ) -> List[Tuple[str, float, float, float]]:
+        """Normalize and combine cross-encoder scores with original retrieval scores"""
+        passages = [item[0] for item in passages_with_scores]
+        original_scores = [item[1] for item in passages_with_scores]
+        cross_encoder_scores = list(cross_encoder_scores)
+        
         # Normalize scores to [0, 1] range
         if len(cross_encoder_scores) > 1:
             ce_min, ce_max = min(cross_encoder_scores), max(cross_encoder_scores)
@@ -125,14 +275,13 @@ class CrossEncoderReranker:
         if top_k is not None:
             combined_results = combined_results[:top_k]
         
-        print(f"Combined re-ranking completed. Top combined score: {combined_results[0][1]:.4f}")
-        
         return combined_results
     
     def get_model_info(self) -> dict:
         """Get information about the loaded model"""
         return {
             "model_name": self.model_name,
+            "backend": self.backend,
             "model_loaded": self.model is not None,
             "model_type": "cross-encoder"
         }
\ No newline at end of file
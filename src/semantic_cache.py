@@ -0,0 +1,334 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+import faiss
+import numpy as np
+from config.config import Config
+
+
+def context_fingerprint(context_texts: List[str]) -> str:
+    """
+    Fingerprint of the context an answer was generated from
+
+    Order-insensitive (the same chunk set re-ranked differently matches) and
+    includes the LLM model, so switching models never serves old answers.
+    """
+    digest = hashlib.sha256(Config.LLM_MODEL.encode('utf-8'))
+    for text in sorted(context_texts):
+        digest.update(b"\x00")
+        digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache keyed by question embedding similarity
+
+    Previously answered questions are kept in a small exact inner-product FAISS
+    index (normalized vectors = cosine). A new question reuses a stored answer
+    when a cached question is at least `threshold` similar AND the retrieved
+    context set is identical (same fingerprint), so paraphrases skip the LLM
+    call while answers never outlive the chunks they were built from.
+
+    Entries expire after ttl_seconds and the least recently used entry is
+    evicted beyond max_size. The cache is persisted to {path}.json
+    (entries) + {path}.npy (vectors) by a background save that batches the
+    changes of save_delay seconds, so put() never writes on the request path.
+
+    {path}.generation holds the index generation, bumped by invalidate(). The
+    entries are saved with the generation they were built under and lookup()
+    checks the file, so a re-ingest by another process (CLI ingest next to a
+    running server) also drops the answers cached here.
+    """
+
+    def __init__(self, dimension: int = Config.VECTOR_DIMENSION, threshold: float = None,
+                 max_size: int = None, ttl_seconds: float = None, path: str = None,
+                 save_delay: float = None):
+        """
+        Initialize the cache and load it from disk if present
+
+        Args:
+            dimension: Question embedding dimension
+            threshold: Min cosine similarity for a hit (default from Config.SEMANTIC_CACHE_THRESHOLD)
+            max_size: Max cached answers (default from Config.SEMANTIC_CACHE_SIZE)
+            ttl_seconds: Seconds before an entry expires, 0 = never (default from Config.SEMANTIC_CACHE_TTL)
+            path: Base path on disk, "" = memory only (default from Config.SEMANTIC_CACHE_PATH)
+            save_delay: Seconds of changes batched into one background save
+                        (default from Config.SEMANTIC_CACHE_SAVE_DELAY)
+        """
+        self.dimension = dimension
+        self.threshold = threshold if threshold is not None else Config.SEMANTIC_CACHE_THRESHOLD
+        self.max_size = max_size if max_size is not None else Config.SEMANTIC_CACHE_SIZE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.SEMANTIC_CACHE_TTL
+        self.path = path if path is not None else Config.SEMANTIC_CACHE_PATH
+        self.save_delay = save_delay if save_delay is not None else Config.SEMANTIC_CACHE_SAVE_DELAY
+        self.generation_path = f"{self.path}.generation"
+
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        self._entries = OrderedDict()  # id -> entry dict, least recently used first
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # serializes writes, taken before _lock
+        self._save_timer = None
+        self._dirty = False
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if self.path:
+            self.load()
+            atexit.register(self.flush)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, query_embedding: np.ndarray, fingerprint: str) -> Optional[dict]:
+        """
+        Find a cached answer for a similar question with the same context
+
+        Args:
+            query_embedding: Normalized question embedding
+            fingerprint: context_fingerprint() of the retrieved context
+
+        Returns:
+            {"answer", "question", "similarity"} of the best match, or None
+        """
+        with self._lock:
+            self._check_generation()
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            vector = np.asarray(query_embedding, dtype='float32').reshape(1, -1)
+            k = min(len(self._entries), Config.SEMANTIC_CACHE_CANDIDATES)
+            scores, ids = self.index.search(vector, k)
+
+            now = time.time()
+            expired = []
+            match = None
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id < 0 or score < self.threshold:
+                    break
+                entry = self._entries[int(entry_id)]
+                if self.ttl_seconds and now - entry["created_at"] > self.ttl_seconds:
+                    expired.append(int(entry_id))
+                    continue
+                if entry["fingerprint"] == fingerprint:
+                    match = (int(entry_id), entry, float(score))
+                    break
+
+            if expired:
+                self._remove(expired)
+                self.expirations += len(expired)
+                self._schedule_save()
+
+            if match is None:
+                self.misses += 1
+                return None
+
+            entry_id, entry, score = match
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return {"answer": entry["answer"], "question": entry["question"], "similarity": score}
+
+    def put(self, question: str, query_embedding: np.ndarray, fingerprint: str, answer: str):
+        """
+        Store an answer (evicting the least recently used entries beyond max_size)
+
+        Args:
+            question: Question text (kept for inspection)
+            query_embedding: Normalized question embedding
+            fingerprint: context_fingerprint() of the context the answer was built from
+            answer: LLM answer
+        """
+        if self.max_size <= 0 or not answer:
+            return
+        with self._lock:
+            self._check_generation()
+            entry_id = self._next_id
+            self._next_id += 1
+            vector = np.asarray(query_embedding, dtype='float32').reshape(1, -1)
+            self.index.add_with_ids(vector, np.array([entry_id], dtype='int64'))
+            self._entries[entry_id] = {
+                "question": question,
+                "answer": answer,
+                "fingerprint": fingerprint,
+                "created_at": time.time(),
+                "vector": vector[0]
+            }
+
+            overflow = len(self._entries) - self.max_size
+            if overflow > 0:
+                self._remove(list(self._entries)[:overflow])
+                self.evictions += overflow
+            self._schedule_save()
+
+    def invalidate(self):
+        """
+        Drop every entry (called when the underlying index is re-ingested or reset)
+
+        The new generation is written at once so other processes sharing the
+        cache path stop serving their answers on their next lookup.
+        """
+        with self._lock:
+            if self._entries:
+                print(f"🧹 Semantic answer cache invalidated ({len(self._entries)} entries)")
+            self.index.reset()
+            self._entries.clear()
+            if self.path:
+                self.generation = max(self.generation, self._read_generation()) + 1
+                self._write_generation()
+            self._schedule_save()
+
+    def _remove(self, entry_ids: List[int]):
+        """Remove entries from the index and the LRU order (lock held)"""
+        self.index.remove_ids(np.array(entry_ids, dtype='int64'))
+        for entry_id in entry_ids:
+            self._entries.pop(entry_id, None)
+
+    def _read_generation(self) -> int:
+        """Index generation recorded on disk (0 if none)"""
+        try:
+            with open(self.generation_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_generation(self):
+        """Persist self.generation (lock held; atomic replace)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.generation_path}.tmp", 'w', encoding='utf-8') as f:
+            f.write(str(self.generation))
+        os.replace(f"{self.generation_path}.tmp", self.generation_path)
+
+    def _check_generation(self):
+        """Drop the entries if the index was re-ingested since they were cached (lock held)"""
+        if not self.path:
+            return
+        # A few bytes read per call: mtime checks can miss rewrites on coarse-timestamp filesystems
+        generation = self._read_generation()
+        if generation == self.generation:
+            return
+        if self._entries:
+            print(f"🧹 Semantic answer cache: index generation {self.generation} -> {generation}, "
+                  f"dropping {len(self._entries)} entries")
+        self.index.reset()
+        self._entries.clear()
+        self.generation = generation
+
+    def _schedule_save(self):
+        """Mark the cache changed and start the batched background save (lock held)"""
+        if not self.path:
+            return
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write pending changes now (run by the background save and at exit)"""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                # Never write entries of an index re-ingested since they were cached
+                self._check_generation()
+                # Snapshot under the lock, write outside it
+                entries = [{"id": entry_id, **{key: value for key, value in entry.items() if key != "vector"}}
+                           for entry_id, entry in self._entries.items()]
+                vectors = (np.vstack([entry["vector"] for entry in self._entries.values()]) if entries
+                           else np.zeros((0, self.dimension), dtype='float32'))
+                data = {"dimension": self.dimension, "generation": self.generation,
+                        "next_id": self._next_id, "entries": entries}
+
+            try:
+                self._save(data, vectors)
+            except OSError as e:
+                print(f"⚠️  Could not save semantic cache {self.path}: {e}")
+
+    def _save(self, data: dict, vectors: np.ndarray):
+        """Persist entries and vectors (save lock held; atomic replace)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(f"{self.path}.npy.tmp", 'wb') as f:
+            np.save(f, vectors)
+        with open(f"{self.path}.json.tmp", 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(f"{self.path}.npy.tmp", f"{self.path}.npy")
+        os.replace(f"{self.path}.json.tmp", f"{self.path}.json")
+
+    def load(self) -> bool:
+        """
+        Load the cache from disk (expired entries and entries of an older index generation are dropped)
+
+        Returns:
+            True if a cache file was found, False otherwise
+        """
+        self.generation = self._read_generation()
+        if not (os.path.exists(f"{self.path}.json") and os.path.exists(f"{self.path}.npy")):
+            return False
+        try:
+            with open(f"{self.path}.json", 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            vectors = np.load(f"{self.path}.npy")
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable semantic cache {self.path}: {e}")
+            return False
+        if data.get("dimension") != self.dimension or len(vectors) != len(data["entries"]):
+            print(f"⚠️  Ignoring semantic cache {self.path}: dimension/size mismatch")
+            return False
+        if data.get("generation", 0) != self.generation:
+            print(f"⚠️  Ignoring semantic cache {self.path}: built for an older index")
+            return False
+
+        now = time.time()
+        self.index.reset()
+        self._entries.clear()
+        self._next_id = data.get("next_id", 0)
+        keep_ids, keep_vectors = [], []
+        for entry, vector in zip(data["entries"], vectors):
+            if self.ttl_seconds and now - entry["created_at"] > self.ttl_seconds:
+                continue
+            entry_id = entry.pop("id")
+            self._entries[entry_id] = {**entry, "vector": vector.astype('float32')}
+            keep_ids.append(entry_id)
+            keep_vectors.append(vector)
+            self._next_id = max(self._next_id, entry_id + 1)
+        if keep_ids:
+            self.index.add_with_ids(np.vstack(keep_vectors).astype('float32'), np.array(keep_ids, dtype='int64'))
+        return True
+
+    def get_stats(self) -> dict:
+        """Cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
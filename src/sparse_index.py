@@ -0,0 +1,317 @@
+import json
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config.config import Config
+from src.chunk_store import ChunkStore, PayloadStore
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def strip_diacritics(token: str) -> str:
+    """Vietnamese syllable without tone/vowel marks ("rắn" -> "ran", "độc" -> "doc")"""
+    token = token.replace("đ", "d").replace("Đ", "D")
+    return "".join(c for c in unicodedata.normalize("NFD", token) if not unicodedata.combining(c))
+
+
+def tokenize(text: str, bigrams: bool = None) -> List[str]:
+    """
+    BM25 tokens of a text
+
+    Lower-cased NFC syllables, plus the diacritic-stripped form of every syllable
+    that has marks (so "ran ho mang" still matches "rắn hổ mang"), plus adjacent
+    syllable bigrams ("hổ_mang") that keep multi-syllable names precise.
+
+    Args:
+        text: Raw text (Vietnamese or Latin, e.g. "Achalinus rufescens")
+        bigrams: Add syllable bigrams (default from Config.SPARSE_BIGRAMS)
+
+    Returns:
+        List of tokens
+    """
+    if bigrams is None:
+        bigrams = Config.SPARSE_BIGRAMS
+    syllables = _WORD_RE.findall(unicodedata.normalize("NFC", text).lower())
+
+    tokens = list(syllables)
+    for syllable in syllables:
+        plain = strip_diacritics(syllable)
+        if plain != syllable:
+            tokens.append(plain)
+    if bigrams:
+        tokens.extend(f"{first}_{second}" for first, second in zip(syllables, syllables[1:]))
+    return tokens
+
+
+class BM25Index:
+    """
+    Local BM25 sparse index over chunk texts, kept next to the vector store
+
+    Chunks are keyed by the vector store's point IDs (FAISS labels / Qdrant
+    UUIDs), so ingest upserts and incremental deletes mirror the dense store
+    exactly. Texts and payloads use the same columnar stores as the FAISS
+    store (memory-mapped once saved), and payload filters work the same way.
+    Postings are rebuilt lazily after changes (numpy CSR, milliseconds for
+    this corpus size).
+    """
+
+    def __init__(self, path: str = None, k1: float = None, b: float = None):
+        """
+        Initialize an empty index
+
+        Args:
+            path: Base path on disk (default from Config.SPARSE_INDEX_PATH)
+            k1: BM25 term-frequency saturation (default from Config.BM25_K1)
+            b: BM25 length normalization (default from Config.BM25_B)
+        """
+        self.path = path or Config.SPARSE_INDEX_PATH
+        self.k1 = k1 if k1 is not None else Config.BM25_K1
+        self.b = b if b is not None else Config.BM25_B
+        self.reset()
+
+    def reset(self):
+        """Drop every document"""
+        self.texts = ChunkStore()
+        self.payloads = PayloadStore(Config.PAYLOAD_INDEX_FIELDS)
+        self.keys: List[str] = []
+        self.deleted = np.zeros(0, dtype=bool)
+        self.vocab: Dict[str, int] = {}
+        self._doc_terms: List[np.ndarray] = []
+        self._doc_tfs: List[np.ndarray] = []
+        self._row_of = None
+        self._postings = None
+
+    def __len__(self) -> int:
+        return int((~self.deleted).sum())
+
+    @property
+    def row_of(self) -> Dict[str, int]:
+        """Point ID -> live row"""
+        if self._row_of is None:
+            self._row_of = {key: row for row, key in enumerate(self.keys) if not self.deleted[row]}
+        return self._row_of
+
+    def add(self, texts: List[str], metadata: Optional[List[dict]] = None, ids: List = None):
+        """
+        Add (upsert) chunks
+
+        Args:
+            texts: Chunk texts
+            metadata: Optional per-chunk payloads
+            ids: Vector store point IDs of the chunks (existing IDs are replaced)
+        """
+        if not texts:
+            return
+        if metadata is None:
+            metadata = [None] * len(texts)
+        keys = [str(point_id) for point_id in ids]
+
+        # Keep the first occurrence of an ID within the batch (as the vector stores do)
+        first = {}
+        for i, key in enumerate(keys):
+            first.setdefault(key, i)
+        if len(first) < len(keys):
+            keep = sorted(first.values())
+            texts, metadata, keys = [texts[i] for i in keep], [metadata[i] for i in keep], [keys[i] for i in keep]
+
+        self.delete_ids(keys)
+        for text in texts:
+            counts = Counter(self.vocab.setdefault(token, len(self.vocab)) for token in tokenize(text))
+            self._doc_terms.append(np.fromiter(counts.keys(), dtype=np.int32, count=len(counts)))
+            self._doc_tfs.append(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+
+        start = len(self.keys)
+        self.keys.extend(keys)
+        self.texts.extend(texts)
+        self.payloads.extend(metadata)
+        self.deleted = np.concatenate([self.deleted, np.zeros(len(keys), dtype=bool)])
+        if self._row_of is not None:
+            self._row_of.update({key: start + i for i, key in enumerate(keys)})
+        self._postings = None
+
+    def delete_ids(self, ids: List) -> int:
+        """
+        Delete chunks by point ID
+
+        Returns:
+            Number of chunks deleted
+        """
+        rows = [self.row_of[key] for key in map(str, ids) if key in self.row_of]
+        if not rows:
+            return 0
+        self.deleted[rows] = True
+        for row in rows:
+            del self._row_of[self.keys[row]]
+        self._postings = None
+        return len(rows)
+
+    def _build_postings(self):
+        """Per-term (rows, BM25 weights) in CSR form over live documents"""
+        live = np.flatnonzero(~self.deleted)
+        n_terms = len(self.vocab)
+        if len(live) == 0:
+            self._postings = (np.zeros(n_terms + 1, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                              np.zeros(0, dtype=np.float32))
+            return
+
+        terms = np.concatenate([self._doc_terms[row] for row in live])
+        tfs = np.concatenate([self._doc_tfs[row] for row in live])
+        lengths = np.array([self._doc_tfs[row].sum() for row in live], dtype=np.float32)
+        rows = np.repeat(live, [len(self._doc_terms[row]) for row in live])
+        doc_lengths = np.repeat(lengths, [len(self._doc_terms[row]) for row in live])
+
+        df = np.bincount(terms, minlength=n_terms).astype(np.float32)
+        idf = np.log(1 + (len(live) - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * doc_lengths / lengths.mean())
+        weights = idf[terms] * tfs * (self.k1 + 1) / (tfs + norm)
+
+        order = np.argsort(terms, kind='stable')
+        indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=indptr[1:])
+        self._postings = (indptr, rows[order], weights[order].astype(np.float32))
+
+    def _scores(self, query: str) -> np.ndarray:
+        """BM25 score of every row for a query"""
+        if self._postings is None:
+            self._build_postings()
+        indptr, post_rows, post_weights = self._postings
+        scores = np.zeros(len(self.keys), dtype=np.float32)
+        for token, count in Counter(tokenize(query)).items():
+            term = self.vocab.get(token)
+            if term is None:
+                continue
+            start, end = indptr[term], indptr[term + 1]
+            scores[post_rows[start:end]] += count * post_weights[start:end]
+        return scores
+
+    def search(self, query: str, k: int = Config.TOP_K_RESULTS,
+               filter: Optional[dict] = None) -> Tuple[List[str], List[float], List[dict]]:
+        """
+        BM25 search
+
+        Args:
+            query: Question text
+            k: Number of results
+            filter: Optional payload filter, e.g. {"id": "12", "field": "Độc tính"}
+
+        Returns:
+            tuple of (texts, scores, metadata), best first (only rows sharing a token)
+        """
+        if len(self) == 0:
+            return [], [], []
+        scores = self._scores(query)
+        if filter:
+            scores[~self.payloads.match(filter)] = 0
+        scores[self.deleted] = 0
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        top = [row for row in top if scores[row] > 0]
+        return ([self.texts[row] for row in top], [float(scores[row]) for row in top],
+                [self.payloads[row] for row in top])
+
+    def save(self, path: str = None):
+        """Write the index to disk (deleted rows are compacted away)"""
+        path = path or self.path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        rows = np.flatnonzero(~self.deleted).tolist()
+        self.texts.save(path, rows)
+        self.payloads.save(path, rows)
+        self.keys = [self.keys[row] for row in rows]
+        self._doc_terms = [self._doc_terms[row] for row in rows]
+        self._doc_tfs = [self._doc_tfs[row] for row in rows]
+        self.deleted = np.zeros(len(rows), dtype=bool)
+        self._row_of = None
+        self._postings = None
+
+        lengths = np.array([len(terms) for terms in self._doc_terms], dtype=np.int64)
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        np.savez(
+            f"{path}_bm25.npz",
+            indptr=indptr,
+            terms=np.concatenate(self._doc_terms) if self._doc_terms else np.zeros(0, dtype=np.int32),
+            tfs=np.concatenate(self._doc_tfs) if self._doc_tfs else np.zeros(0, dtype=np.float32)
+        )
+        with open(f"{path}_bm25.json", 'w', encoding='utf-8') as f:
+            vocab = sorted(self.vocab, key=self.vocab.get)
+            json.dump({"k1": self.k1, "b": self.b, "bigrams": Config.SPARSE_BIGRAMS,
+                       "keys": self.keys, "vocab": vocab}, f, ensure_ascii=False)
+        print(f"BM25 index saved to {path} ({len(self.keys)} chunks, {len(self.vocab)} terms)")
+
+    def load(self, path: str = None) -> bool:
+        """
+        Load the index from disk
+
+        Returns:
+            True if an index was found, False otherwise
+        """
+        path = path or self.path
+        if not (os.path.exists(f"{path}_bm25.json") and os.path.exists(f"{path}_bm25.npz")
+                and ChunkStore.exists(path) and PayloadStore.exists(path)):
+            return False
+        with open(f"{path}_bm25.json", 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("bigrams") != Config.SPARSE_BIGRAMS:
+            print(f"⚠️  BM25 index at {path} was built with a different tokenizer, ignoring it")
+            return False
+
+        self.reset()
+        self.path = path
+        self.keys = data["keys"]
+        self.vocab = {token: term for term, token in enumerate(data["vocab"])}
+        with np.load(f"{path}_bm25.npz") as arrays:
+            indptr, terms, tfs = arrays["indptr"], arrays["terms"], arrays["tfs"]
+        self._doc_terms = [terms[start:end] for start, end in zip(indptr[:-1], indptr[1:])]
+        self._doc_tfs = [tfs[start:end] for start, end in zip(indptr[:-1], indptr[1:])]
+        self.texts = ChunkStore.load(path)
+        self.payloads = PayloadStore.load(path)
+        self.deleted = np.zeros(len(self.keys), dtype=bool)
+        print(f"BM25 index loaded from {path} ({len(self.keys)} chunks)")
+        return True
+
+
+def fuse_results(dense: Tuple[List[str], List[float], List[dict]],
+                 sparse: Tuple[List[str], List[float], List[dict]],
+                 k: int, method: str = None) -> Tuple[List[str], List[float], List[dict]]:
+    """
+    Fuse dense and sparse result lists (chunks are matched by text)
+
+    Args:
+        dense: (texts, scores, metadata) from the vector store
+        sparse: (texts, scores, metadata) from BM25Index.search
+        k: Number of fused results
+        method: "rrf" (reciprocal rank fusion, 1 / (HYBRID_RRF_K + rank)) or
+                "weighted" (min-max normalized scores, HYBRID_DENSE_WEIGHT for dense)
+                (default from Config.HYBRID_FUSION)
+
+    Returns:
+        tuple of (texts, fused scores, metadata), best first
+    """
+    method = method or Config.HYBRID_FUSION
+    if method not in ("rrf", "weighted"):
+        raise ValueError(f"Unknown fusion method '{method}'. Expected 'rrf' or 'weighted'")
+
+    fused: Dict[str, float] = {}
+    metadata: Dict[str, dict] = {}
+    for (texts, scores, payloads), weight in ((dense, Config.HYBRID_DENSE_WEIGHT), (sparse, 1 - Config.HYBRID_DENSE_WEIGHT)):
+        if not texts:
+            continue
+        if method == "rrf":
+            contributions = [1.0 / (Config.HYBRID_RRF_K + rank) for rank in range(1, len(texts) + 1)]
+        else:
+            low, high = min(scores), max(scores)
+            contributions = [weight * ((score - low) / (high - low) if high > low else 1.0) for score in scores]
+        for text, contribution, payload in zip(texts, contributions, payloads):
+            fused[text] = fused.get(text, 0.0) + contribution
+            metadata.setdefault(text, payload)
+
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+    return [text for text, _ in ranked], [score for _, score in ranked], [metadata[text] for text, _ in ranked]
@@ -0,0 +1,92 @@
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+from config.config import Config
+
+# Third-party packages worth reporting separately (cumulative import time)
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "onnxruntime",
+                 "faiss", "qdrant_client", "google.genai", "numpy"]
+
+
+def profile_imports(module: str = "main") -> List[Tuple[str, float]]:
+    """
+    Cumulative import time of a module and its heavy dependencies, in a fresh interpreter
+
+    Runs `python -X importtime -c "import <module>"` so nothing is cached by this process.
+
+    Args:
+        module: Module to import (default: the CLI entry point)
+
+    Returns:
+        List of (module name, seconds) sorted by time, slowest first
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root, capture_output=True, text=True
+    )
+    cumulative: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)", line)
+        if match:
+            cumulative[match.group(2)] = int(match.group(1)) / 1e6
+
+    tracked = [module] + HEAVY_MODULES + [name for name in cumulative if name.startswith("src.")]
+    return sorted(((name, cumulative[name]) for name in set(tracked) if name in cumulative),
+                  key=lambda item: item[1], reverse=True)
+
+
+def profile_components() -> List[Tuple[str, float, str]]:
+    """
+    Time RAGPipeline construction and the first use of every lazy component
+
+    Returns:
+        List of (step, seconds, status)
+    """
+    steps = []
+
+    from src.rag_pipeline import RAGPipeline
+
+    started = time.perf_counter()
+    rag = RAGPipeline()
+    steps.append(("RAGPipeline()", time.perf_counter() - started, "ok"))
+
+    started = time.perf_counter()
+    rag.get_pipeline_stats()
+    steps.append(("get_pipeline_stats()", time.perf_counter() - started, "ok"))
+
+    for component in ("model_server", "embedding_generator", "vector_store", "reranker", "llm"):
+        started = time.perf_counter()
+        try:
+            value = getattr(rag, component)
+            status = "ok" if value is not None else "not available"
+        except Exception as e:
+            status = f"failed: {e}"
+        steps.append((f"first use: {component}", time.perf_counter() - started, status))
+    return steps
+
+
+def profile_startup():
+    """Print import times and lazy component construction times"""
+    print("=" * 70)
+    print("STARTUP PROFILE")
+    print("=" * 70)
+
+    print("\nImport time (cumulative, fresh interpreter: python -X importtime -c 'import main')")
+    print(f"{'Module':<40} {'Seconds':>10}")
+    print("-" * 52)
+    for name, seconds in profile_imports("main"):
+        print(f"{name:<40} {seconds:>10.3f}")
+
+    print(f"\nComponent construction (embedding backend: {Config.EMBEDDING_BACKEND}, "
+          f"vector store: {'qdrant' if Config.USE_QDRANT else 'faiss'})")
+    print(f"{'Step':<40} {'Seconds':>10}  Status")
+    print("-" * 70)
+    total = 0.0
+    for step, seconds, status in profile_components():
+        total += seconds
+        print(f"{step:<40} {seconds:>10.3f}  {status}")
+    print(f"{'Total':<40} {total:>10.3f}")
@@ -0,0 +1,271 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config.config import Config
+from src.chunk_store import ChunkStore, PayloadStore
+from src.document_processor import DocumentProcessor
+
+
+def group_key(metadata: Optional[dict]) -> Optional[str]:
+    """ "doc id|field" of a chunk, None for chunks without structured metadata"""
+    if not metadata or not metadata.get("id") or not metadata.get("field") or metadata.get("chunk_index") is None:
+        return None
+    return f"{metadata['id']}|{metadata['field']}"
+
+
+class StructuredStore:
+    """
+    (species id, field) -> ordered chunks, with their vectors packed contiguously
+
+    The corpus is 124 species x a fixed set of fields, so a question routed to a
+    species/field (see EntityRouter) only needs the few chunks of those groups.
+    Vectors are packed group by group (document order inside a group), every
+    group is a [start, end) slice, and a routed query is scored with one matmul
+    over the gathered slices, with no vector store round trip.
+
+    Groups are kept in memory as they are ingested and packed lazily on the
+    first query / save. Saved to {path}.npy (vectors), a ChunkStore for texts
+    and point IDs, a PayloadStore for metadata and {path}.json (group slices
+    only). Loading memory-maps all of them, so startup does not grow with the
+    corpus; the groups are only rebuilt in memory when an ingest modifies a
+    loaded store.
+    """
+
+    FILTER_FIELDS = ("id", "field")
+
+    def __init__(self, dimension: int = Config.VECTOR_DIMENSION, path: str = None):
+        """
+        Args:
+            dimension: Embedding dimension
+            path: Base path on disk (default from Config.STRUCTURED_STORE_PATH)
+        """
+        self.dimension = dimension
+        self.path = path or Config.STRUCTURED_STORE_PATH
+        self.reset()
+
+    def reset(self):
+        """Drop every group"""
+        # key -> {chunk_index: (point id, text, metadata, vector)}; None while a
+        # loaded store is only read (see _materialize)
+        self._groups: Optional[Dict[str, Dict[int, tuple]]] = {}
+        self._group_of: Dict[str, str] = {}  # str(point id) -> key
+        self._packed = None
+
+    def __len__(self) -> int:
+        if self._groups is None:
+            return len(self._packed[1])
+        return len(self._group_of)
+
+    @property
+    def num_groups(self) -> int:
+        return len(self._packed[0]) if self._groups is None else len(self._groups)
+
+    def _materialize(self):
+        """Rebuild editable groups from a loaded (memory-mapped) store, before an ingest modifies it"""
+        if self._groups is not None:
+            return
+        offsets, point_ids, texts, metadata, matrix = self._packed
+        matrix = np.array(matrix)
+        self._groups, self._group_of = {}, {}
+        for key, (start, end) in offsets.items():
+            group = self._groups.setdefault(key, {})
+            for row in range(start, end):
+                chunk_metadata = metadata[row]
+                group[chunk_metadata["chunk_index"]] = (point_ids[row], texts[row], chunk_metadata, matrix[row])
+                self._group_of[str(point_ids[row])] = key
+
+    def add(self, embeddings: np.ndarray, texts: List[str], metadata: List[dict], ids: List):
+        """
+        Add (upsert) chunks; chunks without id/field/chunk_index metadata are ignored
+
+        Args:
+            embeddings: Chunk embeddings (normalized here, as the vector stores do)
+            texts: Chunk texts
+            metadata: Chunk metadata (see DocumentProcessor.build_chunk_metadata)
+            ids: Vector store point IDs of the chunks
+        """
+        if metadata is None:
+            return
+        self._materialize()
+        vectors = np.asarray(embeddings, dtype='float32').reshape(-1, self.dimension)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1)
+
+        for vector, text, chunk_metadata, point_id in zip(vectors, texts, metadata, ids):
+            key = group_key(chunk_metadata)
+            if key is None:
+                continue
+            self.delete_ids([point_id])
+            self._groups.setdefault(key, {})[chunk_metadata["chunk_index"]] = (point_id, text, chunk_metadata, vector)
+            self._group_of[str(point_id)] = key
+        self._packed = None
+
+    def delete_ids(self, ids: List) -> int:
+        """
+        Delete chunks by point ID
+
+        Returns:
+            Number of chunks deleted
+        """
+        self._materialize()
+        deleted = 0
+        for point_id in ids:
+            key = self._group_of.pop(str(point_id), None)
+            if key is None:
+                continue
+            group = self._groups[key]
+            for chunk_index, (group_point_id, *_) in list(group.items()):
+                if str(group_point_id) == str(point_id):
+                    del group[chunk_index]
+            if not group:
+                del self._groups[key]
+            deleted += 1
+        if deleted:
+            self._packed = None
+        return deleted
+
+    def _pack(self):
+        """Contiguous vector matrix with one [start, end) slice per group"""
+        if self._packed is not None:
+            return self._packed
+        offsets, point_ids, texts, metadata, vectors = {}, [], [], [], []
+        for key in sorted(self._groups):
+            group = self._groups[key]
+            start = len(texts)
+            for chunk_index in sorted(group):
+                point_id, text, chunk_metadata, vector = group[chunk_index]
+                point_ids.append(point_id)
+                texts.append(text)
+                metadata.append(chunk_metadata)
+                vectors.append(vector)
+            offsets[key] = (start, len(texts))
+        matrix = np.vstack(vectors).astype('float32') if vectors else np.zeros((0, self.dimension), dtype='float32')
+        self._packed = (offsets, point_ids, texts, metadata, matrix)
+        return self._packed
+
+    def covers(self, filter: Optional[dict]) -> bool:
+        """The filter only constrains id/field and selects at least one group"""
+        return bool(filter) and set(filter) <= set(self.FILTER_FIELDS) and bool(self.group_keys(filter))
+
+    def group_keys(self, filter: dict) -> List[str]:
+        """
+        Groups selected by an {"id": ..., "field": ...} filter (values may be lists)
+
+        Returns:
+            Matching "doc id|field" keys in packed order
+        """
+        wanted = {}
+        for name in self.FILTER_FIELDS:
+            if name in filter:
+                value = filter[name]
+                wanted[name] = {str(v) for v in value} if isinstance(value, (list, tuple, set)) else {str(value)}
+        offsets = self._pack()[0]
+        keys = []
+        for key in offsets:
+            doc_id, field = key.split("|", 1)
+            if doc_id in wanted.get("id", {doc_id}) and field in wanted.get("field", {field}):
+                keys.append(key)
+        return keys
+
+    def search(self, query_embedding: np.ndarray, k: int, filter: dict) -> Optional[Tuple[List[str], List[float], List[dict]]]:
+        """
+        Exact search restricted to the groups selected by a filter
+
+        Args:
+            query_embedding: Query embedding
+            k: Number of results
+            filter: {"id": ..., "field": ...} (see group_keys)
+
+        Returns:
+            tuple of (texts, scores, metadata), best first, or None if the store
+            cannot answer the filter (other payload fields, or no matching group)
+        """
+        if not self.covers(filter):
+            return None
+        offsets, _, texts, metadata, matrix = self._pack()
+        rows = np.concatenate([np.arange(*offsets[key]) for key in self.group_keys(filter)])
+
+        query = np.asarray(query_embedding, dtype='float32').reshape(-1)
+        norm = np.linalg.norm(query)
+        scores = matrix[rows] @ (query / norm if norm > 0 else query)
+
+        top = np.argsort(-scores, kind='stable')[:k]
+        return [texts[rows[i]] for i in top], [float(scores[i]) for i in top], [metadata[rows[i]] for i in top]
+
+    def get_field(self, doc_id: str, field: str) -> Optional[Tuple[str, List[dict]]]:
+        """
+        Whole field text in document order, overlap between chunks written once
+
+        Returns:
+            tuple of (merged text, metadata of its chunks), or None if the group is unknown
+        """
+        offsets, _, texts, metadata, _ = self._pack()
+        span = offsets.get(f"{doc_id}|{field}")
+        if span is None:
+            return None
+        rows = range(*span)
+        chunk_texts = [texts[row] for row in rows]
+        context_prefix = DocumentProcessor.context_prefix_of(chunk_texts[0], field)
+        return DocumentProcessor.merge_chunks(chunk_texts, context_prefix), [metadata[row] for row in rows]
+
+    def save(self, path: str = None):
+        """Write the packed store to disk"""
+        path = path or self.path
+        if self._groups is None and path == self.path:
+            # Loaded from this path and not modified since
+            return
+        # The memory maps of a loaded store are released below
+        self._materialize()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        offsets, point_ids, texts, metadata, matrix = self._pack()
+
+        with open(f"{path}.npy.tmp", 'wb') as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype='float32'))
+        text_store, id_store, payload_store = ChunkStore(), ChunkStore(), PayloadStore(self.FILTER_FIELDS)
+        text_store.extend(texts[row] for row in range(len(texts)))
+        id_store.extend(str(point_ids[row]) for row in range(len(point_ids)))
+        payload_store.extend(metadata[row] for row in range(len(metadata)))
+
+        # Release the current memory maps before replacing the files (required on Windows)
+        self._packed = None
+        text_store.save(path)
+        id_store.save(f"{path}_ids")
+        payload_store.save(path)
+        os.replace(f"{path}.npy.tmp", f"{path}.npy")
+        with open(f"{path}.json", 'w', encoding='utf-8') as f:
+            json.dump({"dimension": self.dimension, "offsets": offsets}, f)
+        print(f"Structured store saved to {path} ({len(offsets)} groups, {len(text_store)} chunks)")
+
+    def load(self, path: str = None) -> bool:
+        """
+        Memory-map the store saved at path
+
+        Returns:
+            True if a store was found, False otherwise
+        """
+        path = path or self.path
+        if not (os.path.exists(f"{path}.json") and os.path.exists(f"{path}.npy")
+                and ChunkStore.exists(path) and ChunkStore.exists(f"{path}_ids")
+                and PayloadStore.exists(path)):
+            return False
+        with open(f"{path}.json", 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("dimension") != self.dimension:
+            print(f"⚠️  Ignoring structured store {path}: dimension mismatch")
+            return False
+
+        self.reset()
+        self.path = path
+        self._groups = None
+        self._packed = ({key: tuple(span) for key, span in data["offsets"].items()},
+                        ChunkStore.load(f"{path}_ids"), ChunkStore.load(path),
+                        PayloadStore.load(path), np.load(f"{path}.npy", mmap_mode='r'))
+        print(f"Structured store loaded from {path} ({self.num_groups} groups, {len(self)} chunks)")
+        return True
+
+    def get_stats(self) -> dict:
+        """Store statistics"""
+        return {"groups": self.num_groups, "chunks": len(self), "dimension": self.dimension}
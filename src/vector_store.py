@@ -1,33 +1,176 @@
 import faiss
 import numpy as np
 import pickle
+import hashlib
+import json
 import os
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from config.config import Config
+from src.chunk_store import ChunkStore, PayloadStore
+from src.document_processor import DocumentProcessor
+
+
+def make_label(metadata: Optional[dict], text: str) -> int:
+    """
+    Deterministic 63-bit FAISS label for a chunk
+    
+    Derived from the same chunk key as the Qdrant point IDs, so adding a chunk
+    that is already indexed replaces it instead of duplicating it.
+    
+    Args:
+        metadata: Chunk metadata dict (may be None)
+        text: Chunk text
+        
+    Returns:
+        Non-negative int64 label
+    """
+    digest = hashlib.sha256(DocumentProcessor.chunk_key(metadata, text).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little") & 0x7FFFFFFFFFFFFFFF
 
 class FAISSVectorStore:
     """FAISS-based vector store for similarity search"""
     
-    def __init__(self):
-        """Initialize FAISS vector store"""
+    INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+    
+    def __init__(self, index_type: str = None):
+        """
+        Initialize FAISS vector store
+        
+        Args:
+            index_type: "flat", "hnsw", "ivf_flat" or "ivf_pq" (default from Config.FAISS_INDEX_TYPE)
+        """
         self.dimension = Config.VECTOR_DIMENSION
         self.index = None
-        self.texts = []  # Store original texts
+        self.index_type = index_type or Config.FAISS_INDEX_TYPE
+        self.nlist = Config.FAISS_IVF_NLIST
+        self.nprobe = Config.FAISS_IVF_NPROBE
+        self.ef_search = Config.FAISS_HNSW_EF_SEARCH
+        self.texts = ChunkStore()  # Original texts (memory-mapped once saved/loaded)
+        self.payloads = PayloadStore(Config.PAYLOAD_INDEX_FIELDS)  # Per-chunk metadata
+        self.ids = np.zeros(0, dtype=np.int64)  # FAISS label of each row
+        self.deleted = np.zeros(0, dtype=bool)  # Rows removed since the last save (compacted on save)
+        self._row_of = None  # label -> row for live rows (built lazily)
         self.index_path = Config.FAISS_INDEX_PATH
         
+        if self.index_type not in self.INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type '{self.index_type}'. Expected one of {self.INDEX_TYPES}")
+        
+    # The index lives in-process and is not thread-safe: one writer at a time
+    supports_concurrent_writes = False
+    
     def create_index(self):
-        """Create a new FAISS index"""
-        # Using IndexFlatIP for cosine similarity (Inner Product)
-        self.index = faiss.IndexFlatIP(self.dimension)
-        print(f"Created new FAISS index with dimension {self.dimension}")
+        """Create a new FAISS index of the configured type"""
+        # All index types use Inner Product on normalized vectors (= cosine similarity).
+        # Flat and HNSW are wrapped in IndexIDMap2 so rows carry stable chunk labels;
+        # IVF indexes store labels natively.
+        if self.index_type == "flat":
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        elif self.index_type == "hnsw":
+            hnsw = faiss.IndexHNSWFlat(self.dimension, Config.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            hnsw.hnsw.efConstruction = Config.FAISS_HNSW_EF_CONSTRUCTION
+            self.index = faiss.IndexIDMap2(hnsw)
+        elif self.index_type == "ivf_flat":
+            quantizer = faiss.IndexFlatIP(self.dimension)
+            self.index = faiss.IndexIVFFlat(quantizer, self.dimension, self.nlist, faiss.METRIC_INNER_PRODUCT)
+        else:  # ivf_pq
+            quantizer = faiss.IndexFlatIP(self.dimension)
+            self.index = faiss.IndexIVFPQ(
+                quantizer, self.dimension, self.nlist,
+                Config.FAISS_PQ_M, Config.FAISS_PQ_NBITS, faiss.METRIC_INNER_PRODUCT
+            )
+        
+        self.set_search_params()
+        print(f"Created new FAISS {self.index_type} index with dimension {self.dimension}")
+    
+    def set_search_params(self, nprobe: int = None, ef_search: int = None):
+        """
+        Set query-time recall/latency knobs
+        
+        Args:
+            nprobe: IVF clusters scanned per query (ivf_flat / ivf_pq)
+            ef_search: HNSW search depth (hnsw)
+        """
+        if nprobe is not None:
+            self.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
+        
+        if self.index is None:
+            return
+        base = self._base_index()
+        if self.index_type == "hnsw":
+            base.hnsw.efSearch = self.ef_search
+        elif self.index_type in ("ivf_flat", "ivf_pq"):
+            base.nprobe = min(self.nprobe, base.nlist)
+    
+    def _base_index(self):
+        """The underlying index (unwrapped from IndexIDMap2 if needed)"""
+        if isinstance(self.index, faiss.IndexIDMap2):
+            return faiss.downcast_index(self.index.index)
+        return self.index
+    
+    def _supports_ids(self) -> bool:
+        """Whether the index accepts explicit labels (indexes saved before labels existed do not)"""
+        return isinstance(self.index, faiss.IndexIDMap2) or self.index_type in ("ivf_flat", "ivf_pq")
+    
+    @property
+    def row_of(self) -> dict:
+        """Mapping from FAISS label to row number for live (not deleted) rows"""
+        if self._row_of is None:
+            live = np.flatnonzero(~self.deleted)
+            self._row_of = dict(zip(self.ids[live].tolist(), live.tolist()))
+        return self._row_of
+    
+    def make_ids(self, metadata: Optional[List[dict]], texts: List[str]) -> List[int]:
+        """
+        Deterministic labels for chunks (see make_label)
+        
+        Args:
+            metadata: optional list of metadata dicts for each text
+            texts: list of text chunks
+            
+        Returns:
+            List of int64 labels
+        """
+        return [make_label(metadata[i] if metadata and i < len(metadata) else None, text)
+                for i, text in enumerate(texts)]
     
-    def add_embeddings(self, embeddings: np.ndarray, texts: List[str]):
+    def _train_index(self, embeddings: np.ndarray):
+        """Train IVF/PQ indexes on a random sample of the embeddings"""
+        sample_size = min(len(embeddings), Config.FAISS_TRAIN_SAMPLE_SIZE)
+        rng = np.random.default_rng(0)
+        sample = embeddings[rng.choice(len(embeddings), sample_size, replace=False)]
+        
+        if self.index_type == "ivf_pq" and sample_size < 2 ** Config.FAISS_PQ_NBITS:
+            raise ValueError(
+                f"ivf_pq needs at least {2 ** Config.FAISS_PQ_NBITS} training vectors, got {sample_size}. "
+                f"Use a smaller FAISS_PQ_NBITS or another index type."
+            )
+        
+        # k-means needs ~39 points per cluster; shrink nlist for small corpora
+        max_nlist = max(1, sample_size // 39)
+        if self.nlist > max_nlist:
+            print(f"  Reducing nlist from {self.nlist} to {max_nlist} for {sample_size} training vectors")
+            self.nlist = max_nlist
+            self.create_index()
+        
+        print(f"Training FAISS {self.index_type} index on {sample_size} vectors (nlist={self.nlist})...")
+        self.index.train(sample)
+        self.set_search_params()
+    
+    def add_embeddings(self, embeddings: np.ndarray, texts: List[str], metadata: Optional[List[dict]] = None,
+                       ids: Optional[List[int]] = None):
         """
-        Add embeddings and corresponding texts to the index
+        Add (upsert) embeddings and corresponding texts to the index
+        
+        Chunks whose label is already indexed are replaced, so re-adding the
+        same chunk does not duplicate it.
         
         Args:
             embeddings: numpy array of embeddings
             texts: list of corresponding text chunks
+            metadata: optional list of metadata dicts for each text
+            ids: optional explicit labels (default derived from metadata/text)
         """
         if self.index is None:
             self.create_index()
@@ -36,38 +179,213 @@ class FAISSVectorStore:
         embeddings = embeddings.astype('float32')
         faiss.normalize_L2(embeddings)
         
-        # Add to index
-        self.index.add(embeddings)
+        # IVF/PQ indexes must be trained before the first add
+        if not self.index.is_trained:
+            self._train_index(embeddings)
+        
+        if metadata is None:
+            metadata = [None] * len(texts)
+        
+        if self._supports_ids():
+            labels = np.asarray(self.make_ids(metadata, texts) if ids is None else ids, dtype=np.int64)
+            
+            # Keep the first occurrence of a label within the batch, replace existing rows
+            _, first = np.unique(labels, return_index=True)
+            if len(first) < len(labels):
+                keep = np.sort(first)
+                embeddings, labels = embeddings[keep], labels[keep]
+                texts = [texts[i] for i in keep]
+                metadata = [metadata[i] for i in keep]
+            self.delete_ids(labels.tolist())
+            
+            self.index.add_with_ids(embeddings, labels)
+        else:
+            # Index saved before labels existed: rows are numbered sequentially
+            labels = np.arange(len(self.ids), len(self.ids) + len(embeddings), dtype=np.int64)
+            self.index.add(embeddings)
+        
+        start = len(self.ids)
+        self.ids = np.concatenate([self.ids, labels])
+        self.deleted = np.concatenate([self.deleted, np.zeros(len(labels), dtype=bool)])
+        if self._row_of is not None:
+            self._row_of.update(zip(labels.tolist(), range(start, start + len(labels))))
         self.texts.extend(texts)
+        self.payloads.extend(metadata)
         
         print(f"Added {len(embeddings)} embeddings to index. Total: {self.index.ntotal}")
     
-    def search(self, query_embedding: np.ndarray, k: int = Config.TOP_K_RESULTS) -> Tuple[List[str], List[float]]:
+    def delete_ids(self, ids: List[int]) -> int:
+        """
+        Remove chunks by label
+        
+        Rows are dropped from the index immediately; their texts and payloads are
+        compacted away on the next save_index().
+        
+        Args:
+            ids: labels to remove (unknown labels are ignored)
+            
+        Returns:
+            Number of removed chunks
+        """
+        rows = [self.row_of[label] for label in set(int(i) for i in ids) if label in self.row_of]
+        if not rows:
+            return 0
+        if not self._supports_ids():
+            raise ValueError("This index was saved before chunk labels existed; run a full ingest to rebuild it")
+        
+        labels = self.ids[rows]
+        self.deleted[rows] = True
+        for label in labels.tolist():
+            del self._row_of[label]
+        
+        if self.index_type == "hnsw":
+            # HNSW graphs do not support removal: rebuild from the remaining vectors
+            live = np.flatnonzero(~self.deleted)
+            vectors = self.index.reconstruct_batch(self.ids[live]) if len(live) else None
+            self.create_index()
+            if vectors is not None:
+                self.index.add_with_ids(vectors, self.ids[live])
+        else:
+            labels = np.ascontiguousarray(labels)
+            self.index.remove_ids(faiss.IDSelectorBatch(len(labels), faiss.swig_ptr(labels)))
+        
+        print(f"Removed {len(rows)} embeddings from index. Total: {self.index.ntotal}")
+        return len(rows)
+    
+    def search(self, query_embedding: np.ndarray, k: int = Config.TOP_K_RESULTS,
+               filter: Optional[dict] = None) -> Tuple[List[str], List[float]]:
         """
         Search for similar embeddings
         
         Args:
             query_embedding: query embedding vector
             k: number of top results to return
+            filter: optional payload filter {field: value or list of values}, e.g. {"id": "12", "field": "Độc tính"}
             
         Returns:
             tuple of (similar_texts, similarity_scores)
         """
+        similar_texts, similarity_scores, _ = self.search_with_metadata(query_embedding, k, filter)
+        return similar_texts, similarity_scores
+    
+    def search_with_metadata(self, query_embedding: np.ndarray, k: int = Config.TOP_K_RESULTS,
+                             filter: Optional[dict] = None) -> Tuple[List[str], List[float], List[dict]]:
+        """
+        Search for similar embeddings and return their metadata payloads
+        
+        Args:
+            query_embedding: query embedding vector
+            k: number of top results to return
+            filter: optional payload filter {field: value or list of values}
+            
+        Returns:
+            tuple of (similar_texts, similarity_scores, metadata)
+        """
+        return self.search_batch(query_embedding.reshape(1, -1), k, filter)[0]
+    
+    def search_batch(self, query_embeddings: np.ndarray, k: int = Config.TOP_K_RESULTS,
+                     filter: Optional[dict] = None) -> List[Tuple[List[str], List[float], List[dict]]]:
+        """
+        Search for many queries with a single multi-vector index.search call
+        
+        Args:
+            query_embeddings: 2D array of query embeddings (one row per query)
+            k: number of top results to return per query
+            filter: optional payload filter applied to every query
+            
+        Returns:
+            list of (similar_texts, similarity_scores, metadata) tuples, one per query
+        """
+        query_embeddings = np.asarray(query_embeddings, dtype='float32').reshape(-1, self.dimension)
         if self.index is None or self.index.ntotal == 0:
-            return [], []
+            return [([], [], []) for _ in range(len(query_embeddings))]
         
-        # Normalize query embedding
-        query_embedding = query_embedding.reshape(1, -1).astype('float32')
-        faiss.normalize_L2(query_embedding)
+        # Normalize query embeddings (copy so callers' arrays are untouched)
+        query_embeddings = query_embeddings.copy()
+        faiss.normalize_L2(query_embeddings)
         
-        # Search
-        scores, indices = self.index.search(query_embedding, k)
+        scores, indices = self._search_rows(query_embeddings, k, filter)
         
-        # Get corresponding texts
-        similar_texts = [self.texts[idx] for idx in indices[0] if idx < len(self.texts)]
-        similarity_scores = scores[0].tolist()
+        results = []
+        for row_scores, row_indices in zip(scores, indices):
+            # ANN indexes pad missing results with -1
+            valid = [(idx, score) for idx, score in zip(row_indices, row_scores) if idx >= 0]
+            results.append((
+                [self.texts[idx] for idx, _ in valid],
+                [float(score) for _, score in valid],
+                [self.payloads[idx] for idx, _ in valid]
+            ))
         
-        return similar_texts, similarity_scores
+        return results
+    
+    def _search_rows(self, query_embeddings: np.ndarray, k: int, filter: Optional[dict] = None):
+        """
+        Run the index search, optionally restricted to rows matching a payload filter
+        
+        Returns:
+            tuple of (scores, row indices) arrays of shape (num_queries, k), padded with -1
+        """
+        if not filter:
+            return self._labels_to_rows(*self.index.search(query_embeddings, k))
+        
+        mask = self.payloads.match(filter) & ~self.deleted
+        rows = np.flatnonzero(mask)
+        num_queries = len(query_embeddings)
+        if len(rows) == 0:
+            return np.full((num_queries, k), -np.inf, dtype='float32'), np.full((num_queries, k), -1, dtype='int64')
+        
+        if self.index_type == "flat":
+            # Exact scan of just the matching slice: one matmul over the selected vectors
+            vectors = self.index.reconstruct_batch(self.ids[rows])
+            slice_scores = query_embeddings @ vectors.T
+            top = np.argsort(-slice_scores, axis=1)[:, :k]
+            scores = np.take_along_axis(slice_scores, top, axis=1)
+            indices = rows[top]
+            if indices.shape[1] < k:
+                pad = k - indices.shape[1]
+                scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+                indices = np.pad(indices, ((0, 0), (0, pad)), constant_values=-1)
+            return scores, indices
+        
+        # ANN indexes: prefilter with an ID selector over the matching labels
+        labels = np.ascontiguousarray(self.ids[rows])
+        selector = faiss.IDSelectorBatch(len(labels), faiss.swig_ptr(labels))
+        if self.index_type == "hnsw":
+            params = faiss.SearchParametersHNSW(sel=selector, efSearch=self.ef_search)
+        else:
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=min(self.nprobe, self._base_index().nlist))
+        return self._labels_to_rows(*self.index.search(query_embeddings, k, params=params))
+    
+    def get_vectors(self, metadata: Optional[List[dict]], texts: List[str]) -> Optional[np.ndarray]:
+        """
+        Stored (normalized) vectors of search results, looked up by their labels
+        
+        Args:
+            metadata: metadata of the results (as returned by search_with_metadata)
+            texts: texts of the results
+            
+        Returns:
+            Array of shape (len(texts), dimension), zero rows for chunks not in the
+            index, or None if the index cannot reconstruct vectors (IVF)
+        """
+        vectors = np.zeros((len(texts), self.dimension), dtype='float32')
+        if self.index is None or not texts:
+            return vectors
+        if not isinstance(self.index, faiss.IndexIDMap2):
+            return None
+        
+        labels = self.make_ids(metadata, texts)
+        found = [i for i, label in enumerate(labels) if label in self.row_of]
+        if found:
+            vectors[found] = self.index.reconstruct_batch(np.array([labels[i] for i in found], dtype=np.int64))
+        return vectors
+    
+    def _labels_to_rows(self, scores: np.ndarray, labels: np.ndarray):
+        """Translate FAISS labels returned by a search into row numbers (-1 stays -1)"""
+        row_of = self.row_of
+        rows = np.array([[row_of.get(label, -1) for label in query_labels] for query_labels in labels.tolist()],
+                        dtype=np.int64).reshape(labels.shape)
+        return scores, rows
     
     def save_index(self, filepath: str = None):
         """Save the FAISS index and texts to disk"""
@@ -79,9 +397,26 @@ class FAISSVectorStore:
         # Save FAISS index
         faiss.write_index(self.index, f"{filepath}.index")
         
-        # Save texts
-        with open(f"{filepath}_texts.pkl", 'wb') as f:
-            pickle.dump(self.texts, f)
+        # Save index type and search params so load_index restores them
+        with open(f"{filepath}_meta.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                "index_type": self.index_type,
+                "dimension": self.dimension,
+                "nlist": self.nlist,
+                "nprobe": self.nprobe,
+                "ef_search": self.ef_search
+            }, f, indent=2)
+        
+        # Save texts (offsets + UTF-8 blob, memory-mapped on load), payloads and labels,
+        # dropping rows deleted since the last save
+        rows = np.flatnonzero(~self.deleted).tolist() if self.deleted.any() else None
+        self.texts.save(filepath, rows)
+        self.payloads.save(filepath, rows)
+        if rows is not None:
+            self.ids = self.ids[rows]
+            self.deleted = np.zeros(len(self.ids), dtype=bool)
+            self._row_of = None
+        np.save(f"{filepath}_ids.npy", self.ids)
         
         print(f"Index saved to {filepath}")
     
@@ -90,28 +425,81 @@ class FAISSVectorStore:
         if filepath is None:
             filepath = self.index_path
         
+        # faiss.read_index raises RuntimeError, not FileNotFoundError, for a missing file
+        if not os.path.exists(f"{filepath}.index"):
+            print(f"Index files not found at {filepath}")
+            return False
+        
         try:
             # Load FAISS index
             self.index = faiss.read_index(f"{filepath}.index")
             
-            # Load texts
-            with open(f"{filepath}_texts.pkl", 'rb') as f:
-                self.texts = pickle.load(f)
+            # Restore index type and search params (indexes saved before this were flat)
+            meta_path = f"{filepath}_meta.json"
+            if os.path.exists(meta_path):
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                self.index_type = meta.get("index_type", "flat")
+                self.nlist = meta.get("nlist", self.nlist)
+                self.nprobe = meta.get("nprobe", self.nprobe)
+                self.ef_search = meta.get("ef_search", self.ef_search)
+            else:
+                self.index_type = "flat"
+            self.set_search_params()
+            
+            # Load texts: memory-map the chunk store, fall back to the legacy pickle
+            if ChunkStore.exists(filepath):
+                self.texts = ChunkStore.load(filepath)
+            else:
+                with open(f"{filepath}_texts.pkl", 'rb') as f:
+                    legacy_texts = pickle.load(f)
+                self.texts = ChunkStore()
+                self.texts.extend(legacy_texts)
+                print("Loaded legacy pickle text store; it will be converted on the next save_index()")
             
-            print(f"Index loaded from {filepath}. Total embeddings: {self.index.ntotal}")
+            # Load metadata payloads (indexes saved before payloads existed get empty ones)
+            if PayloadStore.exists(filepath):
+                self.payloads = PayloadStore.load(filepath)
+            else:
+                self.payloads = PayloadStore(Config.PAYLOAD_INDEX_FIELDS)
+                self.payloads.extend([None] * len(self.texts))
+            
+            # Load row labels (indexes saved before labels existed use row numbers)
+            ids_path = f"{filepath}_ids.npy"
+            if os.path.exists(ids_path):
+                self.ids = np.load(ids_path)
+            elif isinstance(self.index, faiss.IndexIDMap2):
+                self.ids = faiss.vector_to_array(self.index.id_map).astype(np.int64)
+            else:
+                self.ids = np.arange(len(self.texts), dtype=np.int64)
+            self.deleted = np.zeros(len(self.ids), dtype=bool)
+            self._row_of = None
+            
+            print(f"Index loaded from {filepath} ({self.index_type}). Total embeddings: {self.index.ntotal}")
             return True
             
         except FileNotFoundError:
             print(f"Index files not found at {filepath}")
             return False
+        except RuntimeError as e:
+            print(f"Could not read index at {filepath}: {e}")
+            self.index = None
+            return False
     
     def get_stats(self):
         """Get statistics about the vector store"""
         if self.index is None:
-            return {"total_embeddings": 0, "dimension": self.dimension}
+            return {"total_embeddings": 0, "dimension": self.dimension, "index_type": self.index_type}
         
-        return {
+        stats = {
             "total_embeddings": self.index.ntotal,
             "dimension": self.dimension,
-            "total_texts": len(self.texts)
-        }
\ No newline at end of file
+            "total_texts": int((~self.deleted).sum()),
+            "index_type": self.index_type
+        }
+        if self.index_type == "hnsw":
+            stats["ef_search"] = self.ef_search
+        elif self.index_type in ("ivf_flat", "ivf_pq"):
+            stats["nlist"] = self.nlist
+            stats["nprobe"] = self.nprobe
+        return stats
\ No newline at end of file